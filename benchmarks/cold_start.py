@@ -0,0 +1,82 @@
+"""
+Measures the cold start of the conversion pipeline in fresh interpreter processes and writes the numbers as JSON.
+
+Each measurement runs in its own subprocess so nothing is already imported: the time and peak RSS to import `main`,
+and the time and peak RSS to import the converter and convert one page with `dedup="none"`. The result also records
+whether torch or transformers were imported, which must stay false for both.
+
+Usage:
+    python benchmarks/cold_start.py [--output benchmarks/results/cold_start.json] [--repeat 5]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PACKAGE_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "context_converter"
+)
+
+PROBES = {
+    "import_main": "import main",
+    "convert_dedup_none": (
+        "from converter import HTMLToMarkdownConverter\n"
+        "HTMLToMarkdownConverter(dedup='none').convert('<h1>Title</h1><p>Hello World!</p>')"
+    ),
+}
+
+_RUNNER = """
+import json, resource, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, "<probe>", "exec"))
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "seconds": elapsed,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy_imports": sorted(m for m in ("torch", "transformers") if m in sys.modules),
+}}))
+"""
+
+
+def measure(code, repeat):
+    """
+    Run a probe in `repeat` fresh interpreters and return the median time, the largest RSS and the heavy imports seen.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _RUNNER.format(code=code)],
+            cwd=PACKAGE_DIR,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return {
+        "seconds": statistics.median(run["seconds"] for run in runs),
+        "max_rss_mb": max(run["max_rss_mb"] for run in runs),
+        "heavy_imports": sorted({m for run in runs for m in run["heavy_imports"]}),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--output", help="Write the results to this JSON file instead of stdout.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per probe.")
+    args = parser.parse_args(argv)
+
+    results = {name: measure(code, args.repeat) for name, code in PROBES.items()}
+    payload = json.dumps({"python": sys.version.split()[0], "results": results}, indent=2)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
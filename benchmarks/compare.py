@@ -0,0 +1,59 @@
+"""
+Compares two benchmark result files and reports regressions.
+
+A benchmark regresses when its median time in the candidate file exceeds the baseline by more than the tolerance.
+The exit status is 1 when any benchmark regresses, so the comparison can gate CI.
+
+Usage:
+    python benchmarks/compare.py baseline.json candidate.json [--tolerance 0.10]
+"""
+
+import argparse
+import json
+import sys
+
+
+def compare(baseline, candidate, tolerance):
+    """
+    Compare the median times of benchmarks present in both result sets.
+
+    Args:
+        baseline (dict): Results loaded from the baseline file.
+        candidate (dict): Results loaded from the candidate file.
+        tolerance (float): The allowed relative slowdown, for example 0.10 for 10%.
+
+    Returns:
+        list: One (name, baseline seconds, candidate seconds, relative change, regressed) tuple per benchmark.
+    """
+    rows = []
+    for name, base in baseline["results"].items():
+        if name not in candidate["results"]:
+            continue
+        before = base["median_s"]
+        after = candidate["results"][name]["median_s"]
+        change = (after - before) / before if before else 0.0
+        rows.append((name, before, after, change, change > tolerance))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("baseline", help="Baseline results JSON.")
+    parser.add_argument("candidate", help="Candidate results JSON.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative slowdown.")
+    args = parser.parse_args(argv)
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.candidate, encoding="utf-8") as file:
+        candidate = json.load(file)
+
+    rows = compare(baseline, candidate, args.tolerance)
+    for name, before, after, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:24s} {before:8.3f}s -> {after:8.3f}s {change:+7.1%} {flag}")
+    return 1 if any(row[-1] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,190 @@
+"""
+Runs the benchmark suite for the conversion pipeline and writes the results as JSON.
+
+Every benchmark runs on the deterministic synthetic crawl from `benchmarks/synthetic.py`:
+
+    - curate_content: HTML parsing and removal of page chrome (`_curate_soup`).
+    - markdownify: conversion of curated trees to markdown.
+    - process_embeddings: line embedding (`_process_embeddings`), without the cache.
+    - remove_redundant_data: the vectorized redundancy filter.
+    - end_to_end: `main.main` over the crawl written to JSON files.
+
+By default the embedding model is a small deterministic stub, so the suite runs offline and measures the pipeline
+rather than the model. Pass `--model` with a checkpoint name or local path to benchmark a real model.
+
+Usage:
+    python benchmarks/run.py [--pages 200] [--repeat 3] [--output benchmarks/results/latest.json]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src", "context_converter"))
+sys.path.insert(0, ROOT)
+
+import torch
+from markdownify import MarkdownConverter
+
+import main as pipeline
+from benchmarks.synthetic import generate_crawl, write_crawl
+from converter import HTMLToMarkdownConverter
+from prefilter import prefilter_lines
+from registry import DEFAULT_MODEL_NAME, get_registry
+
+STUB_MODEL = "stub"
+
+
+def timed(function, repeat):
+    """
+    Call `function` `repeat` times and return the median and minimum wall time in seconds.
+    """
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {"median_s": statistics.median(timings), "min_s": min(timings), "repeat": repeat}
+
+
+def with_throughput(result, items, unit):
+    """
+    Add an items-per-second figure, based on the median time, to a timing result.
+    """
+    result[f"{unit}_per_s"] = items / result["median_s"] if result["median_s"] else None
+    result[unit] = items
+    return result
+
+
+def load_model(model):
+    """
+    Load the embedding model into the shared registry and return the name every benchmark converts with. The stub is
+    registered under the default model name.
+    """
+    if model == STUB_MODEL:
+        from tests.stub_model import register_stub
+
+        register_stub(get_registry(), DEFAULT_MODEL_NAME)
+        return DEFAULT_MODEL_NAME
+    get_registry().warm_up(model)
+    return model
+
+
+def run_suite(pages, repeat, model_name, seed=0):
+    """
+    Run every benchmark and return the results keyed by benchmark name.
+    """
+    crawl = generate_crawl(pages, seed)
+    converter = HTMLToMarkdownConverter(model_name=model_name)
+    html_bytes = sum(len(entry["html"].encode("utf-8")) for entry in crawl)
+    results = {}
+
+    results["curate_content"] = with_throughput(
+        timed(lambda: [converter._curate_soup(e["html"]) for e in crawl], repeat),
+        html_bytes / 1e6,
+        "html_mb",
+    )
+
+    soups = [converter._curate_soup(e["html"]) for e in crawl]
+    markdown_converter = MarkdownConverter(
+        strip_tags=converter.strip_tags, convert_links=converter.convert_links
+    )
+    results["markdownify"] = with_throughput(
+        timed(lambda: [markdown_converter.convert_soup(s) for s in soups], repeat),
+        len(soups),
+        "pages",
+    )
+
+    lines = []
+    for entry in crawl:
+        page_lines, needs_embedding = prefilter_lines(
+            converter.to_markdown(entry["html"]).split("\n")
+        )
+        lines.extend(l for l, needed in zip(page_lines, needs_embedding) if needed)
+    results["process_embeddings"] = with_throughput(
+        timed(lambda: converter._process_embeddings(lines), repeat), len(lines), "lines"
+    )
+
+    embeddings = converter._process_embeddings(lines)
+    results["remove_redundant_data"] = with_throughput(
+        timed(lambda: converter._remove_redundant_data(embeddings, lines), repeat),
+        len(lines),
+        "lines",
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        pattern = write_crawl(os.path.join(directory, "crawl"), pages, seed)
+        output = os.path.join(directory, "output.md")
+
+        def end_to_end():
+            if os.path.exists(output):
+                os.remove(output)
+            asyncio.run(
+                pipeline.main(
+                    pattern=pattern, output_file_name=output, workers=0, model_name=model_name
+                )
+            )
+
+        results["end_to_end"] = with_throughput(timed(end_to_end, repeat), pages, "pages")
+    return results
+
+
+def environment(model):
+    """
+    Describe the machine and code version the results were produced on.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "torch_threads": torch.get_num_threads(),
+        "model": model,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--pages", type=int, default=200, help="Pages in the synthetic crawl.")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per benchmark.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the synthetic crawl.")
+    parser.add_argument("--model", default=STUB_MODEL, help='Embedding model, or "stub" for the offline stub.')
+    parser.add_argument(
+        "--output",
+        default=os.path.join(ROOT, "benchmarks", "results", "latest.json"),
+        help="JSON file to write the results to.",
+    )
+    args = parser.parse_args(argv)
+
+    logging.disable(logging.INFO)
+    model_name = load_model(args.model)
+    payload = {
+        "environment": environment(args.model),
+        "parameters": {"pages": args.pages, "repeat": args.repeat, "seed": args.seed},
+        "results": run_suite(args.pages, args.repeat, model_name, args.seed),
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(payload, file, indent=2)
+    for name, result in payload["results"].items():
+        print(f"{name:24s} {result['median_s']:8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
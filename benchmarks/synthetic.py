@@ -0,0 +1,123 @@
+"""
+Generates a deterministic synthetic gpt-crawler export for benchmarking the conversion pipeline.
+
+Pages come in four kinds that stress different stages:
+
+    - "small": a handful of short paragraphs, where per-entry overhead dominates.
+    - "long": many long paragraphs and lists, where parsing and embedding dominate.
+    - "boilerplate": short bodies wrapped in navigation, cookie banners, sidebars and footers shared across pages.
+    - "table": large tables, which produce many similar markdown rows.
+
+The same seed always produces the same crawl, so results are comparable between runs and versions.
+
+Functions:
+    generate_crawl(pages, seed): Returns a list of crawl entries.
+    write_crawl(directory, pages, seed, files): Writes the crawl as output-*.json files.
+"""
+
+import json
+import os
+import random
+
+PAGE_KINDS = ("small", "long", "boilerplate", "table")
+
+_WORDS = (
+    "model embedding markdown converter request response token batch cache index "
+    "install configure deploy server client query result document section chapter "
+    "release version feature option default value error warning example usage guide "
+    "reference function method class module package library runtime memory thread"
+).split()
+
+_BOILERPLATE = """
+<header><a href="/">Home</a> <a href="/docs">Docs</a> <a href="/blog">Blog</a></header>
+<nav class="navbar"><ul><li><a href="/a">Getting started</a></li><li><a href="/b">API</a></li></ul></nav>
+<div class="cookie-banner">We use cookies to improve your experience. Accept all cookies?</div>
+<div id="sidebar"><p>Related pages</p><ul><li>Install</li><li>Configure</li></ul></div>
+<p>Skip to content</p>
+<p>Copyright © 2024 Example Corp. All rights reserved.</p>
+"""
+
+_FOOTER = '<footer><p>Copyright © 2024 Example Corp.</p><a href="/privacy">Privacy</a></footer>'
+
+
+def _sentence(rng, words):
+    return " ".join(rng.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _paragraphs(rng, count, words):
+    return "".join(f"<p>{_sentence(rng, words)}</p>" for _ in range(count))
+
+
+def _page(rng, kind, index):
+    """
+    Build the HTML for one page of the given kind.
+    """
+    title = f"<h1>{kind.title()} page {index}</h1>"
+    if kind == "small":
+        body = _paragraphs(rng, rng.randint(2, 5), rng.randint(5, 12))
+    elif kind == "long":
+        body = ""
+        for section in range(rng.randint(8, 16)):
+            body += f"<h2>Section {section}</h2>" + _paragraphs(rng, 6, rng.randint(20, 60))
+            body += "<ul>" + "".join(f"<li>{_sentence(rng, 6)}</li>" for _ in range(5)) + "</ul>"
+            body += f"<pre><code>{_sentence(rng, 12)}</code></pre>"
+    elif kind == "boilerplate":
+        body = _BOILERPLATE + _paragraphs(rng, rng.randint(1, 3), 10) + _BOILERPLATE
+    else:
+        columns = rng.randint(3, 6)
+        header = "".join(f"<th>{rng.choice(_WORDS)}</th>" for _ in range(columns))
+        rows = "".join(
+            "<tr>" + "".join(f"<td>{rng.choice(_WORDS)} {rng.randint(0, 99)}</td>" for _ in range(columns)) + "</tr>"
+            for _ in range(rng.randint(20, 80))
+        )
+        body = f"<table><tr>{header}</tr>{rows}</table>"
+    return f"<html><head><title>Page {index}</title><script>var x = {index};</script></head><body>{title}{body}{_FOOTER}</body></html>"
+
+
+def generate_crawl(pages=200, seed=0):
+    """
+    Generate a deterministic synthetic crawl.
+
+    Args:
+        pages (int): The number of pages. Kinds are assigned round-robin. Defaults to 200.
+        seed (int): The random seed. Defaults to 0.
+
+    Returns:
+        list: Crawl entries with "title", "url", "kind" and "html" keys.
+    """
+    rng = random.Random(seed)
+    crawl = []
+    for index in range(pages):
+        kind = PAGE_KINDS[index % len(PAGE_KINDS)]
+        crawl.append(
+            {
+                "title": f"{kind.title()} page {index}",
+                "url": f"https://example.com/{kind}/{index}",
+                "kind": kind,
+                "html": _page(rng, kind, index),
+            }
+        )
+    return crawl
+
+
+def write_crawl(directory, pages=200, seed=0, files=2):
+    """
+    Write a synthetic crawl as gpt-crawler style output-*.json files.
+
+    Args:
+        directory (str): The directory to write to.
+        pages (int): The number of pages. Defaults to 200.
+        seed (int): The random seed. Defaults to 0.
+        files (int): The number of JSON files to split the crawl across. Defaults to 2.
+
+    Returns:
+        str: A glob pattern matching the written files.
+    """
+    crawl = generate_crawl(pages, seed)
+    os.makedirs(directory, exist_ok=True)
+    size = -(-len(crawl) // files)
+    for part in range(files):
+        path = os.path.join(directory, f"output-{part + 1}.json")
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(crawl[part * size : (part + 1) * size], file)
+    return os.path.join(directory, "output-*.json")
@@ -0,0 +1,236 @@
+"""
+This module provides automatic batch-size and chunk-size tuning for the HTML to Markdown conversion project.
+
+The best embedding batch configuration depends on the CPU, the memory system, the model and the line-length mix of the crawl, so a value tuned on one machine does not carry over to another. `tune` runs a short calibration on lines sampled from the actual input: it times the embedding step for candidate fixed batch sizes and token budgets, records the peak memory each one reaches, and picks the fastest candidate within an optional memory limit. The choice is cached per host, model and backend, so later runs on the same machine start tuned without calibrating again.
+
+Functions:
+    calibrate(converter, lines): Measures throughput and memory for each candidate batch configuration.
+    tune(converter, pattern): Asynchronously returns cached or freshly calibrated settings for a crawl.
+    host_key(model_name, backend): Identifies the host, model and backend a tuning result belongs to.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import platform
+import time
+
+from metrics import NULL_METRICS, peak_rss_mb
+from registry import cache_home
+
+BATCH_SIZE_CANDIDATES = (8, 16, 32, 64, 128)
+TOKEN_BUDGET_CANDIDATES = (2048, 4096, 8192, 16384)
+
+
+def default_cache_path():
+    """
+    Return the file tuning results are cached in: `autotune.json` in `registry.cache_home()`.
+    """
+    return os.path.join(cache_home(), "autotune.json")
+
+
+def host_key(model_name, backend="fp32"):
+    """
+    Identify the host, model and backend a tuning result belongs to.
+
+    Args:
+        model_name (str): The embedding model name.
+        backend (str): The inference backend. Defaults to "fp32".
+
+    Returns:
+        str: A short hash of the host name, CPU, core count, torch version, model and backend.
+    """
+    import torch
+
+    description = "|".join(
+        [
+            platform.node(),
+            platform.machine(),
+            platform.processor(),
+            str(os.cpu_count()),
+            str(torch.get_num_threads()),
+            torch.__version__,
+            model_name,
+            backend,
+        ]
+    )
+    return hashlib.blake2b(description.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def calibrate(
+    converter,
+    lines,
+    batch_sizes=BATCH_SIZE_CANDIDATES,
+    token_budgets=TOKEN_BUDGET_CANDIDATES,
+    max_memory_mb=None,
+):
+    """
+    Measure embedding throughput and peak memory for each candidate batch configuration.
+
+    Candidates run from the smallest to the largest, so the growth of the process's peak resident memory after each
+    run is attributable to it. The cache and the micro-batcher are bypassed, and nothing is recorded in the converter's
+    metrics.
+
+    Args:
+        converter (HTMLToMarkdownConverter): The converter whose model and settings are calibrated.
+        lines (list): Sample content lines from the input.
+        batch_sizes (tuple): Fixed batch sizes to try.
+        token_budgets (tuple): Token budgets for length-bucketed batching to try, without a cap on lines per batch.
+        max_memory_mb (float, optional): Reject candidates whose peak resident memory exceeds this. Defaults to None.
+
+    Returns:
+        tuple: The best candidate as a dictionary with "batch_size", "token_budget", "lines_per_s" and "peak_rss_mb",
+        and the list of every measured candidate.
+    """
+    candidates = [{"batch_size": size, "token_budget": None} for size in sorted(batch_sizes)]
+    candidates += [
+        {"batch_size": None, "token_budget": budget}
+        for budget in sorted(token_budgets)
+    ]
+    metrics, converter.metrics = converter.metrics, NULL_METRICS
+    results = []
+    try:
+        # Warm up kernels and allocator pools so the first candidate is not penalized
+        converter._embed_batches(lines[:8], 8)
+        for candidate in candidates:
+            start = time.perf_counter()
+            converter._embed_batches(lines, candidate["batch_size"], candidate["token_budget"])
+            elapsed = time.perf_counter() - start
+            result = dict(
+                candidate,
+                lines_per_s=len(lines) / elapsed if elapsed else float("inf"),
+                peak_rss_mb=peak_rss_mb(),
+            )
+            logging.info("Autotune candidate: %s", result)
+            results.append(result)
+    finally:
+        converter.metrics = metrics
+    allowed = [
+        result
+        for result in results
+        if max_memory_mb is None or result["peak_rss_mb"] <= max_memory_mb
+    ] or results[:1]
+    return max(allowed, key=lambda result: result["lines_per_s"]), results
+
+
+async def tune(
+    converter,
+    pattern,
+    sample_entries=64,
+    sample_lines=512,
+    max_memory_mb=None,
+    cache_path=None,
+    retune=False,
+):
+    """
+    Return tuned batch and chunk settings for a crawl, from the cache or from a fresh calibration.
+
+    Calibration samples the content lines of the first entries of the input, exactly as they would be embedded. The
+    chunk size is then chosen so a chunk holds about 32 batches' worth of lines, which keeps the micro-batcher fed
+    without holding more markdown in memory than needed.
+
+    Args:
+        converter (HTMLToMarkdownConverter): The converter to tune. Its `batch_size` and `token_budget` are updated.
+        pattern (str): The glob matching the input JSON files.
+        sample_entries (int): The number of entries to sample lines from. Defaults to 64.
+        sample_lines (int): The maximum number of lines to calibrate on. Defaults to 512.
+        max_memory_mb (float, optional): The peak resident memory a candidate may reach. Defaults to no limit.
+        cache_path (str, optional): The tuning cache file. Defaults to `default_cache_path()`.
+        retune (bool): Calibrate even when a cached result exists. Defaults to False.
+
+    Returns:
+        dict: The settings, with "batch_size", "token_budget" and "chunk_size", or None if the input has no lines.
+    """
+    cache_path = cache_path or default_cache_path()
+    key = host_key(converter.model_name, converter.backend)
+    cache = _read_cache(cache_path)
+    if not retune and key in cache:
+        settings = cache[key]
+        logging.info("Using cached autotune settings from %s", cache_path)
+    else:
+        lines, entries = await _sample_lines(converter, pattern, sample_entries, sample_lines)
+        if not lines:
+            logging.info("Autotune skipped: no content lines in the input sample")
+            return None
+        best, results = calibrate(converter, lines, max_memory_mb=max_memory_mb)
+        lines_per_entry = len(lines) / max(entries, 1)
+        batch_lines = best["batch_size"]
+        if best["token_budget"]:
+            # Length-bucketed batches hold about budget / tokens-per-line lines, estimated at four characters per token
+            tokens_per_line = sum(len(line) // 4 + 2 for line in lines) / len(lines)
+            batch_lines = best["token_budget"] / tokens_per_line
+        settings = {
+            "batch_size": best["batch_size"],
+            "token_budget": best["token_budget"],
+            "chunk_size": int(min(1024, max(16, 32 * batch_lines / max(lines_per_entry, 1)))),
+            "lines_per_s": best["lines_per_s"],
+            "peak_rss_mb": best["peak_rss_mb"],
+            "candidates": results,
+            "model_name": converter.model_name,
+            "backend": converter.backend,
+            "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        cache[key] = settings
+        _write_cache(cache_path, cache)
+    logging.info(
+        "Autotune batch_size=%s, token_budget=%s, chunk_size=%s",
+        settings["batch_size"],
+        settings["token_budget"],
+        settings["chunk_size"],
+    )
+    converter.batch_size = settings["batch_size"]
+    converter.token_budget = settings["token_budget"]
+    return settings
+
+
+async def _sample_lines(converter, pattern, sample_entries, sample_lines):
+    """
+    Return up to `sample_lines` content lines from the first `sample_entries` entries of the input, and the number of
+    entries they came from.
+    """
+    from prefilter import prefilter_lines
+    from utils import iter_json_entries
+
+    lines = []
+    entries = 0
+    async for entry in iter_json_entries(pattern):
+        entries += 1
+        try:
+            markdown = converter.to_markdown(entry.get("html") or "")
+        except Exception as e:
+            logging.error("Error sampling entry for autotune: %s", e)
+            continue
+        candidates, needs_embedding = prefilter_lines(markdown.split("\n"))
+        lines.extend(line for line, needed in zip(candidates, needs_embedding) if needed)
+        if len(lines) >= sample_lines or entries >= sample_entries:
+            break
+    return lines[:sample_lines], entries
+
+
+def _read_cache(path):
+    """
+    Read the tuning cache, returning an empty cache if it is missing or unreadable.
+    """
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logging.error("Error reading autotune cache: %s", e)
+        return {}
+
+
+def _write_cache(path, cache):
+    """
+    Write the tuning cache atomically.
+    """
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as file:
+            json.dump(cache, file, indent=2)
+        os.replace(temporary_path, path)
+    except OSError as e:
+        logging.error("Error writing autotune cache: %s", e)
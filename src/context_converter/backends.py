@@ -0,0 +1,206 @@
+"""
+This module provides the selectable CPU inference backends for the embedding step of the HTML to Markdown conversion project.
+
+The fp32 model is the reference. The other backends trade a little precision or a one-off export for faster CPU inference:
+
+    - "int8": dynamic int8 quantization of the model's linear layers.
+    - "torchscript": a traced TorchScript graph of the model.
+    - "onnx": an exported ONNX graph run with onnxruntime (requires the optional `onnx` extra).
+
+Because every backend drifts slightly from fp32, `parity_check` measures how far embeddings and, more importantly, redundancy decisions at the similarity threshold move between two converters.
+
+Functions:
+    prepare_model(model, tokenizer, backend): Returns the model wrapped or converted for the given backend.
+    configure_threads(num_threads): Sets the intra-op thread count used for inference.
+    threads_per_worker(workers): Splits the available cores between worker processes.
+    parity_check(reference, candidate, lines): Compares embeddings and dedup decisions of two converters.
+"""
+
+import logging
+import os
+import tempfile
+
+INFERENCE_BACKENDS = ("fp32", "int8", "torchscript", "onnx")
+
+
+def prepare_model(model, tokenizer, backend="fp32"):
+    """
+    Return the embedding model prepared for the given inference backend.
+
+    Args:
+        model: The fp32 embedding model.
+        tokenizer: The matching tokenizer, used to build example inputs for graph export.
+        backend (str): One of INFERENCE_BACKENDS. Defaults to "fp32".
+
+    Returns:
+        A model that can be called with the tokenizer's output and returns token embeddings as its first output.
+
+    Raises:
+        ValueError: If the backend is unknown.
+        ImportError: If the backend needs an optional dependency that is not installed.
+    """
+    import torch
+
+    if backend == "fp32":
+        return model
+    if backend == "int8":
+        return torch.ao.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    if backend == "torchscript":
+        return _TracedEmbeddingModel(model, _example_inputs(tokenizer))
+    if backend == "onnx":
+        return _OnnxEmbeddingModel(model, _example_inputs(tokenizer))
+    raise ValueError(f"backend must be one of {INFERENCE_BACKENDS}, got {backend!r}")
+
+
+def configure_threads(num_threads):
+    """
+    Set the number of intra-op threads torch uses for inference.
+
+    Args:
+        num_threads (int): The thread count. Values below one are ignored.
+
+    Returns:
+        None
+    """
+    import torch
+
+    if num_threads and num_threads > 0 and torch.get_num_threads() != num_threads:
+        torch.set_num_threads(num_threads)
+
+
+def threads_per_worker(workers):
+    """
+    Split the available cores evenly between worker processes so they do not oversubscribe the CPU.
+
+    Args:
+        workers (int): The number of processes that each run the model.
+
+    Returns:
+        int: The intra-op thread count for each worker, at least one.
+    """
+    return max(1, (os.cpu_count() or 1) // max(1, workers))
+
+
+def parity_check(reference, candidate, lines):
+    """
+    Measure how far a candidate converter's embeddings and dedup decisions drift from a reference converter.
+
+    Both converters embed the same lines. Decisions are compared with the reference converter's similarity threshold
+    and window, which is where drift actually changes the output.
+
+    Args:
+        reference (HTMLToMarkdownConverter): The reference converter, normally the fp32 backend.
+        candidate (HTMLToMarkdownConverter): The converter under test.
+        lines (list): Sample lines, in document order.
+
+    Returns:
+        dict: The largest absolute embedding difference, the mean and minimum cosine similarity between matching
+        embeddings, and the number and rate of redundancy decisions that flip.
+    """
+    from redundancy import redundant_mask
+
+    expected = reference._compute_embeddings(lines)
+    actual = candidate._compute_embeddings(lines)
+    cosine = (expected * actual).sum(dim=1)
+    expected_mask = redundant_mask(
+        expected, threshold=reference.similarity_threshold, window=reference.window
+    )
+    actual_mask = redundant_mask(
+        actual, threshold=reference.similarity_threshold, window=reference.window
+    )
+    flips = int((expected_mask != actual_mask).sum())
+    return {
+        "lines": len(lines),
+        "max_abs_diff": float((expected - actual).abs().max()),
+        "mean_cosine": float(cosine.mean()),
+        "min_cosine": float(cosine.min()),
+        "decision_flips": flips,
+        "flip_rate": flips / len(lines) if lines else 0.0,
+    }
+
+
+def _example_inputs(tokenizer):
+    """
+    Tokenize a small batch of sample lines to trace or export a model with.
+    """
+    encoded = tokenizer(
+        ["An example line of markdown text.", "Another one."],
+        padding=True,
+        truncation=True,
+        return_tensors="pt",
+    )
+    return encoded["input_ids"], encoded["attention_mask"]
+
+
+def _first_output(outputs):
+    """
+    Return the token embeddings from a model output that may be a tuple, a dict or a ModelOutput.
+    """
+    if isinstance(outputs, dict):
+        return outputs["last_hidden_state"]
+    return outputs[0]
+
+
+class _TracedEmbeddingModel:
+    """
+    Wraps a TorchScript trace of the embedding model so it can be called like the original model.
+    """
+
+    def __init__(self, model, example_inputs):
+        import torch
+
+        logging.info("Tracing embedding model with TorchScript")
+        with torch.inference_mode():
+            self.traced = torch.jit.trace(
+                model, example_inputs, strict=False, check_trace=False
+            )
+
+    def __call__(self, input_ids, attention_mask, **kwargs):
+        return (_first_output(self.traced(input_ids, attention_mask)),)
+
+
+class _OnnxEmbeddingModel:
+    """
+    Exports the embedding model to ONNX and runs it with onnxruntime, returning torch tensors.
+    """
+
+    def __init__(self, model, example_inputs):
+        import torch
+
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError(
+                'The "onnx" backend requires onnxruntime; install the "onnx" extra.'
+            ) from e
+
+        # The session holds the model in memory once loaded, so the export is removed right after
+        with tempfile.TemporaryDirectory() as temporary_dir:
+            path = os.path.join(temporary_dir, "embedding-model.onnx")
+            logging.info("Exporting embedding model to ONNX: %s", path)
+            dynamic_axes = {"input_ids": {0: "batch", 1: "tokens"}, "attention_mask": {0: "batch", 1: "tokens"}}
+            torch.onnx.export(
+                model,
+                example_inputs,
+                path,
+                input_names=["input_ids", "attention_mask"],
+                output_names=["last_hidden_state"],
+                dynamic_axes={**dynamic_axes, "last_hidden_state": {0: "batch", 1: "tokens"}},
+            )
+            self.session = onnxruntime.InferenceSession(
+                path, providers=["CPUExecutionProvider"]
+            )
+
+    def __call__(self, input_ids, attention_mask, **kwargs):
+        import torch
+
+        (last_hidden_state,) = self.session.run(
+            ["last_hidden_state"],
+            {
+                "input_ids": input_ids.numpy(),
+                "attention_mask": attention_mask.numpy(),
+            },
+        )
+        return (torch.from_numpy(last_hidden_state),)
@@ -0,0 +1,63 @@
+"""
+This module contains helpers for planning embedding batches in the HTML to Markdown conversion project.
+
+Padding every batch to its longest line means a single long paragraph makes every short line in the same batch pay for its full length. Sorting lines by token length and packing them under a total-token budget keeps lines of similar length together and cuts the padding compute per document.
+
+Functions:
+    plan_token_batches(lengths, token_budget, max_batch_size): Groups line indices into length-bucketed batches.
+    padding_ratio(lengths, batches): Measures the share of padded tokens in a batch plan.
+"""
+
+
+def plan_token_batches(lengths, token_budget, max_batch_size=None):
+    """
+    Group line indices into batches whose padded size stays within a token budget.
+
+    Lines are sorted by token length so each batch holds lines of similar length. A batch is closed when adding the next line would
+    make `batch_lines * longest_line` exceed the budget. A line longer than the budget gets a batch of its own.
+
+    Args:
+        lengths (list): The token length of each line, in document order.
+        token_budget (int): The maximum number of padded tokens per batch.
+        max_batch_size (int, optional): An additional cap on the number of lines per batch.
+
+    Returns:
+        list: A list of batches, each a list of indices into `lengths`.
+    """
+    if token_budget <= 0:
+        raise ValueError("token_budget must be positive")
+
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    batch = []
+    for index in order:
+        # Lengths are ascending, so the current line is the longest in the batch
+        padded_size = (len(batch) + 1) * max(lengths[index], 1)
+        full = max_batch_size is not None and len(batch) >= max_batch_size
+        if batch and (padded_size > token_budget or full):
+            batches.append(batch)
+            batch = []
+        batch.append(index)
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def padding_ratio(lengths, batches):
+    """
+    Compute the fraction of tokens in a batch plan that are padding.
+
+    Args:
+        lengths (list): The token length of each line.
+        batches (list): Batches of indices into `lengths`.
+
+    Returns:
+        float: Padded tokens divided by total tokens processed, or 0.0 for an empty plan.
+    """
+    total = 0
+    real = 0
+    for batch in batches:
+        batch_lengths = [lengths[i] for i in batch]
+        total += len(batch) * max(batch_lengths)
+        real += sum(batch_lengths)
+    return (total - real) / total if total else 0.0
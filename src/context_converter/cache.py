@@ -0,0 +1,226 @@
+"""
+This module provides a content-addressed cache for line embeddings in the HTML to Markdown conversion project.
+
+Crawled sites repeat the same lines on nearly every page: breadcrumbs, copyright notices, "Skip to content" links and sidebars. The cache keys each embedding by a hash of a namespace, naming the model and the settings that shape its vectors, and the whitespace-normalized line text, so a line that has been embedded once is never sent to the model again.
+
+It has two tiers: a bounded in-memory LRU tier and an optional persistent SQLite tier that survives between runs over overlapping crawls.
+
+Classes:
+    EmbeddingCache: A two-tier LRU and on-disk cache of normalized line embeddings.
+
+Functions:
+    normalize_line(line): Collapses whitespace so equivalent lines share a cache entry.
+    cache_key(namespace, line): Returns the content hash for a line embedding.
+"""
+
+import hashlib
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+
+
+def normalize_line(line):
+    """
+    Normalize a line for cache lookups by collapsing runs of whitespace and stripping the ends.
+
+    Args:
+        line (str): The line of text.
+
+    Returns:
+        str: The normalized line.
+    """
+    return " ".join(line.split())
+
+
+def cache_key(namespace, line):
+    """
+    Compute the content hash used to address a line embedding.
+
+    Args:
+        namespace (str): The embedding model and settings the vector was produced with.
+        line (str): The line of text.
+
+    Returns:
+        str: A hex digest of the namespace and normalized line.
+    """
+    payload = f"{namespace}\0{normalize_line(line)}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    A two-tier, thread-safe cache of line embeddings.
+
+    Attributes:
+        max_entries (int): The maximum number of embeddings held in memory.
+        path (str): The SQLite file backing the persistent tier, or None for memory only.
+        hits (int): Lookups answered from memory.
+        disk_hits (int): Lookups answered from the persistent tier.
+        misses (int): Lookups that had to go to the model.
+
+    Methods:
+        get_many(namespace, lines): Returns cached embeddings, with None for misses.
+        put_many(namespace, lines, embeddings): Stores embeddings in both tiers.
+        stats(): Returns the hit and miss counters.
+        clear(): Empties the in-memory tier and resets the counters.
+        close(): Closes the persistent tier.
+    """
+
+    def __init__(self, max_entries=100_000, path=None):
+        """
+        Initializes the cache.
+
+        Args:
+            max_entries (int): The maximum number of embeddings kept in the in-memory LRU tier. Defaults to 100,000.
+            path (str, optional): A SQLite file for the persistent tier. Defaults to None (memory only).
+
+        Returns:
+            None
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB)"
+            )
+            self._db.commit()
+
+    def get_many(self, namespace, lines):
+        """
+        Look up the embeddings for a list of lines.
+
+        Args:
+            namespace (str): The embedding model and settings, as in `cache_key`.
+            lines (list): The lines to look up.
+
+        Returns:
+            list: One torch.Tensor per line, or None where the line is not cached.
+        """
+        keys = [cache_key(namespace, line) for line in lines]
+        results = [None] * len(keys)
+        with self._lock:
+            disk_lookups = {}
+            for i, key in enumerate(keys):
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    results[i] = vector
+                    self.hits += 1
+                else:
+                    disk_lookups.setdefault(key, []).append(i)
+
+            for key, vector in self._read_disk(list(disk_lookups)).items():
+                self._remember(key, vector)
+                for i in disk_lookups.pop(key):
+                    results[i] = vector
+                    self.disk_hits += 1
+
+            self.misses += sum(len(indices) for indices in disk_lookups.values())
+        return results
+
+    def put_many(self, namespace, lines, embeddings):
+        """
+        Store embeddings for a list of lines in the memory tier and, if configured, the persistent tier.
+
+        Args:
+            namespace (str): The embedding model and settings, as in `cache_key`.
+            lines (list): The lines the embeddings belong to.
+            embeddings (torch.Tensor): One embedding row per line.
+
+        Returns:
+            None
+        """
+        import torch
+
+        rows = []
+        with self._lock:
+            for line, vector in zip(lines, embeddings):
+                key = cache_key(namespace, line)
+                vector = vector.detach().to(torch.float32)
+                self._remember(key, vector)
+                rows.append((key, array("f", vector.tolist()).tobytes()))
+            if self._db is not None and rows:
+                try:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                        rows,
+                    )
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    logging.error("Error writing embedding cache: %s", e)
+
+    def stats(self):
+        """
+        Return the cache counters.
+
+        Returns:
+            dict: The hit, disk hit and miss counts, the hit rate and the number of in-memory entries.
+        """
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                "entries": len(self._memory),
+            }
+
+    def clear(self):
+        """
+        Empty the in-memory tier and reset the counters. The persistent tier is left untouched.
+        """
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.disk_hits = self.misses = 0
+
+    def close(self):
+        """
+        Close the persistent tier, if any.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _remember(self, key, vector):
+        """
+        Insert a vector into the LRU tier, evicting the least recently used entries beyond `max_entries`.
+        """
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _read_disk(self, keys):
+        """
+        Fetch vectors for the given keys from the persistent tier.
+        """
+        import torch
+
+        if self._db is None or not keys:
+            return {}
+        found = {}
+        try:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, blob in rows:
+                    found[key] = torch.frombuffer(bytearray(blob), dtype=torch.float32)
+        except sqlite3.Error as e:
+            logging.error("Error reading embedding cache: %s", e)
+        return found
@@ -1,40 +1,162 @@
 """
 This script defines a class HTMLToMarkdownConverter that is responsible for converting HTML content to Markdown format and processing text embeddings. It uses the transformers library to load a pretrained model for generating embeddings, and the beautifulsoup4 and markdownify libraries to parse and convert HTML content to Markdown. The class also includes methods for removing redundant data based on semantic similarity, and for curating the HTML content by removing specified elements and tags.
+
+torch and transformers are imported only when semantic deduplication runs, so converting without embeddings never loads them.
 """
 
-from bs4 import BeautifulSoup
-from markdownify import markdownify as md
-from transformers import AutoTokenizer, AutoModel
-import torch
+from bs4 import BeautifulSoup, Tag
+from markdownify import MarkdownConverter
+from itertools import compress
+import importlib.util
+import soupsieve
 import logging
+from backends import INFERENCE_BACKENDS, configure_threads
+from batching import plan_token_batches
+from cache import normalize_line
+from metrics import NULL_METRICS
+from prefilter import prefilter_lines
+from redundancy import DEFAULT_SIMILARITY_THRESHOLD, redundant_mask
+from registry import DEFAULT_MODEL_NAME, get_registry
+from streaming import iter_html_sections
+
+# Page chrome removed during curation, matched in a single pass by one compiled selector
+REMOVED_SELECTORS = [
+    "header",
+    "footer",
+    "nav",
+    ".navbar",
+    ".menu",
+    ".footer-links",
+    "#sidebar",
+    "#ad-container",
+    'div[class*="cookie"], div[class*="banner"]',
+    "aside",
+    ".pagination",
+    "form",
+]
+_REMOVED_SELECTOR = soupsieve.compile(", ".join(REMOVED_SELECTORS))
+
+DEDUP_MODES = ("semantic", "lexical", "none")
+LONG_LINE_MODES = ("truncate", "window")
+DEFAULT_BATCH_SIZE = 16
+
+
+def _split_text(text, parts):
+    """
+    Split text into the given number of pieces of similar length, cutting at whitespace where possible.
+    """
+    size = -(-len(text) // parts)
+    pieces = []
+    start = 0
+    while start < len(text):
+        end = min(start + size, len(text))
+        if end < len(text):
+            space = text.rfind(" ", start + size // 2, end)
+            end = space + 1 if space != -1 else end
+        pieces.append(text[start:end])
+        start = end
+    return pieces
+
+
+def default_parser():
+    """
+    Return the fastest available BeautifulSoup parser backend: "lxml" when it is installed, otherwise "html.parser".
+    """
+    return "lxml" if importlib.util.find_spec("lxml") else "html.parser"
 
 
 class HTMLToMarkdownConverter:
-    def __init__(self, strip_tags=None, convert_links=True):
+    def __init__(
+        self,
+        strip_tags=None,
+        convert_links=True,
+        model_name=DEFAULT_MODEL_NAME,
+        registry=None,
+        batch_size=None,
+        token_budget=None,
+        cache=None,
+        similarity_threshold=DEFAULT_SIMILARITY_THRESHOLD,
+        window=1,
+        batcher=None,
+        parser=None,
+        dedup="semantic",
+        backend="fp32",
+        num_threads=None,
+        metrics=None,
+        max_tokens=None,
+        long_lines="truncate",
+    ):
         """
         Initializes the object with optional parameters.
 
+        The embedding model is not loaded here. It is fetched from the shared model registry the first time it is needed, so constructing a converter is cheap.
+
         Args:
             strip_tags (list): List of tags to strip from the text. Defaults to ["script", "style", "meta"].
             convert_links (bool): Flag to indicate whether to convert links. Defaults to True.
+            model_name (str): The pretrained embedding checkpoint. Defaults to "jinaai/jina-embeddings-v2-small-en".
+            registry (ModelRegistry, optional): The registry to fetch the model from. Defaults to the process-wide registry.
+            batch_size (int, optional): Number of lines per embedding batch in document-order batching. Defaults to 16. With a `token_budget`, it caps the lines per bucketed batch only when given.
+            token_budget (int, optional): When set, lines are bucketed by token length and batched by a total padded-token budget instead of `batch_size`. Defaults to None.
+            metrics (Metrics, optional): Records per-stage timings and counters. Defaults to NULL_METRICS, which records nothing.
+            max_tokens (int, optional): Token cap per embedded line, so one huge line cannot make its whole batch pay for a very long sequence. Defaults to the tokenizer's maximum length.
+            long_lines (str): How lines over `max_tokens` are embedded: "truncate" embeds a bounded prefix, "window" pools the embeddings of windows that cover the whole line. Defaults to "truncate".
 
         Returns:
             None
         """
         self.strip_tags = strip_tags or ["script", "style", "meta"]
         self.convert_links = convert_links
-        self.tokenizer, self.model = self._initialize_embedding_model()
+        self.model_name = model_name
+        self.registry = registry or get_registry()
+        self.batch_size = batch_size
+        self.token_budget = token_budget
+        self.cache = cache
+        self.similarity_threshold = similarity_threshold
+        self.window = window
+        self.batcher = batcher
+        self.parser = parser or default_parser()
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"dedup must be one of {DEDUP_MODES}, got {dedup!r}")
+        self.dedup = dedup
+        if backend not in INFERENCE_BACKENDS:
+            raise ValueError(
+                f"backend must be one of {INFERENCE_BACKENDS}, got {backend!r}"
+            )
+        self.backend = backend
+        self.num_threads = num_threads
+        self.metrics = metrics or NULL_METRICS
+        if long_lines not in LONG_LINE_MODES:
+            raise ValueError(
+                f"long_lines must be one of {LONG_LINE_MODES}, got {long_lines!r}"
+            )
+        self.max_tokens = max_tokens
+        self.long_lines = long_lines
+        self._strip_tag_names = frozenset(self.strip_tags)
+
+    @property
+    def tokenizer(self):
+        """The shared tokenizer for this converter's embedding model."""
+        return self._initialize_embedding_model()[0]
+
+    @property
+    def model(self):
+        """The shared embedding model for this converter."""
+        return self._initialize_embedding_model()[1]
+
+    @property
+    def cache_namespace(self):
+        """The embedding cache namespace: the model name and every setting that changes the vectors it produces."""
+        return f"{self.model_name}|{self.backend}|{self.max_tokens}|{self.long_lines}"
 
     def _initialize_embedding_model(self):
         """
-        Initializes the embedding model by loading the tokenizer and model from the "jinaai/jina-embeddings-v2-small-en" 
-        pretrained checkpoints. Returns the initialized tokenizer and model.
+        Initializes the embedding model by fetching the tokenizer and model for `model_name` and `backend` from the model
+        registry, which loads the pretrained checkpoints only once per process. Returns the initialized tokenizer and model.
         """
-        tokenizer = AutoTokenizer.from_pretrained(
-            "jinaai/jina-embeddings-v2-small-en", trust_remote_code=True
-        )
-        model = AutoModel.from_pretrained("jinaai/jina-embeddings-v2-small-en")
-        return tokenizer, model
+        if self.num_threads:
+            configure_threads(self.num_threads)
+        return self.registry.get(self.model_name, self.backend)
 
     def mean_pooling(self, model_output, attention_mask):
         """
@@ -47,6 +169,8 @@ class HTMLToMarkdownConverter:
         Returns:
             torch.Tensor: The result of mean pooling.
         """
+        import torch
+
         token_embeddings = model_output[0]
         input_mask_expanded = (
             attention_mask.unsqueeze(-1).expand(token_embeddings.size()).float()
@@ -55,53 +179,239 @@ class HTMLToMarkdownConverter:
         sum_mask = torch.clamp(input_mask_expanded.sum(1), min=1e-9)
         return sum_embeddings / sum_mask
 
-    def _process_embeddings(self, lines, batch_size=16):
+    def _process_embeddings(self, lines, batch_size=None, token_budget=None):
         """
         Process embeddings for the given lines using batch processing.
 
+        When the converter has an embedding cache, only lines that are not already cached are sent to the model.
+
+        Args:
+            lines (list): The list of input lines for which embeddings need to be processed.
+            batch_size (int, optional): The size of each batch for processing. Defaults to the converter's `batch_size`.
+            token_budget (int, optional): Padded-token budget per batch for length-bucketed batching. Defaults to the converter's `token_budget`.
+
+        Returns:
+            torch.Tensor: Normalized batched embeddings, in the order of `lines`.
+        """
+        import torch
+
+        if self.cache is None:
+            return self._compute_embeddings(lines, batch_size, token_budget)
+
+        embeddings = self.cache.get_many(self.cache_namespace, lines)
+        missing = {}
+        for i, embedding in enumerate(embeddings):
+            if embedding is None:
+                missing.setdefault(normalize_line(lines[i]), []).append(i)
+        if missing:
+            missing_lines = [lines[indices[0]] for indices in missing.values()]
+            computed = self._compute_embeddings(missing_lines, batch_size, token_budget)
+            self.cache.put_many(self.cache_namespace, missing_lines, computed)
+            for indices, embedding in zip(missing.values(), computed):
+                for i in indices:
+                    embeddings[i] = embedding
+        return torch.stack(embeddings)
+
+    def _compute_embeddings(self, lines, batch_size=None, token_budget=None):
+        """
+        Run the embedding model over the given lines, bypassing the cache.
+
         Args:
             lines (list): The list of input lines for which embeddings need to be processed.
-            batch_size (int, optional): The size of each batch for processing. Defaults to 16.
+            batch_size (int, optional): The size of each batch for processing. Defaults to the converter's `batch_size`.
+            token_budget (int, optional): Padded-token budget per batch for length-bucketed batching. Defaults to the converter's `token_budget`.
 
         Returns:
-            torch.Tensor: Normalized batched embeddings.
+            torch.Tensor: Normalized batched embeddings, in the order of `lines`.
         """
+        batch_size = batch_size or self.batch_size
+        token_budget = token_budget or self.token_budget
+        if self.max_tokens and self.long_lines == "window":
+            return self._compute_windowed_embeddings(lines, batch_size, token_budget)
+        return self._embed_batches(lines, batch_size, token_budget)
+
+    def _embed_batches(self, lines, batch_size, token_budget=None):
+        """
+        Embed lines in fixed-size batches, or in length-bucketed batches when a token budget is given, where `batch_size`
+        is only an optional cap. Lines longer than `max_tokens` are truncated.
+        """
+        import torch
+
+        if token_budget:
+            return self._process_embeddings_bucketed(lines, token_budget, batch_size)
+
+        batch_size = batch_size or DEFAULT_BATCH_SIZE
+        tokenizer, model = self._initialize_embedding_model()
         batched_embeddings = []
         for i in range(0, len(lines), batch_size):
             batch = lines[i : i + batch_size]
-            encoded_input = self.tokenizer(
-                batch, padding=True, truncation=True, return_tensors="pt"
-            )
-            with torch.no_grad():
-                model_output = self.model(**encoded_input)
-            batch_embeddings = self.mean_pooling(
-                model_output, encoded_input["attention_mask"]
-            )
+            with self.metrics.stage("tokenize"):
+                encoded_input = tokenizer(
+                    batch,
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_tokens,
+                    return_tensors="pt",
+                )
+            self._count_batch(encoded_input["attention_mask"])
+            with self.metrics.stage("forward"), torch.inference_mode():
+                model_output = model(**encoded_input)
+                batch_embeddings = self.mean_pooling(
+                    model_output, encoded_input["attention_mask"]
+                )
             batched_embeddings.extend(batch_embeddings)
 
         return torch.nn.functional.normalize(
             torch.stack(batched_embeddings), p=2, dim=1
         )
 
-    def _remove_redundant_data(self, embeddings, lines):
+    def _compute_windowed_embeddings(self, lines, batch_size, token_budget=None):
+        """
+        Embed lines, splitting lines longer than `max_tokens` into windows whose embeddings are pooled.
+
+        Lines that fit are embedded exactly as without a cap. Each overlong line is cut into windows that fit, and its
+        embedding is the length-weighted mean of its window embeddings, normalized again.
+
+        Args:
+            lines (list): The lines to embed.
+            batch_size (int, optional): The number of lines per batch.
+            token_budget (int, optional): Padded-token budget per batch for length-bucketed batching.
+
+        Returns:
+            torch.Tensor: Normalized embeddings, in the order of `lines`.
+        """
+        import torch
+
+        pieces, owners, weights = self._split_long_lines(lines)
+        embeddings = self._embed_batches(pieces, batch_size, token_budget)
+        if len(pieces) == len(lines):
+            return embeddings
+        weighted = embeddings * torch.tensor(weights, dtype=embeddings.dtype).unsqueeze(1)
+        pooled = embeddings.new_zeros((len(lines), embeddings.shape[1]))
+        pooled.index_add_(0, torch.tensor(owners), weighted)
+        return torch.nn.functional.normalize(pooled, p=2, dim=1)
+
+    def _split_long_lines(self, lines):
+        """
+        Split lines longer than `max_tokens` into windows of roughly `max_tokens` tokens each.
+
+        Returns:
+            tuple: The pieces to embed, the index of the line each piece belongs to, and each piece's pooling weight.
+        """
+        tokenizer = self.tokenizer
+        # A token covers at least a quarter of a character, so shorter lines cannot overflow and are not tokenized here
+        candidates = [i for i, line in enumerate(lines) if 4 * len(line) + 2 > self.max_tokens]
+        lengths = {}
+        if candidates:
+            with self.metrics.stage("tokenize"):
+                encoded = tokenizer([lines[i] for i in candidates], truncation=False)
+            lengths = {
+                i: len(ids)
+                for i, ids in zip(candidates, encoded["input_ids"])
+                if len(ids) > self.max_tokens
+            }
+        pieces, owners, weights = [], [], []
+        for i, line in enumerate(lines):
+            if i not in lengths:
+                pieces.append(line)
+                owners.append(i)
+                weights.append(1.0)
+                continue
+            # Leave room for the special tokens the tokenizer adds to every window
+            windows = -(-lengths[i] // max(1, self.max_tokens - 2))
+            for piece in _split_text(line, windows):
+                pieces.append(piece)
+                owners.append(i)
+                weights.append(float(len(piece)))
+        return pieces, owners, weights
+
+    def _process_embeddings_bucketed(self, lines, token_budget, max_batch_size=None):
+        """
+        Process embeddings with lines sorted into length buckets and batched by a total-token budget.
+
+        Lines are tokenized once without padding, grouped by `plan_token_batches`, padded per batch, and the resulting
+        embeddings are scattered back to the original line order.
+
+        Args:
+            lines (list): The list of input lines for which embeddings need to be processed.
+            token_budget (int): The maximum number of padded tokens per batch.
+            max_batch_size (int, optional): An additional cap on the number of lines per batch.
+
+        Returns:
+            torch.Tensor: Normalized embeddings, in the order of `lines`.
         """
-        Remove redundant data from a list of lines based on cosine similarity between consecutive embeddings.
+        import torch
+
+        tokenizer, model = self._initialize_embedding_model()
+        with self.metrics.stage("tokenize"):
+            encoded_lines = tokenizer(lines, truncation=True, max_length=self.max_tokens)
+        lengths = [len(ids) for ids in encoded_lines["input_ids"]]
+        embeddings = None
+        for indices in plan_token_batches(lengths, token_budget, max_batch_size):
+            with self.metrics.stage("tokenize"):
+                encoded_input = tokenizer.pad(
+                    {key: [values[i] for i in indices] for key, values in encoded_lines.items()},
+                    return_tensors="pt",
+                )
+            self._count_batch(encoded_input["attention_mask"])
+            with self.metrics.stage("forward"), torch.inference_mode():
+                model_output = model(**encoded_input)
+                batch_embeddings = self.mean_pooling(
+                    model_output, encoded_input["attention_mask"]
+                )
+            if embeddings is None:
+                embeddings = batch_embeddings.new_empty(
+                    (len(lines), batch_embeddings.shape[1])
+                )
+            embeddings[indices] = batch_embeddings
+
+        return torch.nn.functional.normalize(embeddings, p=2, dim=1)
+
+    def _count_batch(self, attention_mask):
+        """
+        Record the lines, real tokens and padded tokens of one embedding batch.
+        """
+        if self.metrics.enabled:
+            self.metrics.count("embedded_lines", attention_mask.shape[0])
+            self.metrics.count("tokens", int(attention_mask.sum()))
+            self.metrics.count("padded_tokens", attention_mask.numel())
+
+    def _remove_redundant_data(self, embeddings, lines, needs_embedding=None):
+        """
+        Remove redundant data from a list of lines based on cosine similarity between nearby embeddings.
+
+        Each line is compared with the `window` lines before it in one vectorized pass, and dropped when any similarity
+        reaches `similarity_threshold`. When `needs_embedding` is given, `embeddings` only holds rows for the lines it marks.
+        Unmarked (structural) lines are always kept and reset the comparison window.
 
         Parameters:
             embeddings (torch.Tensor): A tensor of embeddings.
             lines (List[str]): A list of strings representing lines of text.
+            needs_embedding (List[bool], optional): Marks the lines that have a row in `embeddings`. Defaults to every line.
 
         Returns:
             str: A string representing the cleaned lines of text with redundant data removed.
         """
-        cleaned_lines = [lines[0]]  # Always include the first line
-        for i in range(1, len(lines)):
-            similarity = torch.cosine_similarity(
-                embeddings[i].unsqueeze(0), embeddings[i - 1].unsqueeze(0)
+        keep = self._keep_mask(embeddings, lines, needs_embedding)
+        return "\n".join(compress(lines, keep.tolist()))
+
+    def _keep_mask(self, embeddings, lines, needs_embedding=None):
+        """
+        Return a boolean tensor marking the lines that `_remove_redundant_data` keeps.
+        """
+        import torch
+
+        if needs_embedding is None:
+            needs_embedding = [True] * len(lines)
+        mask = torch.tensor(needs_embedding, dtype=torch.bool)
+        keep = torch.ones(len(lines), dtype=torch.bool)
+        if mask.any():
+            # Every structural line starts a new segment of content lines
+            segments = torch.cumsum(~mask, dim=0)[mask]
+            keep[mask] = ~redundant_mask(
+                embeddings, segments, self.similarity_threshold, self.window
             )
-            if similarity.item() < 0.86899:  # Threshold for redundancy
-                cleaned_lines.append(lines[i])
-        return "\n".join(cleaned_lines)
+        return keep
 
     def convert(self, html_content):
         """
@@ -116,33 +426,248 @@ class HTMLToMarkdownConverter:
             Exception: If an error occurs during the conversion process.
         """
         try:
-            curated_html = self._curate_content(html_content)
-            markdown_content = md(
-                curated_html,
-                strip_tags=self.strip_tags,
-                convert_links=self.convert_links,
-            ).strip()
-            lines = markdown_content.split("\n")
-            embeddings = self._process_embeddings(lines)
-            return self._remove_redundant_data(embeddings, lines)
+            return self.deduplicate(self.to_markdown(html_content))
         except Exception as e:
             logging.error("Error during conversion: %s", e)
             raise
 
+    def convert_stream(self, html_content, window_lines=1024, chunk_size=1 << 16):
+        """
+        Convert HTML content to markdown section by section, yielding markdown pieces as they are ready.
+
+        The document is parsed incrementally (see `streaming.iter_html_sections`) and each section is curated and
+        converted on its own. Lines are deduplicated in windows of `window_lines` lines, carrying only the last
+        line and the last `window` embeddings across window boundaries, so the result matches `convert` while peak
+        memory depends on the largest section and the window size rather than on the size of the document. Without
+        lxml the document is converted in one section, and only deduplication is windowed.
+
+        Args:
+            html_content (str or iterable): The HTML content, or an iterable of str or bytes chunks.
+            window_lines (int): The number of markdown lines deduplicated at a time. Defaults to 1024.
+            chunk_size (int): The number of characters parsed at a time when `html_content` is a string. Defaults to 64 KiB.
+
+        Yields:
+            str: Markdown pieces that concatenate to the deduplicated markdown.
+
+        Raises:
+            ValueError: If `window_lines` is less than 1.
+        """
+        if window_lines < 1:
+            raise ValueError(f"window_lines must be at least 1, got {window_lines}")
+        if importlib.util.find_spec("lxml") is not None:
+            sections = iter_html_sections(html_content, chunk_size)
+        elif isinstance(html_content, (str, bytes)):
+            sections = [html_content]
+        else:
+            sections = [
+                "".join(
+                    chunk.decode("utf-8") if isinstance(chunk, bytes) else chunk
+                    for chunk in html_content
+                )
+            ]
+        carry = {}
+        pending = []
+        started = False
+        emitted = False
+        for section in sections:
+            markdown_content = self.to_markdown(section)
+            if not markdown_content:
+                continue
+            if started:
+                pending.append("")
+            started = True
+            pending.extend(markdown_content.split("\n"))
+            while len(pending) >= window_lines:
+                kept = self._deduplicate_window(pending[:window_lines], carry)
+                pending = pending[window_lines:]
+                if kept:
+                    yield ("\n" if emitted else "") + "\n".join(kept)
+                    emitted = True
+        kept = self._deduplicate_window(pending, carry) if pending else []
+        if kept:
+            yield ("\n" if emitted else "") + "\n".join(kept)
+
+    def _deduplicate_window(self, lines, carry):
+        """
+        Deduplicate one window of a streamed document, updating `carry`, the state passed from window to window.
+
+        `carry` holds the last line kept by the lexical pre-pass and, in "semantic" mode, the structural flags and
+        embeddings of the trailing lines that later lines can still be compared with.
+
+        Returns:
+            list: The kept lines of the window.
+        """
+        if self.dedup == "none":
+            return lines
+        previous = carry.get("previous")
+        with self.metrics.stage("prefilter"):
+            lines, needs_embedding = prefilter_lines(
+                lines if previous is None else [previous] + lines
+            )
+        if previous is not None:
+            lines, needs_embedding = lines[1:], needs_embedding[1:]
+        if not lines:
+            return lines
+        carry["previous"] = lines[-1]
+        self.metrics.count("lines", len(lines))
+        if self.dedup != "semantic":
+            return lines
+        import torch
+
+        content_lines = [line for line, needed in zip(lines, needs_embedding) if needed]
+        tail_needs, tail_embeddings = carry.get("tail", ([], None))
+        needs = tail_needs + needs_embedding
+        if content_lines:
+            with self.metrics.stage("embed"):
+                embeddings = self._embed_lines(content_lines)
+            if tail_embeddings is not None:
+                embeddings = torch.cat([tail_embeddings, embeddings])
+        else:
+            embeddings = tail_embeddings
+        keep = [True] * len(needs)
+        if embeddings is not None:
+            with self.metrics.stage("dedup"):
+                keep = self._keep_mask(embeddings, needs, needs).tolist()
+
+        # Later lines are only compared with the last `window` content lines, and never across a structural line
+        start = len(needs)
+        content_seen = 0
+        while start > 0 and content_seen < self.window:
+            start -= 1
+            if not needs[start]:
+                break
+            content_seen += 1
+        carry["tail"] = (
+            needs[start:],
+            embeddings[embeddings.shape[0] - content_seen :] if content_seen else None,
+        )
+        return list(compress(lines, keep[len(tail_needs) :]))
+
+    def to_markdown(self, html_content):
+        """
+        Curate the given HTML content and convert it to markdown, without any semantic deduplication.
+
+        The curated tree is handed to markdownify directly instead of being serialized and parsed again. This step never
+        touches the embedding model, so it can run in worker processes.
+
+        Args:
+            html_content (str): The HTML content to be converted.
+
+        Returns:
+            str: The markdown content.
+        """
+        markdown_converter = MarkdownConverter(
+            strip_tags=self.strip_tags, convert_links=self.convert_links
+        )
+        try:
+            soup = self._curate_soup(html_content)
+        except Exception as e:
+            logging.error("Error in curating HTML content: %s", e)
+            with self.metrics.stage("markdownify"):
+                return markdown_converter.convert(html_content).strip()
+        with self.metrics.stage("markdownify"):
+            return markdown_converter.convert_soup(soup).strip()
+
+    def deduplicate(self, markdown_content):
+        """
+        Remove redundant lines from markdown content according to the converter's `dedup` mode: the lexical pre-pass
+        followed by line embeddings ("semantic"), the lexical pre-pass alone ("lexical"), or nothing ("none").
+
+        Args:
+            markdown_content (str): The markdown content produced by `to_markdown`.
+
+        Returns:
+            str: The markdown content with redundant lines removed.
+        """
+        if self.dedup == "semantic":
+            return self.deduplicate_detailed(markdown_content)[0]
+        if self.dedup == "none":
+            return markdown_content
+        with self.metrics.stage("prefilter"):
+            lines, _ = prefilter_lines(markdown_content.split("\n"))
+        self.metrics.count("lines", len(lines))
+        return "\n".join(lines)
+
+    def deduplicate_detailed(self, markdown_content):
+        """
+        Remove redundant lines like `deduplicate`, and also return the kept content lines with their embeddings.
+
+        Args:
+            markdown_content (str): The markdown content produced by `to_markdown`.
+
+        Returns:
+            tuple: The deduplicated markdown, the kept content lines, and a torch.Tensor with one normalized embedding
+            per kept content line. Outside "semantic" mode no lines are embedded, so the lines are empty and the
+            embeddings are None.
+        """
+        import torch
+
+        if self.dedup != "semantic":
+            return self.deduplicate(markdown_content), [], None
+        with self.metrics.stage("prefilter"):
+            lines, needs_embedding = prefilter_lines(markdown_content.split("\n"))
+        self.metrics.count("lines", len(lines))
+        content_lines = [
+            line for line, needed in zip(lines, needs_embedding) if needed
+        ]
+        if not content_lines:
+            return "\n".join(lines), [], None
+        with self.metrics.stage("embed"):
+            embeddings = self._embed_lines(content_lines)
+        with self.metrics.stage("dedup"):
+            keep = self._keep_mask(embeddings, lines, needs_embedding)
+        kept_rows = keep[torch.tensor(needs_embedding, dtype=torch.bool)]
+        return (
+            "\n".join(compress(lines, keep.tolist())),
+            list(compress(content_lines, kept_rows.tolist())),
+            embeddings[kept_rows],
+        )
+
+    def _embed_lines(self, lines):
+        """
+        Embed lines through the shared micro-batcher when one is configured, otherwise directly.
+        """
+        if self.batcher is not None:
+            return self.batcher.embed(lines)
+        return self._process_embeddings(lines)
+
+    def markdown_options(self):
+        """
+        Return the keyword arguments needed to rebuild a converter that produces the same markdown in another process.
+
+        Returns:
+            dict: Constructor arguments for HTMLToMarkdownConverter.
+        """
+        return {
+            "strip_tags": self.strip_tags,
+            "convert_links": self.convert_links,
+            "parser": self.parser,
+        }
+
     def _curate_content(self, html):
         """
         Curates the HTML content by parsing it with BeautifulSoup, removing selectors, 
         and stripping tags. Returns the curated HTML content as a string. 
         """
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            self._remove_selectors(soup)
-            self._strip_tags(soup)
-            return str(soup)
+            return str(self._curate_soup(html))
         except Exception as e:
             logging.error("Error in curating HTML content: %s", e)
             return html
 
+    def _curate_soup(self, html):
+        """
+        Parses the HTML content with the configured parser backend and removes the selectors and stripped tags
+        in a single traversal. Returns the curated BeautifulSoup object.
+        """
+        with self.metrics.stage("parse"):
+            soup = BeautifulSoup(html, self.parser)
+        with self.metrics.stage("curate"):
+            self._prune(soup, _REMOVED_SELECTOR, self._strip_tag_names)
+            # Decomposing elements leaves adjacent text nodes; merge them so markdownify sees each run as one string
+            soup.smooth()
+        return soup
+
     def _remove_selectors(self, soup):
         """
         Remove specified selectors from the given BeautifulSoup object.
@@ -153,23 +678,7 @@ class HTMLToMarkdownConverter:
         Returns:
         - None
         """
-        selectors = [
-            "header",
-            "footer",
-            "nav",
-            ".navbar",
-            ".menu",
-            ".footer-links",
-            "#sidebar",
-            "#ad-container",
-            'div[class*="cookie"], div[class*="banner"]',
-            "aside",
-            ".pagination",
-            "form",
-        ]
-        for selector in selectors:
-            for element in soup.select(selector):
-                element.decompose()
+        self._prune(soup, _REMOVED_SELECTOR, frozenset())
 
     def _strip_tags(self, soup):
         """
@@ -181,6 +690,29 @@ class HTMLToMarkdownConverter:
         Returns:
             None
         """
-        for tag in self.strip_tags:
-            for s in soup(tag):
-                s.decompose()
+        self._prune(soup, None, self._strip_tag_names)
+
+    def _prune(self, soup, selector, tag_names):
+        """
+        Decompose every element that matches the compiled selector or whose name is in `tag_names`, walking the tree
+        once and skipping the subtrees of removed elements.
+
+        Parameters:
+            soup (BeautifulSoup): The BeautifulSoup object to prune.
+            selector (soupsieve.SoupSieve): A compiled selector, or None to match by tag name only.
+            tag_names (frozenset): Tag names to remove.
+
+        Returns:
+            None
+        """
+        stack = [soup]
+        while stack:
+            for child in list(stack.pop().children):
+                if not isinstance(child, Tag):
+                    continue
+                if child.name in tag_names or (
+                    selector is not None and selector.match(child)
+                ):
+                    child.decompose()
+                else:
+                    stack.append(child)
@@ -0,0 +1,199 @@
+"""
+This module provides corpus-wide near-duplicate removal for the HTML to Markdown conversion project.
+
+Redundancy removal in HTMLToMarkdownConverter only looks inside one document. The same boilerplate paragraphs, however, show up on hundreds of pages of a crawl. CorpusDeduplicator keeps an incremental MinHash LSH index over the paragraphs already emitted and drops new paragraphs whose estimated Jaccard similarity to an indexed paragraph reaches a threshold. Paragraphs inside fenced code blocks are never deduplicated.
+
+The index holds at most `max_entries` paragraphs. Once full, the oldest paragraphs are evicted, so memory stays bounded however large the crawl is. Each indexed paragraph costs about 1.5 KB with the default 64 permutations and 16 bands, so the default of 200,000 entries keeps the index around 300 MB.
+
+Classes:
+    CorpusDeduplicator: An incremental near-duplicate filter over markdown paragraphs.
+"""
+
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+
+# A Mersenne prime; hashes and coefficients stay below it so products fit in uint64
+_PRIME = (1 << 31) - 1
+_FENCE = re.compile(r"^ {0,3}(```|~~~)", re.MULTILINE)
+
+
+class CorpusDeduplicator:
+    """
+    Removes paragraphs that near-duplicate a paragraph seen earlier in the corpus.
+
+    Attributes:
+        threshold (float): The estimated Jaccard similarity at or above which a paragraph is dropped.
+        num_perm (int): The number of MinHash permutations per signature.
+        bands (int): The number of LSH bands the signature is split into.
+        max_entries (int): The maximum number of paragraphs kept in the index.
+        min_words (int): Paragraphs with fewer words are always kept and never indexed.
+        shingle_size (int): The number of words per shingle.
+
+    Methods:
+        filter(markdown): Returns the markdown with near-duplicate paragraphs removed.
+        is_duplicate(paragraph): Checks a paragraph against the index and indexes it if it is new.
+        stats(): Returns the number of paragraphs seen, dropped and indexed.
+    """
+
+    def __init__(
+        self,
+        threshold=0.8,
+        num_perm=64,
+        bands=16,
+        max_entries=200_000,
+        min_words=8,
+        shingle_size=3,
+        seed=0,
+    ):
+        """
+        Initializes the deduplicator.
+
+        Args:
+            threshold (float): Estimated Jaccard similarity at or above which a paragraph is dropped. Defaults to 0.8.
+            num_perm (int): Number of MinHash permutations. Must be divisible by `bands`. Defaults to 64.
+            bands (int): Number of LSH bands. More bands find more candidates at lower similarity. Defaults to 16.
+            max_entries (int): Maximum number of indexed paragraphs before the oldest are evicted. Defaults to
+                200,000, about 300 MB of index.
+            min_words (int): Paragraphs with fewer words, such as headings, are always kept. Defaults to 8.
+            shingle_size (int): Number of words per shingle. Defaults to 3.
+            seed (int): Seed for the permutation coefficients. Defaults to 0.
+
+        Returns:
+            None
+        """
+        import numpy
+
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.max_entries = max_entries
+        self.min_words = min_words
+        self.shingle_size = shingle_size
+        generator = numpy.random.default_rng(seed)
+        self._a = generator.integers(1, _PRIME, (num_perm, 1), dtype=numpy.uint64)
+        self._b = generator.integers(0, _PRIME, (num_perm, 1), dtype=numpy.uint64)
+        # Signatures are kept as raw uint32 bytes and each band bucket holds only its newest entry, so an indexed
+        # paragraph costs a fixed, small amount of memory
+        self._signatures = OrderedDict()
+        self._buckets = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.seen = 0
+        self.dropped = 0
+
+    def filter(self, markdown):
+        """
+        Remove paragraphs that near-duplicate paragraphs seen earlier in the corpus. Paragraphs inside or opening a
+        fenced code block are kept as they are.
+
+        Args:
+            markdown (str): The markdown content of one document.
+
+        Returns:
+            str: The markdown with duplicate paragraphs removed.
+        """
+        kept = []
+        in_fence = False
+        for paragraph in markdown.split("\n\n"):
+            fences = len(_FENCE.findall(paragraph))
+            if in_fence or fences or not self.is_duplicate(paragraph):
+                kept.append(paragraph)
+            in_fence ^= fences % 2 == 1
+        return "\n\n".join(kept)
+
+    def is_duplicate(self, paragraph):
+        """
+        Check a paragraph against the index, adding it to the index if it is not a duplicate.
+
+        Args:
+            paragraph (str): The paragraph text.
+
+        Returns:
+            bool: True if the paragraph near-duplicates an indexed paragraph.
+        """
+        import numpy
+
+        words = re.findall(r"\w+", paragraph.lower())
+        if len(words) < self.min_words:
+            return False
+        signature = self._signature(words)
+        band_keys = self._band_keys(signature)
+        with self._lock:
+            self.seen += 1
+            candidates = {self._buckets[key] for key in band_keys if key in self._buckets}
+            for candidate in candidates:
+                indexed = numpy.frombuffer(self._signatures[candidate], dtype=numpy.uint32)
+                if (indexed == signature).mean() >= self.threshold:
+                    self.dropped += 1
+                    return True
+            self._add(signature, band_keys)
+            return False
+
+    def stats(self):
+        """
+        Return the deduplication counters.
+
+        Returns:
+            dict: The number of paragraphs seen, dropped and currently indexed.
+        """
+        with self._lock:
+            return {
+                "seen": self.seen,
+                "dropped": self.dropped,
+                "indexed": len(self._signatures),
+            }
+
+    def _signature(self, words):
+        """
+        Compute the MinHash signature of a paragraph's word shingles as a uint32 array.
+        """
+        import numpy
+
+        size = min(self.shingle_size, len(words))
+        shingles = {
+            " ".join(words[i : i + size]) for i in range(len(words) - size + 1)
+        }
+        hashes = numpy.fromiter(
+            (
+                int.from_bytes(
+                    hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little"
+                )
+                % _PRIME
+                for s in shingles
+            ),
+            dtype=numpy.uint64,
+            count=len(shingles),
+        )
+        return ((self._a * hashes + self._b) % _PRIME).min(axis=1).astype(numpy.uint32)
+
+    def _band_keys(self, signature):
+        """
+        Split a signature into bands and return one integer bucket key per band.
+        """
+        rows = self.num_perm // self.bands
+        return [
+            hash((band, signature[band * rows : (band + 1) * rows].tobytes()))
+            for band in range(self.bands)
+        ]
+
+    def _add(self, signature, band_keys):
+        """
+        Add a signature to the index, evicting the oldest entries beyond `max_entries`.
+        """
+        import numpy
+
+        entry_id = self._next_id
+        self._next_id += 1
+        self._signatures[entry_id] = signature.tobytes()
+        for key in band_keys:
+            self._buckets[key] = entry_id
+        while len(self._signatures) > self.max_entries:
+            old_id, old_signature = self._signatures.popitem(last=False)
+            for key in self._band_keys(numpy.frombuffer(old_signature, dtype=numpy.uint32)):
+                if self._buckets.get(key) == old_id:
+                    del self._buckets[key]
@@ -1,17 +1,84 @@
 """
-This module is responsible for downloading the Jina library, which is used for processing text embeddings in the HTML to Markdown conversion project.
+This module prefetches the Jina embeddings model into a local artifact for the HTML to Markdown conversion project.
 
-It uses the transformers library to download the Jina embeddings model and tokenizer. The model and tokenizer are then used in other parts of the project to process text embeddings.
+The tokenizer and model are downloaded once, pinned to a revision, and saved with safetensors weights under the artifact root (see `registry.default_artifact_root`). ModelRegistry then loads them from disk with memory-mapped weights and without resolving anything on the hub, which cuts worker start-up time and peak memory, and lets conversions run offline.
 
-The module contains the following components:
-    - AutoTokenizer: Used to tokenize the text data.
-    - AutoModel: Used to create the Jina embeddings model.
+Usage:
+    python download_jina.py [--model jinaai/jina-embeddings-v2-small-en] [--revision main] [--root DIR]
+
+Functions:
+    prefetch(model_name, revision, root): Downloads a model and stores it as a local artifact.
 """
 
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+
+from registry import ARTIFACT_FILE, DEFAULT_MODEL_NAME, artifact_path
+
+
+def prefetch(model_name=DEFAULT_MODEL_NAME, revision="main", root=None):
+    """
+    Download a model and its tokenizer and store them as a local artifact.
+
+    The artifact is written to a temporary directory and moved into place once complete, so processes that start
+    while it is being written never see a partial artifact.
+
+    Args:
+        model_name (str): The pretrained checkpoint name. Defaults to the Jina small model.
+        revision (str): The hub revision (branch, tag or commit) to pin. Defaults to "main".
+        root (str, optional): The artifact root. Defaults to `registry.default_artifact_root()`.
+
+    Returns:
+        str: The artifact directory.
+    """
+    from transformers import AutoTokenizer, AutoModel
+
+    path = artifact_path(model_name, revision, root)
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    logging.info("Prefetching %s at revision %s", model_name, revision)
+    tokenizer = AutoTokenizer.from_pretrained(model_name, revision=revision, trust_remote_code=True)
+    model = AutoModel.from_pretrained(model_name, revision=revision)
+    tokenizer.save_pretrained(temporary_path)
+    model.save_pretrained(temporary_path, safe_serialization=True)
+    with open(os.path.join(temporary_path, ARTIFACT_FILE), "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "model_name": model_name,
+                "revision": revision,
+                "commit_hash": getattr(model.config, "_commit_hash", None),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            file,
+            indent=2,
+        )
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(temporary_path, path)
+    logging.info("Stored %s in %s", model_name, path)
+    return path
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line arguments for the prefetch command.
+
+    :param argv: Argument list to parse. Defaults to sys.argv.
+    :return: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Download an embedding model once and store it as a local artifact for offline, memory-mapped loading."
+    )
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="The pretrained checkpoint name.")
+    parser.add_argument("--revision", default="main", help="The hub revision (branch, tag or commit) to pin.")
+    parser.add_argument("--root", help="The artifact root. Defaults to ~/.cache/context_converter/models.")
+    return parser.parse_args(argv)
 
-from transformers import AutoTokenizer, AutoModel
 
-tokenizer = AutoTokenizer.from_pretrained(
-    "jinaai/jina-embeddings-v2-small-en", trust_remote_code=True
-)
-model = AutoModel.from_pretrained("jinaai/jina-embeddings-v2-small-en")
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    print(prefetch(args.model, args.revision, args.root))
@@ -0,0 +1,177 @@
+"""
+This module provides a memory-mapped store for the line embeddings computed during conversion in the HTML to Markdown conversion project.
+
+Semantic deduplication embeds every content line and, without a store, throws the embeddings away, so a RAG pipeline that indexes the output has to embed the same text again. EmbeddingStore keeps the normalized embeddings of the lines that survive deduplication and writes them next to the markdown output:
+
+    - `<base>.npy`: one float32 or float16 row per kept line, as a standard NumPy array file that can be memory-mapped without copying.
+    - `<base>.jsonl`: one record per entry with its title, url, first row and kept lines, mapping entries and lines to rows. Records of sharded runs also carry the entry's input position, so shard stores can be merged in input order.
+
+Classes:
+    EmbeddingStore: Appends the kept line embeddings of converted entries to the store files.
+    EmbeddingCollector: Holds the kept line embeddings of converted entries in memory, for the run manifest.
+
+Functions:
+    load_embeddings(base_path): Memory-maps the embeddings and reads the index.
+"""
+
+import json
+import struct
+
+STORE_DTYPES = {"float32": "<f4", "float16": "<f2"}
+
+# The .npy header is written with a placeholder shape and rewritten on close, so it has a fixed, padded size
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_HEADER_SIZE = 128
+
+
+class EmbeddingStore:
+    """
+    Writes the embeddings of kept lines to a memory-mappable array file with an entry and line index.
+
+    Attributes:
+        base_path (str): The path the ".npy" and ".jsonl" files are named after.
+        dtype (str): "float32" or "float16".
+        rows (int): The number of embedding rows written so far.
+        dim (int): The embedding dimension, known after the first entry with embeddings.
+
+    Methods:
+        add(entry, lines, embeddings, position): Appends the embeddings of one entry's kept lines.
+        close(): Finalizes the array header and closes the files.
+    """
+
+    def __init__(self, base_path, dtype="float32"):
+        """
+        Opens the store files, replacing any existing ones.
+
+        Args:
+            base_path (str): The path to name the files after, for example "output.md.embeddings".
+            dtype (str): The stored precision, "float32" or "float16". Defaults to "float32".
+
+        Returns:
+            None
+        """
+        if dtype not in STORE_DTYPES:
+            raise ValueError(f"dtype must be one of {tuple(STORE_DTYPES)}, got {dtype!r}")
+        self.base_path = base_path
+        self.dtype = dtype
+        self.rows = 0
+        self.dim = 0
+        self._array = open(f"{base_path}.npy", "wb")
+        self._array.write(self._header())
+        self._index = open(f"{base_path}.jsonl", "w", encoding="utf-8")
+
+    def add(self, entry, lines, embeddings, position=None):
+        """
+        Append the embeddings of one entry's kept lines and index them.
+
+        Args:
+            entry (dict): The dataset entry, used for the title and url of the index record.
+            lines (list): The kept lines, in document order.
+            embeddings (torch.Tensor): One normalized embedding row per line.
+            position (int, optional): The entry's position in the whole input, added to the index record. Defaults to
+                None.
+
+        Returns:
+            None
+        """
+        import torch
+
+        if not lines:
+            return
+        if not self.dim:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {embeddings.shape[1]} does not match the store's {self.dim}"
+            )
+        torch_dtype = torch.float16 if self.dtype == "float16" else torch.float32
+        # clone gives the rows their own storage, so exactly these bytes are written
+        rows = embeddings.detach().to(torch_dtype).contiguous().clone()
+        self._array.write(bytes(rows.untyped_storage()))
+        record = {
+            "title": entry.get("title", "Untitled"),
+            "url": entry.get("url", ""),
+            "row": self.rows,
+            "lines": list(lines),
+        }
+        if position is not None:
+            record["position"] = position
+        self._index.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.rows += len(lines)
+
+    def close(self):
+        """
+        Rewrite the array header with the final shape and close the files.
+        """
+        if self._array is None:
+            return
+        self._array.seek(0)
+        self._array.write(self._header())
+        self._array.close()
+        self._index.close()
+        self._array = self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _header(self):
+        """
+        Return the fixed-size NumPy format 1.0 header for the rows written so far.
+        """
+        header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d, %d), }" % (
+            STORE_DTYPES[self.dtype],
+            self.rows,
+            self.dim,
+        )
+        size = _NPY_HEADER_SIZE - len(_NPY_MAGIC) - 2
+        return _NPY_MAGIC + struct.pack("<H", size) + header.ljust(size - 1).encode("latin1") + b"\n"
+
+
+class EmbeddingCollector:
+    """
+    Collects the kept line embeddings of converted entries in memory, with the same `add` method as EmbeddingStore.
+
+    Incremental runs record each entry's embeddings next to its manifest part instead of appending them to the store
+    as they are converted, so that the store can be assembled in input order together with the output.
+
+    Methods:
+        add(entry, lines, embeddings, position): Keeps the embeddings of one entry's kept lines.
+        get(entry): Returns the kept lines and embeddings of an entry.
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def add(self, entry, lines, embeddings, position=None):
+        """
+        Keep the embeddings of one entry's kept lines. The position is not needed and ignored.
+        """
+        self._entries[id(entry)] = (list(lines), embeddings)
+
+    def get(self, entry):
+        """
+        Return the kept lines and embeddings of an entry, or an empty list and None if it has none.
+        """
+        return self._entries.get(id(entry), ([], None))
+
+
+def load_embeddings(base_path):
+    """
+    Memory-map the embeddings of a store and read its index.
+
+    Args:
+        base_path (str): The path the store files are named after.
+
+    Returns:
+        tuple: A read-only numpy.memmap with one row per kept line, and the list of index records. Record `i` covers
+        rows `record["row"]` to `record["row"] + len(record["lines"])`.
+    """
+    import numpy
+
+    embeddings = numpy.load(f"{base_path}.npy", mmap_mode="r")
+    with open(f"{base_path}.jsonl", "r", encoding="utf-8") as file:
+        index = [json.loads(line) for line in file]
+    return embeddings, index
@@ -0,0 +1,178 @@
+"""
+This module provides the execution engine behind DatasetFormatter in the HTML to Markdown conversion project.
+
+Converting an entry has two very different halves. HTML curation and markdownify are pure-Python and CPU-bound, so they run in a process pool to use every core. Semantic deduplication runs the embedding model, so it runs in a single dedicated inference thread that owns the model, or feeds a shared EmbeddingMicroBatcher when the converter has one. The event loop only schedules work, and a semaphore bounds how many entries are in flight at once.
+
+Classes:
+    ConversionEngine: Runs HTMLToMarkdownConverter conversions concurrently.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from converter import HTMLToMarkdownConverter
+from metrics import NULL_METRICS, Metrics
+
+_worker_converters = {}
+
+
+def _to_markdown(html_content, options, timed=False):
+    """
+    Convert HTML to markdown in a worker process, reusing one converter per set of options.
+
+    When `timed` is set, returns the markdown together with the stage timings of the conversion so the parent process
+    can merge them into its own metrics.
+    """
+    key = repr(sorted(options.items()))
+    converter = _worker_converters.get(key)
+    if converter is None:
+        converter = _worker_converters[key] = HTMLToMarkdownConverter(**options)
+    if not timed:
+        return converter.to_markdown(html_content)
+    converter.metrics = Metrics()
+    try:
+        markdown_content = converter.to_markdown(html_content)
+        return markdown_content, converter.metrics.summary()
+    finally:
+        converter.metrics = NULL_METRICS
+
+
+class ConversionEngine:
+    """
+    Runs conversions concurrently with a process pool for markdown and a dedicated inference thread.
+
+    Attributes:
+        converter (HTMLToMarkdownConverter): The converter whose settings and embedding model are used.
+        workers (int): The number of markdown worker processes. 0 runs markdown conversion in a thread instead.
+        max_concurrency (int): The maximum number of entries converted at once.
+        stream_threshold (int): Documents longer than this many characters are converted with
+            `HTMLToMarkdownConverter.convert_stream`, so their memory stays bounded.
+
+    Methods:
+        convert(html_content, detailed): Asynchronously converts one HTML document.
+        close(): Shuts down the worker pools.
+    """
+
+    def __init__(self, converter, workers=None, max_concurrency=None, stream_threshold=None):
+        """
+        Initializes the engine. Worker pools are started on first use.
+
+        Args:
+            converter (HTMLToMarkdownConverter): The converter to run.
+            workers (int, optional): Number of markdown worker processes. Defaults to the number of CPUs.
+            max_concurrency (int, optional): Maximum entries in flight. Defaults to four per markdown worker.
+            stream_threshold (int, optional): Stream documents longer than this many characters. Defaults to never.
+
+        Returns:
+            None
+        """
+        self.converter = converter
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_concurrency = max_concurrency or 4 * max(self.workers, 1)
+        self.stream_threshold = stream_threshold
+        self._markdown_pool = None
+        self._inference = None
+        self._semaphore = None
+
+    async def convert(self, html_content, detailed=False):
+        """
+        Asynchronously convert the given HTML content to deduplicated markdown.
+
+        Args:
+            html_content (str): The HTML content to be converted.
+            detailed (bool): Whether to also return the kept lines and their embeddings, as
+                `HTMLToMarkdownConverter.deduplicate_detailed` does. Defaults to False.
+
+        Returns:
+            str: The markdown content with redundant data removed, or a (markdown, lines, embeddings) tuple when
+            `detailed` is set.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        loop = asyncio.get_running_loop()
+        metrics = self.converter.metrics
+        async with self._semaphore:
+            if (
+                self.stream_threshold
+                and not detailed
+                and len(html_content or "") > self.stream_threshold
+            ):
+                # Huge pages are streamed in the inference thread instead of being shipped to a worker whole
+                return await loop.run_in_executor(
+                    self._inference_executor(), self._convert_streamed, html_content
+                )
+            markdown_content = await loop.run_in_executor(
+                self._markdown_executor(),
+                _to_markdown,
+                html_content,
+                self.converter.markdown_options(),
+                metrics.enabled,
+            )
+            if metrics.enabled:
+                markdown_content, summary = markdown_content
+                metrics.merge(summary)
+            deduplicate = (
+                self.converter.deduplicate_detailed
+                if detailed
+                else self.converter.deduplicate
+            )
+            return await loop.run_in_executor(
+                self._inference_executor(), deduplicate, markdown_content
+            )
+
+    def _convert_streamed(self, html_content):
+        """
+        Convert one document with `HTMLToMarkdownConverter.convert_stream`.
+        """
+        self.converter.metrics.count("streamed_entries")
+        return "".join(self.converter.convert_stream(html_content))
+
+    def close(self):
+        """
+        Shut down the worker pools, waiting for running work to finish.
+        """
+        for pool in (self._markdown_pool, self._inference):
+            if pool is not None:
+                pool.shutdown()
+        self._markdown_pool = self._inference = None
+        self._semaphore = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _markdown_executor(self):
+        """
+        Return the markdown pool, starting it on first use.
+        """
+        if self._markdown_pool is None:
+            if self.workers:
+                logging.info("Starting %d markdown worker processes", self.workers)
+                self._markdown_pool = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            else:
+                self._markdown_pool = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="markdown"
+                )
+        return self._markdown_pool
+
+    def _inference_executor(self):
+        """
+        Return the inference pool, starting it on first use.
+
+        Without a micro-batcher the pool is a single thread that owns the model. With one, every in-flight entry gets a
+        thread so their lines can be coalesced into shared batches by the batcher.
+        """
+        if self._inference is None:
+            workers = self.max_concurrency if self.converter.batcher else 1
+            self._inference = ThreadPoolExecutor(
+                max_workers=workers, thread_name_prefix="embedding"
+            )
+        return self._inference
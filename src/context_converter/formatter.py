@@ -19,6 +19,12 @@ class DatasetFormatter:
     Attributes:
         converter (HTMLToMarkdownConverter): An instance of \
             HTMLToMarkdownConverter for HTML to Markdown conversion.
+        deduplicator (CorpusDeduplicator): An optional corpus-wide \
+            near-duplicate filter applied after conversion.
+        engine (ConversionEngine): An optional execution engine that \
+            converts entries concurrently.
+        store (EmbeddingStore): An optional store that receives the \
+            embeddings of the lines kept in each entry.
 
     Methods:
         format_entry(entry): Formats a single dataset entry into Markdown.
@@ -26,19 +32,27 @@ class DatasetFormatter:
             Markdown content with headers and links.
         format_dataset(data): Formats an entire dataset \
             of entries into Markdown.
+        format_entries(data): Formats an entire dataset \
+            into one Markdown string per entry.
     """
 
-    def __init__(self, converter):
+    def __init__(self, converter, deduplicator=None, engine=None, store=None):
         """
         Initializes the class with a converter object.
 
         Parameters:
             converter: The converter object to be used by the class.
+            deduplicator: An optional CorpusDeduplicator that removes paragraphs already emitted for earlier entries.
+            engine: An optional ConversionEngine. Without one, entries are converted inline on the event loop.
+            store: An optional EmbeddingStore. Kept line embeddings of each formatted entry are appended to it in input order.
 
         Returns:
             None
         """
         self.converter = converter
+        self.deduplicator = deduplicator
+        self.engine = engine
+        self.store = store
 
     async def format_entry(self, entry):
         """
@@ -51,13 +65,70 @@ class DatasetFormatter:
         Returns:
             The structured markdown content of the entry
         """
+        with self.converter.metrics.stage("format_entry"):
+            result = await self._convert_entry(entry)
+            return self._store_entry(entry, result)
+
+    async def _convert_entry(self, entry):
+        """
+        Convert an entry's HTML to markdown, returning None if the conversion fails.
+
+        With an embedding store, the markdown is returned together with the kept lines and their embeddings.
+        """
+        metrics = self.converter.metrics
+        metrics.count("entries")
         try:
-            title = entry.get("title", "Untitled")
-            url = entry.get("url", "")
             html_content = entry.get("html", "")
-            logging.info("Formatted entry: %s", title)
-            markdown_content = self.converter.convert(html_content)
-            return self.structure_markdown(title, url, markdown_content)
+            logging.info("Formatted entry: %s", entry.get("title", "Untitled"))
+            detailed = self.store is not None
+            if self.engine is not None:
+                return await self.engine.convert(html_content, detailed)
+            if detailed:
+                return self.converter.deduplicate_detailed(
+                    self.converter.to_markdown(html_content)
+                )
+            return self.converter.convert(html_content)
+        except Exception as e:
+            logging.error("Error formatting entry: %s", e)
+            metrics.count("failed_entries")
+            return None
+
+    def _store_entry(self, entry, result, structured=True, position=None):
+        """
+        Finish a converted entry and, with an embedding store, store the embeddings of the lines that made it into the
+        output. Corpus deduplication can drop whole paragraphs, so only lines still present after it are stored.
+        `position` is the entry's input position, recorded in the store's index.
+        """
+        if self.store is None or result is None:
+            return self._finish_entry(entry, result, structured)
+        markdown_content, lines, embeddings = result
+        formatted = self._finish_entry(entry, markdown_content, structured)
+        if formatted and lines:
+            try:
+                emitted = set(formatted.split("\n"))
+                kept = [i for i, line in enumerate(lines) if line in emitted]
+                self.store.add(entry, [lines[i] for i in kept], embeddings[kept], position)
+            except Exception as e:
+                logging.error("Error storing embeddings: %s", e)
+        return formatted
+
+    def _finish_entry(self, entry, markdown_content, structured=True):
+        """
+        Apply corpus deduplication and structure a converted entry. Returns an empty string for failed entries.
+
+        With `structured` set to False the deduplicated markdown is returned without the title heading and link.
+        """
+        if markdown_content is None:
+            return ""
+        try:
+            if self.deduplicator is not None:
+                with self.converter.metrics.stage("corpus_dedup"):
+                    markdown_content = self.deduplicator.filter(markdown_content)
+            if not structured:
+                return markdown_content.strip()
+            return self.structure_markdown(
+                entry.get("title", "Untitled"), entry.get("url", ""), markdown_content
+            )
         except Exception as e:
             logging.error("Error formatting entry: %s", e)
             return ""
@@ -83,6 +154,9 @@ class DatasetFormatter:
         """
         Asynchronously formats the dataset.
 
+        Entries are converted concurrently when the formatter has an engine. Output keeps the input order, and an entry
+        that fails to convert becomes an empty string without affecting the others.
+
         Args:
             self: The object instance.
             data: The dataset to be formatted.
@@ -90,7 +164,26 @@ class DatasetFormatter:
         Returns:
             str: The formatted dataset as a string.
         """
-        formatted_entries = await asyncio.gather(
-            *(self.format_entry(entry) for entry in data)
+        return "\n\n".join(await self.format_entries(data))
+
+    async def format_entries(self, data, structured=True, positions=None):
+        """
+        Asynchronously formats the dataset, returning one structured markdown string per entry.
+
+        Args:
+            data: The dataset to be formatted.
+            structured: Whether to add the title heading and link to each entry. Defaults to True.
+            positions: The position of each entry in the whole input, recorded in the embedding store. Defaults to None.
+
+        Returns:
+            list: The formatted entries in input order, with an empty string for each entry that failed.
+        """
+        results = await asyncio.gather(
+            *(self._convert_entry(entry) for entry in data)
         )
-        return "\n\n".join(formatted_entries)
+        positions = positions or [None] * len(data)
+        # Corpus deduplication depends on what was emitted before, so it runs in input order
+        return [
+            self._store_entry(entry, result, structured, position)
+            for entry, result, position in zip(data, results, positions)
+        ]
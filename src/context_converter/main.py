@@ -11,37 +11,134 @@ Functions:
 """
 
 
+import argparse
+import contextlib
+import functools
 import logging
-from typing import List
+import sys
+from typing import List, Optional, Tuple
 import asyncio
-from typing import List
-from converter import HTMLToMarkdownConverter
+from autotune import tune
+from backends import INFERENCE_BACKENDS
+from cache import EmbeddingCache
+from converter import DEDUP_MODES, LONG_LINE_MODES, HTMLToMarkdownConverter
+from dedup import CorpusDeduplicator
+from embedding_store import STORE_DTYPES, EmbeddingCollector, EmbeddingStore
+from engine import ConversionEngine
 from formatter import DatasetFormatter
-from utils import load_json_files, save_output_in_chunks, chunk_dataset
+from manifest import RunManifest, entry_key
+from metrics import NULL_METRICS, JsonFileSink, LogSink, Metrics, profiled
+from microbatch import EmbeddingMicroBatcher
+from registry import DEFAULT_MODEL_NAME, ArtifactNotFoundError, get_registry
+from utils import iter_json_entries, achunk_dataset, parse_shard, select_shard
+from writer import OUTPUT_FORMATS, OutputWriter
 
 
-def process_dataset_chunk(chunk):
+async def process_dataset_chunk(
+    chunk, cache=None, deduplicator=None, engine=None, structured=True, store=None, positions=None
+):
     """
-    Process a dataset chunk using a DatasetFormatter and return the formatted dataset.
+    Process a dataset chunk using a DatasetFormatter and return the formatted entries.
     
     Args:
         chunk: The dataset chunk to be processed.
+        cache: An optional EmbeddingCache shared across chunks.
+        deduplicator: An optional CorpusDeduplicator shared across chunks.
+        engine: An optional ConversionEngine shared across chunks; its converter is used when given.
+        structured: Whether to add the title heading and link to each entry. Defaults to True.
+        store: An optional EmbeddingStore that receives the embeddings of the kept lines.
+        positions: The position of each entry in the whole input, recorded in the embedding store. Defaults to None.
     
     Returns:
-        The formatted dataset, or an empty string if an error occurs.
+        The formatted entries in input order, with an empty string for each failed entry, or an empty list if an error occurs.
     """
     try:
-        formatter = DatasetFormatter(HTMLToMarkdownConverter())
-        return formatter.format_dataset(chunk)
+        converter = engine.converter if engine else HTMLToMarkdownConverter(cache=cache)
+        formatter = DatasetFormatter(
+            converter, deduplicator=deduplicator, engine=engine, store=store
+        )
+        return await formatter.format_entries(chunk, structured, positions)
     except Exception as e:
         logging.error("Error processing dataset chunk: %s", e)
-        return ""
+        return []
+
+
+async def process_incremental_chunk(
+    chunk, manifest, cache=None, deduplicator=None, engine=None, structured=True, store=None
+):
+    """
+    Convert only the entries of a chunk that the run manifest has no output for, and record their output.
+
+    Args:
+        chunk: The dataset chunk to be processed.
+        manifest: The RunManifest holding the output of earlier runs.
+        cache: An optional EmbeddingCache shared across chunks.
+        deduplicator: An optional CorpusDeduplicator shared across chunks. Recorded entries are fed to it so that
+            later entries are still deduplicated against them.
+        engine: An optional ConversionEngine shared across chunks; its converter is used when given.
+        structured: Whether to add the title heading and link to each entry. Defaults to True.
+        store: An optional EmbeddingStore. The line embeddings of converted entries are recorded in the manifest, and
+            entries recorded without them are converted again, so `RunManifest.assemble` can fill the store in order.
+
+    Returns:
+        tuple: The keys of the chunk's entries in input order, and the number of entries converted.
+    """
+    keys = [entry_key(entry) for entry in chunk]
+    recorded = manifest.lookup(keys)
+    if store is not None:
+        recorded = {key: part for key, part in recorded.items() if manifest.has_embeddings(key)}
+    pending = [(key, entry) for key, entry in zip(keys, chunk) if key not in recorded]
+    if deduplicator is not None:
+        for key in dict.fromkeys(key for key in keys if key in recorded):
+            deduplicator.filter(manifest.read(key))
+    if pending:
+        collector = EmbeddingCollector() if store is not None else None
+        contents = await process_dataset_chunk(
+            [entry for _, entry in pending], cache, deduplicator, engine, structured, collector
+        )
+        # Failed entries are not recorded, so the next run retries them
+        manifest.record_many(
+            [
+                (key, entry, content)
+                for (key, entry), content in zip(pending, contents)
+                if content
+            ],
+            {key: collector.get(entry) for key, entry in pending} if collector is not None else None,
+        )
+    return keys, len(pending)
 
 
 async def main(
     pattern: str = "output*.json",
     chunk_size: int = 256,
     output_file_name: str = "gpt-crawler-curated_markdown.md",
+    cache_path: Optional[str] = None,
+    corpus_dedup: bool = False,
+    workers: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    micro_batch_size: int = 64,
+    dedup: str = "semantic",
+    backend: str = "fp32",
+    num_threads: Optional[int] = None,
+    metrics: Optional[Metrics] = None,
+    profile: Optional[str] = None,
+    manifest_dir: Optional[str] = None,
+    output_format: str = "markdown",
+    max_file_bytes: Optional[int] = None,
+    max_file_entries: Optional[int] = None,
+    compress: bool = False,
+    max_tokens: Optional[int] = None,
+    long_lines: str = "truncate",
+    shard: Optional[Tuple[int, int]] = None,
+    embeddings_dtype: Optional[str] = None,
+    autotune: bool = False,
+    autotune_cache: Optional[str] = None,
+    retune: bool = False,
+    max_memory_mb: Optional[float] = None,
+    offline: bool = False,
+    model_name: str = DEFAULT_MODEL_NAME,
+    model_revision: Optional[str] = None,
+    stream_threshold: Optional[int] = None,
 ) -> None:
     """
     Main function to load, process, and save the dataset.
@@ -49,25 +146,361 @@ async def main(
     :param pattern: Pattern to match JSON files.
     :param chunk_size: Size of chunks to split the dataset into.
     :param output_file_name: Name of the output file.
+    :param cache_path: Optional SQLite file that persists line embeddings between runs.
+    :param corpus_dedup: Whether to drop paragraphs that near-duplicate paragraphs of earlier entries.
+    :param workers: Number of processes for HTML curation and markdownify. Defaults to the number of CPUs.
+    :param max_concurrency: Maximum number of entries converted at once.
+    :param micro_batch_size: Lines per cross-document embedding batch. 0 embeds each entry on its own.
+    :param dedup: Line deduplication mode: "semantic", "lexical" or "none". Only "semantic" loads the embedding model.
+    :param backend: Embedding inference backend: "fp32", "int8", "torchscript" or "onnx".
+    :param num_threads: Intra-op threads for embedding inference.
+    :param metrics: Optional Metrics that records per-stage timings; its summary is emitted to its sinks at the end.
+    :param profile: Profile the run with cProfile. An empty string logs the hottest functions; a path dumps the profile.
+    :param manifest_dir: Optional directory for a run manifest. Entries converted by earlier or interrupted runs are
+        reused, and the output is rebuilt from the manifest.
+    :param output_format: "markdown" for one document, or "jsonl" for one title, url and markdown record per entry.
+    :param max_file_bytes: Split the output into numbered files of about this many uncompressed bytes.
+    :param max_file_entries: Split the output into numbered files of this many entries.
+    :param compress: Whether to gzip the output files.
+    :param max_tokens: Token cap per embedded line. Defaults to the tokenizer's maximum length.
+    :param long_lines: How lines over max_tokens are embedded: "truncate" or "window".
+    :param shard: Optional (index, count) pair. Only every count-th entry, starting at index, is converted, and each
+        output record carries its input position so shards can be merged back into input order.
+    :param embeddings_dtype: Save the embeddings of kept lines next to the output as "float32" or "float16".
+        Requires semantic dedup.
+    :param autotune: Pick the embedding batch size, token budget and chunk size for this host from a short
+        calibration on the input, or from the tuning cache. Overrides chunk_size. Requires semantic dedup.
+    :param autotune_cache: The tuning cache file. Defaults to ~/.cache/context_converter/autotune.json.
+    :param retune: Calibrate again even when the cache has settings for this host and model.
+    :param max_memory_mb: Peak resident memory, in MB, that an autotuned batch configuration may reach.
+    :param offline: Load the model only from its local artifact, prefetched with download_jina.py, and fail at start-up
+        if it is missing.
+    :param model_name: The embedding model checkpoint name or local path. Defaults to the Jina small model.
+    :param model_revision: The prefetched artifact revision, or hub revision, of the model to load.
+    :param stream_threshold: Convert pages with more than this many characters of HTML section by section, with
+        deduplication in bounded windows, so a single huge page does not spike memory.
+    :raises ArtifactNotFoundError: In offline mode, if the model has not been prefetched.
     """
     logging.basicConfig(level=logging.INFO)
 
     try:
-        original_data = await load_json_files(pattern)
-
-        chunks = list(chunk_dataset(original_data, chunk_size))
-
-        for chunk in chunks:
-            try:
-                content = await process_dataset_chunk(chunk)
-                await save_output_in_chunks(output_file_name, content)
-                logging.info("Conversion process successful. Exiting program.")
-            except Exception as e:
-                logging.error("An error occurred while processing a chunk: %s", e)
-                # Handle error or save progress here
+        semantic = dedup == "semantic"
+        cache = EmbeddingCache(path=cache_path)
+        deduplicator = CorpusDeduplicator() if corpus_dedup else None
+
+        metrics = metrics or NULL_METRICS
+        get_registry().configure(revision=model_revision, offline=offline)
+        converter = HTMLToMarkdownConverter(
+            model_name=model_name,
+            cache=cache,
+            dedup=dedup,
+            backend=backend,
+            num_threads=num_threads,
+            metrics=metrics,
+            max_tokens=max_tokens,
+            long_lines=long_lines,
+        )
+        if semantic:
+            # Load the embedding model once up front; every chunk's converter shares it
+            with metrics.stage("model_load"):
+                converter._initialize_embedding_model()
+                get_registry().warm_up(converter.model_name, backend)
+        if autotune and semantic:
+            with metrics.stage("autotune"):
+                settings = await tune(
+                    converter,
+                    pattern,
+                    max_memory_mb=max_memory_mb,
+                    cache_path=autotune_cache,
+                    retune=retune,
+                )
+            if settings:
+                chunk_size = settings["chunk_size"]
+                # A micro-batch smaller than the tuned batch would cap every batch below it
+                micro_batch_size = micro_batch_size and max(micro_batch_size, settings["batch_size"] or 0)
+        elif autotune:
+            logging.info("Autotune skipped: only semantic dedup embeds lines")
+        if semantic and micro_batch_size:
+            converter.batcher = EmbeddingMicroBatcher(
+                # One coalesced batch is one forward pass, not several of the converter's own batch size
+                functools.partial(converter._process_embeddings, batch_size=micro_batch_size),
+                max_batch_size=micro_batch_size,
+            )
+        engine = ConversionEngine(
+            converter,
+            workers=workers,
+            max_concurrency=max_concurrency,
+            stream_threshold=stream_threshold,
+        )
+
+        # Entries are parsed lazily, so memory is bounded by the chunk size rather than the dataset size
+        entries = iter_json_entries(pattern)
+        shard_index, shard_count = shard or (0, 1)
+        if shard_count > 1:
+            entries = select_shard(entries, shard_index, shard_count)
+        chunks = achunk_dataset(entries, chunk_size)
+
+        profiler = profiled(profile or None) if profile is not None else contextlib.nullcontext()
+        manifest = None
+        if manifest_dir:
+            manifest = RunManifest(
+                manifest_dir,
+                fingerprint=repr(
+                    (
+                        converter.model_name,
+                        dedup,
+                        backend,
+                        converter.similarity_threshold,
+                        converter.window,
+                        corpus_dedup,
+                        output_format,
+                        max_tokens,
+                        long_lines,
+                        model_revision,
+                    )
+                ),
+            )
+        # The writer is opened once per run. With a manifest, output is only assembled at the end, atomically
+        writer = OutputWriter(
+            output_file_name,
+            format=output_format,
+            max_bytes=max_file_bytes,
+            max_entries=max_file_entries,
+            compress=compress,
+            atomic=manifest is not None,
+        )
+        store = None
+        if embeddings_dtype and semantic:
+            store = EmbeddingStore(f"{output_file_name}.embeddings", embeddings_dtype)
+        elif embeddings_dtype:
+            logging.warning("Embeddings are only computed, and saved, with semantic dedup")
+        run_keys = []
+        run_positions = []
+        selected = 0
+        converted = 0
+
+        with engine, profiler:
+            async for chunk in chunks:
+                positions = None
+                if shard is not None:
+                    positions = [
+                        (selected + offset) * shard_count + shard_index
+                        for offset in range(len(chunk))
+                    ]
+                selected += len(chunk)
+                try:
+                    if manifest is not None:
+                        with metrics.stage("chunk"):
+                            keys, count = await process_incremental_chunk(
+                                chunk,
+                                manifest,
+                                cache,
+                                deduplicator,
+                                engine,
+                                writer.structured,
+                                store,
+                            )
+                        run_keys.extend(keys)
+                        run_positions.extend(positions or [])
+                        converted += count
+                        continue
+                    with metrics.stage("chunk"):
+                        contents = await process_dataset_chunk(
+                            chunk, cache, deduplicator, engine, writer.structured, store, positions
+                        )
+                    with metrics.stage("write"):
+                        writer.write_many(chunk, contents, positions)
+                    logging.info("Conversion process successful. Exiting program.")
+                except Exception as e:
+                    logging.error("An error occurred while processing a chunk: %s", e)
+                    # Handle error or save progress here
+
+        if manifest is not None:
+            with metrics.stage("write"):
+                manifest.assemble(run_keys, writer, run_positions, store)
+            manifest.prune(run_keys)
+            manifest.close()
+            logging.info(
+                "Converted %d entries, reused %d", converted, len(run_keys) - converted
+            )
+        writer.close()
+        if store is not None:
+            store.close()
+            logging.info("Saved %d line embeddings to %s.npy", store.rows, store.base_path)
+        logging.info("Wrote %d entries to %s", writer.entries, ", ".join(writer.paths))
+        if converter.batcher is not None:
+            converter.batcher.close()
+            logging.info("Embedding micro-batches: %s", converter.batcher.stats())
+        logging.info("Embedding cache: %s", cache.stats())
+        cache.close()
+        if deduplicator is not None:
+            logging.info("Corpus deduplication: %s", deduplicator.stats())
+        metrics.emit()
+    except ArtifactNotFoundError as e:
+        # Offline runs without the prefetched model must fail, not exit cleanly with no output
+        logging.error("Cannot load the embedding model: %s", e)
+        raise
     except Exception as e:
         logging.error("An error occurred in the main function: %s", e)
 
 
+def parse_args(argv=None):
+    """
+    Parse command-line arguments for the conversion pipeline.
+
+    :param argv: Argument list to parse. Defaults to sys.argv.
+    :return: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Convert gpt-crawler JSON output into curated Markdown."
+    )
+    parser.add_argument("--pattern", default="output*.json", help="Glob matching the input JSON files.")
+    parser.add_argument("--chunk-size", type=int, default=256, help="Entries per processing chunk.")
+    parser.add_argument("--output", default="gpt-crawler-curated_markdown.md", help="Output Markdown file.")
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="markdown",
+        help="One Markdown document, or one JSON record with title, url and markdown per line.",
+    )
+    parser.add_argument("--max-file-bytes", type=int, help="Split the output into numbered files of about this size.")
+    parser.add_argument("--max-file-entries", type=int, help="Split the output into numbered files of this many entries.")
+    parser.add_argument("--compress", action="store_true", help="Gzip the output files as they are written.")
+    parser.add_argument("--cache-path", help="SQLite file that persists line embeddings between runs.")
+    parser.add_argument("--corpus-dedup", action="store_true", help="Drop paragraphs repeated across entries.")
+    parser.add_argument("--workers", type=int, help="Markdown worker processes. Defaults to the CPU count.")
+    parser.add_argument("--max-concurrency", type=int, help="Maximum entries converted at once.")
+    parser.add_argument("--micro-batch-size", type=int, default=64, help="Lines per cross-document embedding batch; 0 disables.")
+    parser.add_argument(
+        "--dedup",
+        choices=DEDUP_MODES,
+        default="semantic",
+        help="Line deduplication mode. Only 'semantic' loads torch and the embedding model.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=INFERENCE_BACKENDS,
+        default="fp32",
+        help="Embedding inference backend.",
+    )
+    parser.add_argument("--num-threads", type=int, help="Intra-op threads for embedding inference.")
+    parser.add_argument("--max-tokens", type=int, help="Token cap per embedded line.")
+    parser.add_argument(
+        "--save-embeddings",
+        choices=tuple(STORE_DTYPES),
+        help="Save the embeddings of kept lines next to the output, memory-mappable, at this precision.",
+    )
+    parser.add_argument(
+        "--stream-threshold",
+        type=int,
+        help="Convert pages with more than this many characters of HTML section by section, in bounded memory.",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Load the model only from its local artifact (see download_jina.py); fail if it is missing.",
+    )
+    parser.add_argument("--model", default=DEFAULT_MODEL_NAME, help="The embedding model checkpoint name or local path.")
+    parser.add_argument("--model-revision", help="The model revision to load, as pinned by download_jina.py.")
+    parser.add_argument(
+        "--autotune",
+        action="store_true",
+        help="Tune the embedding batch size and chunk size for this host with a short calibration on the input, cached per host and model.",
+    )
+    parser.add_argument("--retune", action="store_true", help="With --autotune, calibrate again instead of using the cache.")
+    parser.add_argument("--autotune-cache", help="Tuning cache file. Defaults to ~/.cache/context_converter/autotune.json.")
+    parser.add_argument("--max-memory-mb", type=float, help="With --autotune, the peak memory a batch configuration may reach.")
+    parser.add_argument(
+        "--long-lines",
+        choices=LONG_LINE_MODES,
+        default="truncate",
+        help="Embed lines over --max-tokens from a prefix, or from pooled windows covering the whole line.",
+    )
+    parser.add_argument(
+        "--manifest",
+        help="Directory for a run manifest. Re-runs skip unchanged entries and resume after a crash; the output is rebuilt from it.",
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        help="Convert only shard i of n, written as I/N, e.g. 0/4. Records carry input positions for merging.",
+    )
+    parser.add_argument(
+        "--metrics",
+        choices=("log", "json"),
+        action="append",
+        help="Record per-stage timings and throughput and report them to the log or a JSON file. May be repeated.",
+    )
+    parser.add_argument("--metrics-file", default="metrics.json", help="JSON file written by --metrics json.")
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        const="",
+        help="Profile the run with cProfile. Logs the hottest functions, or dumps the profile to the given path.",
+    )
+    return parser.parse_args(argv)
+
+
+def build_metrics(args):
+    """
+    Build the Metrics requested on the command line.
+
+    :param args: Parsed arguments from parse_args.
+    :return: A Metrics with the requested sinks, or None when metrics are off.
+    """
+    if not args.metrics:
+        return None
+    sinks = []
+    if "log" in args.metrics:
+        sinks.append(LogSink())
+    if "json" in args.metrics:
+        sinks.append(JsonFileSink(args.metrics_file))
+    return Metrics(sinks)
+
+
+def main_kwargs(args):
+    """
+    Map parsed command-line arguments to keyword arguments for main.
+
+    :param args: Parsed arguments from parse_args.
+    :return: A dictionary of keyword arguments.
+    """
+    return {
+        "pattern": args.pattern,
+        "chunk_size": args.chunk_size,
+        "output_file_name": args.output,
+        "cache_path": args.cache_path,
+        "corpus_dedup": args.corpus_dedup,
+        "workers": args.workers,
+        "max_concurrency": args.max_concurrency,
+        "micro_batch_size": args.micro_batch_size,
+        "dedup": args.dedup,
+        "backend": args.backend,
+        "num_threads": args.num_threads,
+        "metrics": build_metrics(args),
+        "profile": args.profile,
+        "manifest_dir": args.manifest,
+        "output_format": args.output_format,
+        "max_file_bytes": args.max_file_bytes,
+        "max_file_entries": args.max_file_entries,
+        "compress": args.compress,
+        "max_tokens": args.max_tokens,
+        "long_lines": args.long_lines,
+        "shard": args.shard,
+        "embeddings_dtype": args.save_embeddings,
+        "autotune": args.autotune,
+        "autotune_cache": args.autotune_cache,
+        "retune": args.retune,
+        "max_memory_mb": args.max_memory_mb,
+        "offline": args.offline,
+        "model_name": args.model,
+        "model_revision": args.model_revision,
+        "stream_threshold": args.stream_threshold,
+    }
+
+
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        asyncio.run(main(**main_kwargs(parse_args())))
+    except ArtifactNotFoundError:
+        sys.exit(1)
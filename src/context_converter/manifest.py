@@ -0,0 +1,299 @@
+"""
+This module provides the run manifest that makes conversions of the HTML to Markdown conversion project resumable and incremental.
+
+Without a manifest, every run reconverts every entry, so a crashed run has to start over and a re-crawl that changed a handful of pages reconverts all of them. RunManifest records a content hash of each converted entry together with the location of its formatted markdown. A re-run looks entries up by hash, converts only new or changed ones, and assembles the output from the recorded parts in input order through an atomic OutputWriter, so a crash never leaves duplicate output behind.
+
+When line embeddings are saved, each entry's kept lines and their embeddings are recorded next to its part, so the embedding store is assembled in the same order as the output and also covers entries reused from earlier runs.
+
+Classes:
+    RunManifest: A directory of per-entry markdown parts indexed by content hash in SQLite.
+
+Functions:
+    entry_key(entry): Returns the content hash of a dataset entry.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+
+def entry_key(entry):
+    """
+    Compute the content hash that identifies an entry's output.
+
+    Args:
+        entry (dict): A dataset entry with "url", "title" and "html" keys.
+
+    Returns:
+        str: A hex digest of the entry's url, title and HTML.
+    """
+    payload = "\0".join(
+        str(entry.get(field) or "") for field in ("url", "title", "html")
+    ).encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+class RunManifest:
+    """
+    Records the formatted markdown of converted entries, keyed by content hash.
+
+    Attributes:
+        directory (str): The directory holding the manifest database and the markdown parts.
+        fingerprint (str): Describes the conversion settings. Recorded parts are discarded when it changes.
+
+    Methods:
+        lookup(keys): Returns the keys that already have recorded output.
+        read(key): Returns the recorded markdown of an entry.
+        record_many(records, embeddings): Stores the markdown, and optionally the line embeddings, of newly converted entries.
+        has_embeddings(key): Reports whether an entry's line embeddings are recorded.
+        assemble(keys, writer, positions, store): Writes the recorded parts of the given entries to an OutputWriter.
+        prune(keys): Removes every recorded entry whose key is not given.
+        close(): Closes the manifest database.
+    """
+
+    def __init__(self, directory, fingerprint=""):
+        """
+        Opens the manifest in the given directory, creating it if needed.
+
+        Args:
+            directory (str): The manifest directory.
+            fingerprint (str): A description of the settings that affect output, such as the dedup mode and
+                threshold. When it differs from the recorded one, every recorded entry is discarded. Defaults to "".
+
+        Returns:
+            None
+        """
+        self.directory = directory
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, "parts"), exist_ok=True)
+        self._db = sqlite3.connect(
+            os.path.join(directory, "manifest.sqlite"), check_same_thread=False
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, title TEXT, url TEXT, part TEXT)"
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        row = self._db.execute(
+            "SELECT value FROM meta WHERE name = 'fingerprint'"
+        ).fetchone()
+        if row is not None and row[0] != fingerprint:
+            logging.info("Conversion settings changed; discarding the run manifest")
+            self._remove(
+                [key for (key,) in self._db.execute("SELECT key FROM entries")]
+            )
+        self._db.execute(
+            "INSERT OR REPLACE INTO meta (name, value) VALUES ('fingerprint', ?)",
+            (fingerprint,),
+        )
+        self._db.commit()
+
+    def lookup(self, keys):
+        """
+        Find the entries that already have recorded output.
+
+        Args:
+            keys (list): Entry keys from `entry_key`.
+
+        Returns:
+            dict: Maps each recorded key to a (title, url, part path) tuple.
+        """
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, title, url, part FROM entries WHERE key IN ({placeholders})",
+                    batch,
+                )
+                for key, title, url, part in rows:
+                    found[key] = (title, url, os.path.join(self.directory, part))
+        return found
+
+    def read(self, key):
+        """
+        Return the recorded markdown of an entry.
+
+        Args:
+            key (str): The entry key.
+
+        Returns:
+            str: The formatted markdown.
+        """
+        with open(self._part_path(key), "r", encoding="utf-8") as file:
+            return file.read()
+
+    def record_many(self, records, embeddings=None):
+        """
+        Store the formatted markdown of converted entries.
+
+        Each part is written to a temporary file and renamed into place before the manifest row is committed, so an
+        interrupted run never records an entry whose part is incomplete.
+
+        Args:
+            records (list): (key, entry, markdown) tuples, where entry is the dataset entry the markdown came from.
+            embeddings (dict, optional): Maps keys to the (kept lines, torch.Tensor or None) of their entries, recorded
+                next to the parts. Defaults to None.
+
+        Returns:
+            None
+        """
+        rows = []
+        for key, entry, markdown in records:
+            path = self._part_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if embeddings is not None:
+                self._write_embeddings(key, *embeddings[key])
+            temporary_path = f"{path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as file:
+                file.write(markdown)
+            os.replace(temporary_path, path)
+            rows.append(
+                (
+                    key,
+                    entry.get("title", "Untitled"),
+                    entry.get("url", ""),
+                    os.path.relpath(path, self.directory),
+                )
+            )
+        if rows:
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO entries (key, title, url, part) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+                self._db.commit()
+
+    def has_embeddings(self, key):
+        """
+        Report whether the line embeddings of an entry are recorded.
+
+        Args:
+            key (str): The entry key.
+
+        Returns:
+            bool: True if the entry was recorded with its line embeddings.
+        """
+        return os.path.exists(self._embeddings_path(key))
+
+    def assemble(self, keys, writer, positions=None, store=None):
+        """
+        Write the recorded parts of the given entries, in order, to an output writer.
+
+        Entries without recorded output, such as entries that failed to convert, are skipped.
+
+        Args:
+            keys (list): Entry keys in output order.
+            writer (OutputWriter): The writer to write to, normally opened with `atomic=True`.
+            positions (list, optional): The input position of each entry, passed on to the writer. Defaults to None.
+            store (EmbeddingStore, optional): Receives the recorded line embeddings of each written entry, in the same
+                order. Defaults to None.
+
+        Returns:
+            int: The number of entries written.
+        """
+        positions = positions or [None] * len(keys)
+        written = 0
+        # Look parts up a batch at a time so memory does not grow with the number of entries
+        for start in range(0, len(keys), 500):
+            batch = keys[start : start + 500]
+            parts = self.lookup(batch)
+            for key, position in zip(batch, positions[start : start + 500]):
+                if key not in parts:
+                    continue
+                title, url, part = parts[key]
+                with open(part, "r", encoding="utf-8") as file:
+                    writer.write({"title": title, "url": url}, file.read(), position)
+                if store is not None:
+                    lines, embeddings = self._read_embeddings(key)
+                    store.add({"title": title, "url": url}, lines, embeddings, position)
+                written += 1
+        return written
+
+    def prune(self, keys):
+        """
+        Remove every recorded entry whose key is not among the given keys, with its markdown part.
+
+        Args:
+            keys (iterable): The keys to keep.
+
+        Returns:
+            int: The number of entries removed.
+        """
+        keep = set(keys)
+        with self._lock:
+            stale = [
+                key
+                for (key,) in self._db.execute("SELECT key FROM entries")
+                if key not in keep
+            ]
+            self._remove(stale)
+            self._db.commit()
+        return len(stale)
+
+    def close(self):
+        """
+        Close the manifest database.
+        """
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def _part_path(self, key):
+        """
+        Return the path of an entry's markdown part. Parts are spread over subdirectories by key prefix.
+        """
+        return os.path.join(self.directory, "parts", key[:2], f"{key}.md")
+
+    def _embeddings_path(self, key):
+        """
+        Return the path of an entry's recorded line embeddings, next to its markdown part.
+        """
+        return os.path.join(self.directory, "parts", key[:2], f"{key}.npz")
+
+    def _write_embeddings(self, key, lines, embeddings):
+        """
+        Record an entry's kept lines and their float32 embeddings as a NumPy archive, renamed into place.
+        """
+        import numpy
+        import torch
+
+        if embeddings is None:
+            rows = numpy.zeros((0, 0), dtype=numpy.float32)
+        else:
+            rows = embeddings.detach().to(torch.float32).cpu().numpy()
+        path = self._embeddings_path(key)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "wb") as file:
+            numpy.savez(file, lines=numpy.array(lines, dtype=str), rows=rows)
+        os.replace(temporary_path, path)
+
+    def _read_embeddings(self, key):
+        """
+        Return an entry's recorded kept lines and their embeddings as a torch.Tensor.
+        """
+        import numpy
+        import torch
+
+        with numpy.load(self._embeddings_path(key)) as archive:
+            return archive["lines"].tolist(), torch.from_numpy(archive["rows"])
+
+    def _remove(self, keys):
+        """
+        Delete the given entries, their parts and their recorded embeddings; the caller commits.
+        """
+        for key in keys:
+            for path in (self._part_path(key), self._embeddings_path(key)):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+        self._db.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in keys])
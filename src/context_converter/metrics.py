@@ -0,0 +1,285 @@
+"""
+This module provides per-stage timing and throughput instrumentation for the HTML to Markdown conversion project.
+
+A Metrics object records wall time and CPU time for named pipeline stages (parsing, curation, markdownify, tokenization, the forward pass, deduplication and output writes), together with counters such as lines, tokens and padded tokens. A summary derives throughput, batch padding ratio and peak memory, and is delivered to pluggable sinks: a log summary, a JSON file or a callback.
+
+When instrumentation is off, components use NULL_METRICS. Its methods do nothing and its stage context manager is a shared no-op, so the overhead is negligible.
+
+Classes:
+    Metrics: Records stage timings and counters and emits summaries to sinks.
+    LogSink: Logs a one-line-per-stage summary.
+    JsonFileSink: Writes the summary to a JSON file.
+    CallbackSink: Passes the summary to a function.
+
+Functions:
+    profiled(path): Context manager that profiles the enclosed code with cProfile.
+    peak_rss_mb(): Returns the peak resident set size of this process in MB.
+"""
+
+import contextlib
+import cProfile
+import json
+import logging
+import resource
+import sys
+import threading
+import time
+
+
+class _Stage:
+    """
+    Context manager that adds the wall and CPU time of its block to a stage.
+    """
+
+    __slots__ = ("metrics", "name", "wall", "cpu")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(
+            self.name,
+            time.perf_counter() - self.wall,
+            time.thread_time() - self.cpu,
+        )
+
+
+class Metrics:
+    """
+    Collects per-stage timings and counters for a conversion run.
+
+    Attributes:
+        enabled (bool): Whether anything is recorded.
+        sinks (list): Sinks that receive the summary when `emit` is called.
+
+    Methods:
+        stage(name): Returns a context manager that times a pipeline stage.
+        record(name, wall, cpu, calls): Adds timings to a stage directly.
+        count(name, value): Increments a counter.
+        merge(summary): Adds the stages and counters of another summary, for example from a worker process.
+        summary(): Returns the timings, counters and derived throughput figures.
+        emit(): Sends the summary to every sink.
+    """
+
+    def __init__(self, sinks=None, enabled=True):
+        """
+        Initializes an empty set of metrics.
+
+        Args:
+            sinks (list, optional): Sinks that receive the summary on `emit`. Defaults to none.
+            enabled (bool): Whether to record anything. Defaults to True.
+
+        Returns:
+            None
+        """
+        self.enabled = enabled
+        self.sinks = list(sinks or [])
+        self._stages = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    def stage(self, name):
+        """
+        Return a context manager that records the wall and CPU time of its block under `name`.
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, wall, cpu=0.0, calls=1):
+        """
+        Add timings to a stage.
+
+        Args:
+            name (str): The stage name.
+            wall (float): Wall time in seconds.
+            cpu (float): CPU time in seconds.
+            calls (int): The number of calls the timings cover.
+
+        Returns:
+            None
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            stage = self._stages.setdefault(name, [0, 0.0, 0.0])
+            stage[0] += calls
+            stage[1] += wall
+            stage[2] += cpu
+
+    def count(self, name, value=1):
+        """
+        Increment the counter `name` by `value`.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def merge(self, summary):
+        """
+        Add the stages and counters of a summary produced elsewhere, such as a worker process.
+
+        Args:
+            summary (dict): A dictionary with "stages" and "counters" in the format returned by `summary`.
+
+        Returns:
+            None
+        """
+        for name, stage in summary.get("stages", {}).items():
+            self.record(name, stage["wall_s"], stage["cpu_s"], stage["calls"])
+        for name, value in summary.get("counters", {}).items():
+            self.count(name, value)
+
+    def summary(self):
+        """
+        Return the recorded metrics with derived throughput figures.
+
+        Returns:
+            dict: Per-stage calls, wall and CPU seconds; counters; lines and tokens per second of embedding time;
+            the batch padding ratio; elapsed time and peak resident memory in MB.
+        """
+        with self._lock:
+            stages = {
+                name: {"calls": calls, "wall_s": wall, "cpu_s": cpu}
+                for name, (calls, wall, cpu) in self._stages.items()
+            }
+            counters = dict(self._counters)
+        embed_wall = stages.get("embed", {}).get("wall_s", 0.0)
+        padded = counters.get("padded_tokens", 0)
+        return {
+            "stages": stages,
+            "counters": counters,
+            "lines_per_s": counters.get("embedded_lines", 0) / embed_wall if embed_wall else None,
+            "tokens_per_s": counters.get("tokens", 0) / embed_wall if embed_wall else None,
+            "padding_ratio": (padded - counters.get("tokens", 0)) / padded if padded else None,
+            "elapsed_s": time.perf_counter() - self._started,
+            "peak_rss_mb": peak_rss_mb(),
+        }
+
+    def emit(self):
+        """
+        Send the current summary to every sink.
+
+        Returns:
+            dict: The summary that was emitted.
+        """
+        summary = self.summary()
+        for sink in self.sinks:
+            try:
+                sink(summary)
+            except Exception as e:
+                logging.error("Error emitting metrics: %s", e)
+        return summary
+
+
+class LogSink:
+    """
+    Logs a metrics summary, one line per stage.
+    """
+
+    def __init__(self, level=logging.INFO):
+        self.level = level
+
+    def __call__(self, summary):
+        for name, stage in sorted(
+            summary["stages"].items(), key=lambda item: -item[1]["wall_s"]
+        ):
+            logging.log(
+                self.level,
+                "Stage %-16s calls=%-7d wall=%.3fs cpu=%.3fs",
+                name,
+                stage["calls"],
+                stage["wall_s"],
+                stage["cpu_s"],
+            )
+        logging.log(
+            self.level,
+            "Throughput: lines/s=%s tokens/s=%s padding=%s peak_rss=%.1fMB",
+            _format(summary["lines_per_s"]),
+            _format(summary["tokens_per_s"]),
+            _format(summary["padding_ratio"]),
+            summary["peak_rss_mb"],
+        )
+
+
+class JsonFileSink:
+    """
+    Writes a metrics summary to a JSON file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, summary):
+        with open(self.path, "w", encoding="utf-8") as file:
+            json.dump(summary, file, indent=2)
+
+
+class CallbackSink:
+    """
+    Passes a metrics summary to a function.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback
+
+    def __call__(self, summary):
+        self.callback(summary)
+
+
+@contextlib.contextmanager
+def profiled(path=None):
+    """
+    Profile the enclosed block with cProfile.
+
+    cProfile only sees the thread that enters the block. Work in pool threads and worker processes is covered by the
+    stage timings instead.
+
+    Args:
+        path (str, optional): File to dump the profile to, readable with pstats or snakeviz. When None, the 25 most
+            expensive functions by cumulative time are logged instead.
+
+    Yields:
+        cProfile.Profile: The active profiler.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+            logging.info("Profile written to %s", path)
+        else:
+            import io
+            import pstats
+
+            stream = io.StringIO()
+            pstats.Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(25)
+            logging.info("Profile:\n%s", stream.getvalue())
+
+
+def peak_rss_mb():
+    """
+    Return the peak resident set size of this process in MB.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _format(value):
+    return "n/a" if value is None else f"{value:.3f}"
+
+
+_NULL_STAGE = contextlib.nullcontext()
+NULL_METRICS = Metrics(enabled=False)
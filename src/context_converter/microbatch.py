@@ -0,0 +1,168 @@
+"""
+This module provides cross-document micro-batching for embedding inference in the HTML to Markdown conversion project.
+
+Each conversion only embeds its own lines, so a short page with five lines runs a five-row forward pass. EmbeddingMicroBatcher collects lines from many in-flight documents into one batch, bounded by a maximum batch size and a maximum wait time, runs a single embedding call for the batch and hands each document its own slice of the result.
+
+Requests can come from any thread, so the same batcher can be shared by HTMLToMarkdownConverter.convert callers, DatasetFormatter through ConversionEngine, and long-lived services.
+
+Classes:
+    EmbeddingMicroBatcher: Coalesces embedding requests from concurrent callers into shared batches.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class EmbeddingMicroBatcher:
+    """
+    Coalesces concurrent embedding requests into shared forward passes.
+
+    Attributes:
+        embed_fn (callable): Embeds a list of lines and returns one row per line.
+        max_batch_size (int): The number of lines at which a batch is dispatched without waiting.
+        max_wait (float): The longest time, in seconds, the first request of a batch waits for others.
+        batches (int): The number of batches dispatched so far.
+        requests (int): The number of requests served so far.
+        lines (int): The number of lines embedded so far.
+
+    Methods:
+        submit(lines): Queues lines for embedding and returns a Future.
+        embed(lines): Embeds lines, blocking until their batch has run.
+        stats(): Returns the batching counters.
+        close(): Stops the batching thread.
+    """
+
+    def __init__(self, embed_fn, max_batch_size=64, max_wait=0.01):
+        """
+        Initializes the batcher and starts its background thread.
+
+        Args:
+            embed_fn (callable): A function taking a list of lines and returning a torch.Tensor with one row per line,
+                such as HTMLToMarkdownConverter._process_embeddings.
+            max_batch_size (int): Lines per batch before it is dispatched immediately. Defaults to 64.
+            max_wait (float): Seconds to wait for more requests before dispatching a partial batch. Defaults to 0.01.
+
+        Returns:
+            None
+        """
+        self.embed_fn = embed_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.requests = 0
+        self.lines = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="embedding-microbatcher", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, lines):
+        """
+        Queue lines for embedding in the next shared batch.
+
+        Args:
+            lines (list): The lines to embed.
+
+        Returns:
+            concurrent.futures.Future: Resolves to a torch.Tensor with one row per line.
+        """
+        if self._closed:
+            raise RuntimeError("EmbeddingMicroBatcher is closed")
+        future = Future()
+        self._queue.put((list(lines), future))
+        return future
+
+    def embed(self, lines):
+        """
+        Embed lines through the shared batcher, blocking until the result is ready.
+
+        Args:
+            lines (list): The lines to embed.
+
+        Returns:
+            torch.Tensor: One embedding row per line.
+        """
+        return self.submit(lines).result()
+
+    def stats(self):
+        """
+        Return the batching counters.
+
+        Returns:
+            dict: Batches dispatched, requests served, lines embedded and the mean lines per batch.
+        """
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "lines": self.lines,
+            "lines_per_batch": self.lines / self.batches if self.batches else 0.0,
+        }
+
+    def close(self):
+        """
+        Stop accepting requests, finish the queued ones and stop the batching thread.
+        """
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+            self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _run(self):
+        """
+        Collect requests into batches and dispatch them until the batcher is closed.
+        """
+        stopping = False
+        while not stopping:
+            request = self._queue.get()
+            if request is None:
+                break
+            pending = [request]
+            size = len(request[0])
+            deadline = time.monotonic() + self.max_wait
+            while size < self.max_batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                pending.append(request)
+                size += len(request[0])
+            self._dispatch(pending)
+
+    def _dispatch(self, pending):
+        """
+        Embed the lines of all pending requests in one call and resolve each request with its slice.
+        """
+        import torch
+
+        lines = [line for request_lines, _ in pending for line in request_lines]
+        try:
+            embeddings = self.embed_fn(lines) if lines else torch.empty(0)
+        except Exception as e:
+            logging.error("Error embedding micro-batch: %s", e)
+            for _, future in pending:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.requests += len(pending)
+        self.lines += len(lines)
+        start = 0
+        for request_lines, future in pending:
+            future.set_result(embeddings[start : start + len(request_lines)])
+            start += len(request_lines)
@@ -0,0 +1,64 @@
+"""
+This module contains the lexical pre-pass that runs before semantic redundancy removal in the HTML to Markdown conversion project.
+
+Many markdown lines can be settled without the embedding model: blank lines, table separators, horizontal rules, heading underlines and code fences are structural and are always kept, and a line that repeats the previous line (ignoring whitespace) is always redundant. Only the remaining lines need embeddings.
+
+Functions:
+    is_structural(line): Reports whether a line is structural markdown.
+    prefilter_lines(lines): Drops repeated lines and marks which remaining lines need embeddings.
+"""
+
+import re
+
+from cache import normalize_line
+
+_STRUCTURAL_PATTERNS = re.compile(
+    r"""^\s*(?:
+        \|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?   # table separator
+        |(?:[-*_]\s*){3,}                            # horizontal rule
+        |={3,}                                       # heading underline
+        |(?:`{3,}|~{3,}).*                           # code fence
+    )?\s*$""",
+    re.VERBOSE,
+)
+
+
+def is_structural(line):
+    """
+    Report whether a line is structural markdown that should be kept without a semantic comparison.
+
+    Blank and whitespace-only lines, table separators, horizontal rules, heading underlines and code fences are structural.
+
+    Args:
+        line (str): The markdown line.
+
+    Returns:
+        bool: True if the line is structural.
+    """
+    return bool(_STRUCTURAL_PATTERNS.match(line))
+
+
+def prefilter_lines(lines):
+    """
+    Apply the lexical pre-pass to markdown lines.
+
+    A line whose whitespace-normalized text equals the previous line's is dropped, since its embedding would be identical.
+    The remaining lines are returned with a mask that is False for structural lines, which never need an embedding.
+
+    Args:
+        lines (list): The markdown lines, in document order.
+
+    Returns:
+        tuple: The remaining lines and a list of booleans marking the lines that need embeddings.
+    """
+    filtered = []
+    needs_embedding = []
+    previous = None
+    for line in lines:
+        normalized = normalize_line(line)
+        if normalized == previous:
+            continue
+        previous = normalized
+        filtered.append(line)
+        needs_embedding.append(not is_structural(line))
+    return filtered, needs_embedding
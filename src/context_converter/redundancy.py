@@ -0,0 +1,41 @@
+"""
+This module contains the vectorized semantic redundancy filter used by the HTML to Markdown conversion project.
+
+Embeddings are L2-normalized, so the cosine similarity between two lines is their dot product. The filter computes the similarity of every line to each of the `window` lines before it with one batched operation per offset, instead of a Python loop with a tensor call per line.
+
+Functions:
+    redundant_mask(embeddings, segments, threshold, window): Marks lines that repeat one of the preceding lines.
+"""
+
+DEFAULT_SIMILARITY_THRESHOLD = 0.86899
+
+
+def redundant_mask(
+    embeddings, segments=None, threshold=DEFAULT_SIMILARITY_THRESHOLD, window=1
+):
+    """
+    Mark lines whose embedding is at least `threshold` similar to one of the `window` lines before them.
+
+    Lines are only compared within the same segment, so a segment boundary (for example a structural markdown line) resets
+    the comparison window. With `window=1` every line is compared with the line directly before it.
+
+    Args:
+        embeddings (torch.Tensor): L2-normalized embeddings, one row per line.
+        segments (torch.Tensor, optional): A segment id per row. Defaults to a single segment.
+        threshold (float): The similarity at or above which a line is redundant. Defaults to 0.86899.
+        window (int): How many preceding lines each line is compared against. Defaults to 1.
+
+    Returns:
+        torch.Tensor: A boolean tensor that is True for redundant lines.
+    """
+    import torch
+
+    count = embeddings.shape[0]
+    redundant = torch.zeros(count, dtype=torch.bool)
+    for offset in range(1, min(window, count - 1) + 1):
+        similarities = (embeddings[offset:] * embeddings[:-offset]).sum(dim=1)
+        matches = similarities >= threshold
+        if segments is not None:
+            matches &= segments[offset:] == segments[:-offset]
+        redundant[offset:] |= matches
+    return redundant
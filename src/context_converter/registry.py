@@ -0,0 +1,312 @@
+"""
+This module provides a process-wide registry for the embedding model used by the HTML to Markdown conversion project.
+
+Loading the Jina tokenizer and model is by far the most expensive part of constructing a converter. The registry loads each model once per process and hands the same tokenizer and model to every HTMLToMarkdownConverter that asks for it, so converters can be created per chunk at almost no cost.
+
+Models prefetched with `download_jina.py` are loaded from their local artifact, with memory-mapped safetensors weights and without contacting the hub. In offline mode a missing artifact is an error instead of a download.
+
+Classes:
+    ModelRegistry: A thread-safe cache of (tokenizer, model) pairs keyed by model name and inference backend.
+    ArtifactNotFoundError: Raised in offline mode when a model has not been prefetched.
+
+Functions:
+    get_registry(): Returns the default process-wide ModelRegistry.
+    cache_home(): Returns the directory the project caches per-user files in.
+    default_artifact_root(): Returns the directory prefetched model artifacts are stored in.
+    find_artifact(model_name, revision, root): Returns the local artifact of a model, if it has been prefetched.
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+
+DEFAULT_MODEL_NAME = "jinaai/jina-embeddings-v2-small-en"
+ARTIFACT_FILE = "artifact.json"
+
+
+def cache_home():
+    """
+    Return the directory the project caches per-user files in: `$XDG_CACHE_HOME/context_converter`, defaulting to
+    `~/.cache/context_converter`.
+    """
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "context_converter")
+
+
+def default_artifact_root():
+    """
+    Return the directory prefetched model artifacts are stored in: `$CONTEXT_CONVERTER_MODELS`, or `models` in
+    `cache_home()`.
+    """
+    if os.environ.get("CONTEXT_CONVERTER_MODELS"):
+        return os.environ["CONTEXT_CONVERTER_MODELS"]
+    return os.path.join(cache_home(), "models")
+
+
+def artifact_path(model_name, revision, root=None):
+    """
+    Return the directory the artifact of a model revision is stored in.
+
+    Args:
+        model_name (str): The pretrained checkpoint name.
+        revision (str): The revision the artifact is pinned to.
+        root (str, optional): The artifact root. Defaults to `default_artifact_root()`.
+
+    Returns:
+        str: The artifact directory.
+    """
+    return os.path.join(
+        root or default_artifact_root(), model_name.strip("/").replace("/", "--"), revision
+    )
+
+
+def find_artifact(model_name, revision=None, root=None):
+    """
+    Return the local artifact of a model, if it has been prefetched.
+
+    Args:
+        model_name (str): The pretrained checkpoint name.
+        revision (str, optional): The pinned revision. Defaults to the most recently prefetched one.
+        root (str, optional): The artifact root. Defaults to `default_artifact_root()`.
+
+    Returns:
+        str: The artifact directory, or None if there is no complete artifact.
+    """
+    if revision:
+        path = artifact_path(model_name, revision, root)
+        return path if os.path.exists(os.path.join(path, ARTIFACT_FILE)) else None
+    model_dir = os.path.dirname(artifact_path(model_name, "main", root))
+    try:
+        revisions = os.listdir(model_dir)
+    except FileNotFoundError:
+        return None
+    complete = [
+        os.path.join(model_dir, name, ARTIFACT_FILE)
+        for name in revisions
+        if os.path.exists(os.path.join(model_dir, name, ARTIFACT_FILE))
+    ]
+    if not complete:
+        return None
+    return os.path.dirname(max(complete, key=os.path.getmtime))
+
+
+def low_memory_load_kwargs():
+    """
+    Return `from_pretrained` keyword arguments that load weights without materializing a second full copy.
+
+    Transformers 4 needs accelerate for `low_cpu_mem_usage`; transformers 5 always loads this way.
+    """
+    if importlib.util.find_spec("accelerate") is None:
+        return {}
+    return {"low_cpu_mem_usage": True}
+
+
+class ArtifactNotFoundError(FileNotFoundError):
+    """
+    Raised in offline mode when a model has no local artifact. The message names the prefetch command.
+    """
+
+
+class ModelRegistry:
+    """
+    A thread-safe, process-wide cache of embedding models.
+
+    Attributes:
+        artifact_root (str): The directory prefetched artifacts are looked up in.
+        revision (str): The artifact revision to load. Defaults to the most recently prefetched one.
+        offline (bool): Whether a model without a local artifact is an error instead of a hub download.
+        _models (dict): Maps a (model name, backend) key to its loaded (tokenizer, model) pair.
+
+    Methods:
+        get(model_name): Returns the (tokenizer, model) pair, loading it on first use.
+        configure(artifact_root, revision, offline): Changes where and how models are loaded.
+        register(model_name, tokenizer, model): Injects a preloaded tokenizer and model.
+        warm_up(model_name): Loads the model and runs a single forward pass.
+        unload(model_name): Drops one model, or every model, from the registry.
+        is_loaded(model_name): Reports whether a model is currently held.
+    """
+
+    def __init__(self, artifact_root=None, revision=None, offline=False):
+        """
+        Initializes an empty registry.
+
+        Args:
+            artifact_root (str, optional): The directory prefetched artifacts are looked up in. Defaults to
+                `default_artifact_root()`.
+            revision (str, optional): The artifact revision to load. Defaults to the most recently prefetched one.
+            offline (bool): Fail instead of downloading when a model has no local artifact. Defaults to False.
+
+        Returns:
+            None
+        """
+        self.artifact_root = artifact_root
+        self.revision = revision
+        self.offline = offline
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def configure(self, artifact_root=None, revision=None, offline=False):
+        """
+        Changes where and how models are loaded. Models that are already loaded are kept.
+
+        Args:
+            artifact_root (str, optional): The directory prefetched artifacts are looked up in.
+            revision (str, optional): The artifact revision to load.
+            offline (bool): Fail instead of downloading when a model has no local artifact. Defaults to False.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self.artifact_root = artifact_root
+            self.revision = revision
+            self.offline = offline
+
+    def get(self, model_name=DEFAULT_MODEL_NAME, backend="fp32"):
+        """
+        Returns the tokenizer and model for the given name, loading them on first use.
+
+        Each inference backend is prepared once from the fp32 model. The fp32 model is only kept when it was already
+        loaded or registered, so a run on another backend does not hold both copies.
+
+        Args:
+            model_name (str): The pretrained checkpoint name. Defaults to the Jina small model.
+            backend (str): The inference backend, one of backends.INFERENCE_BACKENDS. Defaults to "fp32".
+
+        Returns:
+            tuple: The (tokenizer, model) pair.
+        """
+        with self._lock:
+            if (model_name, backend) not in self._models:
+                from backends import prepare_model
+
+                tokenizer, model = self._models.get((model_name, "fp32")) or self._load(model_name)
+                self._models[(model_name, backend)] = (
+                    tokenizer,
+                    prepare_model(model, tokenizer, backend),
+                )
+            return self._models[(model_name, backend)]
+
+    def register(self, model_name, tokenizer, model):
+        """
+        Registers a preloaded tokenizer and model under the given name.
+
+        Any converter created afterwards with this model name uses the injected pair instead of loading one.
+
+        Args:
+            model_name (str): The name to register the model under.
+            tokenizer: A callable tokenizer compatible with transformers tokenizers.
+            model: A model returning token embeddings as its first output.
+
+        Returns:
+            None
+        """
+        model.eval()
+        with self._lock:
+            self._unload_locked(model_name)
+            self._models[(model_name, "fp32")] = (tokenizer, model)
+
+    def warm_up(self, model_name=DEFAULT_MODEL_NAME, backend="fp32"):
+        """
+        Loads the model if needed and runs a single forward pass so the first real batch does not pay for lazy initialization.
+
+        Args:
+            model_name (str): The pretrained checkpoint name.
+            backend (str): The inference backend to warm up. Defaults to "fp32".
+
+        Returns:
+            tuple: The (tokenizer, model) pair.
+        """
+        import torch
+
+        tokenizer, model = self.get(model_name, backend)
+        encoded_input = tokenizer(["warm up"], padding=True, return_tensors="pt")
+        with torch.inference_mode():
+            model(**encoded_input)
+        return tokenizer, model
+
+    def unload(self, model_name=None):
+        """
+        Removes a model, with every backend prepared from it, from the registry so its memory can be reclaimed.
+
+        Args:
+            model_name (str, optional): The model to unload. Unloads every model when None.
+
+        Returns:
+            None
+        """
+        with self._lock:
+            self._unload_locked(model_name)
+
+    def _unload_locked(self, model_name=None):
+        """
+        Removes models like `unload`; the caller must hold the registry lock.
+        """
+        if model_name is None:
+            self._models.clear()
+        else:
+            for key in [key for key in self._models if key[0] == model_name]:
+                del self._models[key]
+
+    def is_loaded(self, model_name=DEFAULT_MODEL_NAME, backend="fp32"):
+        """
+        Reports whether the given model is currently held by the registry.
+
+        Args:
+            model_name (str): The model name to check.
+            backend (str): The inference backend to check. Defaults to "fp32".
+
+        Returns:
+            bool: True if the model is loaded.
+        """
+        with self._lock:
+            return (model_name, backend) in self._models
+
+    def _load(self, model_name):
+        """
+        Loads the tokenizer and model, from the local artifact when there is one and from the hub otherwise, and puts
+        the model in evaluation mode.
+
+        Raises:
+            ArtifactNotFoundError: If the registry is offline and the model has not been prefetched.
+        """
+        from transformers import AutoTokenizer, AutoModel
+
+        path = find_artifact(model_name, self.revision, self.artifact_root)
+        if path is not None:
+            logging.info("Loading embedding model %s from %s", model_name, path)
+            tokenizer = AutoTokenizer.from_pretrained(
+                path, local_files_only=True, trust_remote_code=True
+            )
+            # safetensors weights are memory-mapped, so workers on one machine share the page cache
+            model = AutoModel.from_pretrained(
+                path,
+                local_files_only=True,
+                use_safetensors=True,
+                **low_memory_load_kwargs(),
+            )
+        elif self.offline:
+            revision = f" at revision {self.revision}" if self.revision else ""
+            raise ArtifactNotFoundError(
+                f"No local artifact for {model_name}{revision} in "
+                f"{self.artifact_root or default_artifact_root()}. Prefetch it with "
+                f"`python download_jina.py --model {model_name}` or run without offline mode."
+            )
+        else:
+            logging.info("Loading embedding model: %s", model_name)
+            revision = {"revision": self.revision} if self.revision else {}
+            tokenizer = AutoTokenizer.from_pretrained(model_name, trust_remote_code=True, **revision)
+            model = AutoModel.from_pretrained(model_name, **revision)
+        model.eval()
+        return tokenizer, model
+
+
+_default_registry = ModelRegistry()
+
+
+def get_registry():
+    """
+    Returns the default process-wide model registry.
+    """
+    return _default_registry
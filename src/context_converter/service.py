@@ -0,0 +1,463 @@
+"""
+This module provides a long-lived local conversion service and its client for the HTML to Markdown conversion project.
+
+Every run of `main.py` pays for imports and the model load before converting anything, which dominates when pages arrive one at a time from a running crawler. ConversionService loads the model once, keeps it warm and serves conversions over HTTP on a local TCP port or a Unix socket. Concurrent requests go through a ConversionEngine with a shared EmbeddingMicroBatcher, so their lines are embedded in shared forward passes. When more requests are pending than the service accepts, new ones are refused with 503 and a Retry-After header instead of queueing without bound.
+
+Endpoints:
+    POST /convert: Takes {"html": ...}, optionally with "title" and "url", and returns {"markdown": ...}. With a title
+        the markdown is structured under a "## title" heading, as in the dataset output.
+    GET /health: Returns {"status": "ok"} once the model is loaded.
+    GET /stats: Returns request counters, micro-batching counters and per-stage metrics.
+
+Everything runs on the local machine. With `--offline`, the model is loaded from its prefetched artifact and the service makes no network requests at all.
+
+Usage:
+    python service.py serve --address unix:/tmp/context-converter.sock
+    python service.py convert --address unix:/tmp/context-converter.sock < page.html
+
+Classes:
+    ConversionService: Serves conversions from one warm converter.
+    ServiceClient: A thin, blocking client for the service.
+    ServiceError: Raised by ServiceClient when the service refuses or fails a request.
+"""
+
+import argparse
+import asyncio
+import functools
+import http.client
+import json
+import logging
+import socket
+import sys
+import time
+
+from backends import INFERENCE_BACKENDS
+from converter import DEDUP_MODES, HTMLToMarkdownConverter
+from engine import ConversionEngine
+from formatter import DatasetFormatter
+from metrics import Metrics
+from microbatch import EmbeddingMicroBatcher
+from registry import get_registry
+
+DEFAULT_ADDRESS = "127.0.0.1:8765"
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+
+def parse_address(address):
+    """
+    Parse a service address of the form "host:port" or "unix:/path/to/socket".
+
+    Args:
+        address (str): The address.
+
+    Returns:
+        tuple: ("unix", path) or ("tcp", (host, port)).
+
+    Raises:
+        ValueError: If a TCP address has no valid port.
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:") :]
+    host, _, port = address.rpartition(":")
+    try:
+        return "tcp", (host or "127.0.0.1", int(port))
+    except ValueError:
+        raise ValueError(f"address must look like host:port or unix:/path, got {address!r}") from None
+
+
+class ConversionService:
+    """
+    Serves HTML to Markdown conversions from one converter whose model stays loaded.
+
+    Attributes:
+        converter (HTMLToMarkdownConverter): The converter shared by every request.
+        engine (ConversionEngine): Runs conversions concurrently.
+        max_pending (int): The number of requests accepted at once; further requests get 503.
+        requests (int): The number of conversions completed.
+        failed (int): The number of conversions that raised.
+        rejected (int): The number of requests refused because the service was full.
+        in_flight (int): The number of conversions currently accepted.
+
+    Methods:
+        start(address): Asynchronously loads the model and starts listening.
+        serve_forever(address): Asynchronously runs the service until cancelled.
+        stats(): Returns the service counters.
+        close(): Stops listening and shuts down the engine.
+    """
+
+    def __init__(self, converter, workers=0, max_concurrency=None, max_pending=256, micro_batch_size=64):
+        """
+        Initializes the service.
+
+        Args:
+            converter (HTMLToMarkdownConverter): The converter to serve. It gets a micro-batcher and metrics if it has none.
+            workers (int): Markdown worker processes. Defaults to 0, which converts markdown in a thread and keeps
+                per-page latency low; raise it when pages are large or arrive faster than one core converts them.
+            max_concurrency (int, optional): Conversions run at once. Defaults to ConversionEngine's default.
+            max_pending (int): Requests accepted at once, running or waiting. Defaults to 256.
+            micro_batch_size (int): Lines per shared embedding batch. 0 embeds each request on its own. Defaults to 64.
+
+        Returns:
+            None
+        """
+        self.converter = converter
+        if not converter.metrics.enabled:
+            converter.metrics = Metrics()
+        if converter.dedup == "semantic" and micro_batch_size and converter.batcher is None:
+            converter.batcher = EmbeddingMicroBatcher(
+                functools.partial(converter._process_embeddings, batch_size=micro_batch_size),
+                max_batch_size=micro_batch_size,
+            )
+        self.engine = ConversionEngine(converter, workers=workers, max_concurrency=max_concurrency)
+        self.formatter = DatasetFormatter(converter)
+        self.max_pending = max_pending
+        self.requests = 0
+        self.failed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self._started = None
+        self._server = None
+
+    async def start(self, address=DEFAULT_ADDRESS):
+        """
+        Load and warm up the model, then start listening.
+
+        Args:
+            address (str): "host:port" or "unix:/path/to/socket". Defaults to "127.0.0.1:8765".
+
+        Returns:
+            None
+        """
+        if self.converter.dedup == "semantic":
+            with self.converter.metrics.stage("model_load"):
+                self.converter._initialize_embedding_model()
+                self.converter.registry.warm_up(self.converter.model_name, self.converter.backend)
+        kind, target = parse_address(address)
+        if kind == "unix":
+            self._server = await asyncio.start_unix_server(self._handle_connection, path=target)
+        else:
+            self._server = await asyncio.start_server(self._handle_connection, *target)
+        self._started = time.monotonic()
+        logging.info("Conversion service listening on %s", address)
+
+    async def serve_forever(self, address=DEFAULT_ADDRESS):
+        """
+        Start the service and run it until cancelled.
+
+        Args:
+            address (str): "host:port" or "unix:/path/to/socket". Defaults to "127.0.0.1:8765".
+
+        Returns:
+            None
+        """
+        await self.start(address)
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            self.close()
+
+    def stats(self):
+        """
+        Return the service counters, the micro-batching counters and the per-stage metrics.
+
+        Returns:
+            dict: The statistics served by GET /stats.
+        """
+        batcher = self.converter.batcher
+        return {
+            "requests": self.requests,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "in_flight": self.in_flight,
+            "max_pending": self.max_pending,
+            "uptime_s": time.monotonic() - self._started if self._started else 0.0,
+            "batching": batcher.stats() if batcher else None,
+            "metrics": self.converter.metrics.summary(),
+        }
+
+    def close(self):
+        """
+        Stop listening and shut down the engine and the micro-batcher.
+        """
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+        self.engine.close()
+        if self.converter.batcher is not None:
+            self.converter.batcher.close()
+            self.converter.batcher = None
+
+    async def _handle_connection(self, reader, writer):
+        """
+        Serve HTTP/1.1 requests on one connection until the client closes it.
+        """
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                status, payload, extra_headers = await self._route(method, path, body)
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(_format_response(status, payload, extra_headers, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            logging.error("Error serving connection: %s", e)
+        finally:
+            writer.close()
+
+    async def _route(self, method, path, body):
+        """
+        Dispatch one request and return its status, JSON payload and extra headers.
+        """
+        if path == "/health":
+            return 200, {"status": "ok"}, {}
+        if path == "/stats":
+            return 200, self.stats(), {}
+        if path != "/convert":
+            return 404, {"error": f"unknown path {path}"}, {}
+        if method != "POST":
+            return 405, {"error": "use POST"}, {}
+        if self.in_flight >= self.max_pending:
+            self.rejected += 1
+            return 503, {"error": "service is at capacity"}, {"Retry-After": "1"}
+        try:
+            request = json.loads(body or b"{}")
+            html_content = request["html"]
+        except (ValueError, KeyError, TypeError):
+            return 400, {"error": 'body must be a JSON object with an "html" field'}, {}
+        self.in_flight += 1
+        try:
+            markdown_content = await self.engine.convert(html_content or "")
+        except Exception as e:
+            self.failed += 1
+            logging.error("Error converting request: %s", e)
+            return 500, {"error": str(e)}, {}
+        finally:
+            self.in_flight -= 1
+        self.requests += 1
+        if request.get("title"):
+            markdown_content = self.formatter.structure_markdown(
+                request["title"], request.get("url", ""), markdown_content
+            )
+        return 200, {"markdown": markdown_content}, {}
+
+
+async def _read_request(reader):
+    """
+    Read one HTTP request, returning (method, path, headers, body), or None when the connection is closed.
+    """
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    method, path, _ = request_line.decode("latin1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def _format_response(status, payload, extra_headers, keep_alive):
+    """
+    Encode a JSON HTTP response.
+    """
+    body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(body)),
+        "Connection": "keep-alive" if keep_alive else "close",
+        **extra_headers,
+    }
+    head = f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+    head += "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+    return head.encode("latin1") + b"\r\n" + body
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    An HTTPConnection over a Unix socket.
+    """
+
+    def __init__(self, path, timeout=None):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class ServiceError(RuntimeError):
+    """
+    Raised when the service refuses or fails a request.
+
+    Attributes:
+        status (int): The HTTP status, 503 when the service is at capacity.
+    """
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class ServiceClient:
+    """
+    A thin, blocking client for ConversionService that keeps one connection open.
+
+    A client is not thread-safe; give each thread its own.
+
+    Methods:
+        convert(html_content, title, url): Converts one HTML document.
+        health(): Returns the health status.
+        stats(): Returns the service statistics.
+        close(): Closes the connection.
+    """
+
+    def __init__(self, address=DEFAULT_ADDRESS, timeout=60.0):
+        """
+        Initializes the client. The connection is opened on the first request.
+
+        Args:
+            address (str): "host:port" or "unix:/path/to/socket". Defaults to "127.0.0.1:8765".
+            timeout (float): Socket timeout in seconds. Defaults to 60.
+
+        Returns:
+            None
+        """
+        kind, target = parse_address(address)
+        if kind == "unix":
+            self._connection = _UnixHTTPConnection(target, timeout=timeout)
+        else:
+            self._connection = http.client.HTTPConnection(*target, timeout=timeout)
+
+    def convert(self, html_content, title=None, url=None):
+        """
+        Convert one HTML document.
+
+        Args:
+            html_content (str): The HTML content.
+            title (str, optional): Structure the markdown under this title, as in the dataset output.
+            url (str, optional): The page URL, shown under the title.
+
+        Returns:
+            str: The deduplicated markdown.
+
+        Raises:
+            ServiceError: If the service is at capacity or the conversion failed.
+        """
+        request = {"html": html_content}
+        if title:
+            request.update(title=title, url=url or "")
+        return self._request("POST", "/convert", request)["markdown"]
+
+    def health(self):
+        """
+        Return the health status, {"status": "ok"} when the service is ready.
+        """
+        return self._request("GET", "/health")
+
+    def stats(self):
+        """
+        Return the service statistics.
+        """
+        return self._request("GET", "/stats")
+
+    def close(self):
+        """
+        Close the connection.
+        """
+        self._connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _request(self, method, path, payload=None):
+        """
+        Send one request and return its decoded JSON response, reconnecting once if the connection was dropped.
+        """
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        for attempt in range(2):
+            try:
+                self._connection.request(method, path, body=body, headers=headers)
+                response = self._connection.getresponse()
+                data = json.loads(response.read() or b"{}")
+                break
+            except ConnectionError:
+                self._connection.close()
+                if attempt:
+                    raise
+        if response.status != 200:
+            raise ServiceError(response.status, data.get("error", ""))
+        return data
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line arguments for the service and its client.
+
+    :param argv: Argument list to parse. Defaults to sys.argv.
+    :return: The parsed arguments.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve HTML to Markdown conversions from a warm model, or send one page to a running service."
+    )
+    parser.add_argument("command", choices=("serve", "convert", "stats"), help="Run the service, convert stdin, or print statistics.")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="host:port or unix:/path/to/socket.")
+    parser.add_argument("--dedup", choices=DEDUP_MODES, default="semantic", help="Line deduplication mode.")
+    parser.add_argument("--backend", choices=INFERENCE_BACKENDS, default="fp32", help="Embedding inference backend.")
+    parser.add_argument("--num-threads", type=int, help="Intra-op threads for embedding inference.")
+    parser.add_argument("--workers", type=int, default=0, help="Markdown worker processes. 0 converts in a thread.")
+    parser.add_argument("--max-concurrency", type=int, help="Conversions run at once.")
+    parser.add_argument("--max-pending", type=int, default=256, help="Requests accepted at once before answering 503.")
+    parser.add_argument("--micro-batch-size", type=int, default=64, help="Lines per shared embedding batch.")
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Load the model only from its local artifact (see download_jina.py); fail if it is missing.",
+    )
+    parser.add_argument("--model-revision", help="The model revision to load, as pinned by download_jina.py.")
+    parser.add_argument("--title", help="With convert, structure the markdown under this title.")
+    parser.add_argument("--url", help="With convert, the page URL shown under the title.")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    if args.command == "serve":
+        get_registry().configure(revision=args.model_revision, offline=args.offline)
+        service = ConversionService(
+            HTMLToMarkdownConverter(dedup=args.dedup, backend=args.backend, num_threads=args.num_threads),
+            workers=args.workers,
+            max_concurrency=args.max_concurrency,
+            max_pending=args.max_pending,
+            micro_batch_size=args.micro_batch_size,
+        )
+        try:
+            asyncio.run(service.serve_forever(args.address))
+        except KeyboardInterrupt:
+            pass
+    else:
+        with ServiceClient(args.address) as client:
+            if args.command == "stats":
+                print(json.dumps(client.stats(), indent=2))
+            else:
+                print(client.convert(sys.stdin.read(), title=args.title, url=args.url))
@@ -0,0 +1,325 @@
+"""
+This module provides the sharded, multi-process command line for the HTML to Markdown conversion project.
+
+`main.py` converts a whole crawl in one process. This command splits the input into shards and converts them in a pool of worker processes, each of which loads the embedding model once, then merges the shard outputs back into input order.
+
+With `--save-embeddings`, each worker keeps an embedding store next to its shard file, indexed by input position, and the merge step combines the stores into one in input order.
+
+Corpus deduplication has to see every entry in input order, so with `--corpus-dedup` the workers convert without it and the merge step deduplicates the merged records instead.
+
+The split composes across machines that share a filesystem. `--shard i/n` selects this machine's share of the input, and `--workers w` splits that share again between w local processes, so worker k converts global shard i + n * k of n * w. Every shard record carries its input position, so the merge step only needs the shard files. Every machine must use the same number of workers, so that the shard files form one split of the input.
+
+Usage:
+    python sharding.py run --workers 4 [main.py options]               # one machine, merged automatically
+    python sharding.py run --shard 0/2 --workers 4 [main.py options]   # machine 0 of 2
+    python sharding.py merge --output out.md [--output-format jsonl] [--corpus-dedup]   # after every machine has finished
+
+Functions:
+    shard_path(output_file_name, index, count): Returns the file a shard's records are written to.
+    run_shards(kwargs, shard, workers): Converts this machine's shards in a process pool.
+    merge_shards(output_file_name, ...): Merges every shard file of an output into input order, optionally deduplicating it.
+"""
+
+import argparse
+import asyncio
+import glob
+import heapq
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import main as pipeline
+from backends import threads_per_worker
+from dedup import CorpusDeduplicator
+from embedding_store import EmbeddingStore, load_embeddings
+from formatter import DatasetFormatter
+from metrics import LogSink, Metrics
+from registry import ArtifactNotFoundError
+from utils import parse_shard
+from writer import OutputWriter
+
+
+_SHARD_NAME = re.compile(r"shard-\d+-of-\d+\.jsonl")
+
+
+def shard_path(output_file_name, index, count):
+    """
+    Return the file that records of shard `index` of `count` are written to.
+
+    Args:
+        output_file_name (str): The final output file.
+        index (int): The shard index.
+        count (int): The total number of shards.
+
+    Returns:
+        str: A JSONL path in the output's shard directory.
+    """
+    return os.path.join(
+        f"{output_file_name}.shards", f"shard-{index:05d}-of-{count:05d}.jsonl"
+    )
+
+
+def _run_shard(kwargs, log_metrics=False):
+    """
+    Convert one shard in a worker process.
+    """
+    logging.basicConfig(level=logging.INFO)
+    metrics = Metrics([LogSink()]) if log_metrics else None
+    asyncio.run(pipeline.main(**kwargs, metrics=metrics))
+    return kwargs["output_file_name"]
+
+
+def run_shards(kwargs, shard=(0, 1), workers=1, log_metrics=False):
+    """
+    Convert this machine's share of the input in a pool of worker processes.
+
+    Each worker runs `main.main` on its own shard, loading the model once, converting markdown in-process and using an
+    even share of the cores for inference. Shard records are written as JSONL with input positions. Corpus
+    deduplication is left to `merge_shards`, since each worker only sees its own shard.
+
+    Args:
+        kwargs (dict): Keyword arguments for `main.main`, as built by `main.main_kwargs`.
+        shard (tuple): This machine's (index, count) share of the input. Defaults to the whole input.
+        workers (int): The number of worker processes. Defaults to 1.
+        log_metrics (bool): Whether each worker logs its own per-stage metrics. Defaults to False.
+
+    Returns:
+        list: The shard files written.
+    """
+    index, count = shard
+    total = count * workers
+    kwargs = {key: value for key, value in kwargs.items() if key != "metrics"}
+    if count == 1:
+        # This machine converts the whole input, so shard files of earlier runs can only be stale
+        for path in _shard_files(kwargs["output_file_name"]):
+            for stale in (path, f"{path}.embeddings.npy", f"{path}.embeddings.jsonl"):
+                if os.path.exists(stale):
+                    os.remove(stale)
+    jobs = []
+    for worker in range(workers):
+        global_index = index + count * worker
+        path = shard_path(kwargs["output_file_name"], global_index, total)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        job = dict(
+            kwargs,
+            output_file_name=path,
+            output_format="jsonl",
+            max_file_bytes=None,
+            max_file_entries=None,
+            compress=False,
+            shard=(global_index, total),
+            workers=0,
+            corpus_dedup=False,
+            num_threads=kwargs.get("num_threads") or threads_per_worker(workers),
+        )
+        if kwargs.get("manifest_dir"):
+            job["manifest_dir"] = os.path.join(
+                kwargs["manifest_dir"], f"shard-{global_index:05d}-of-{total:05d}"
+            )
+        jobs.append(job)
+    if workers == 1:
+        return [_run_shard(jobs[0], log_metrics)]
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        return list(pool.map(_run_shard, jobs, [log_metrics] * workers))
+
+
+def _shard_files(output_file_name):
+    """
+    Return the shard files of an output, sorted by name. The embedding stores kept next to them are not included.
+    """
+    paths = glob.glob(os.path.join(f"{output_file_name}.shards", "shard-[0-9]*-of-[0-9]*.jsonl"))
+    return sorted(path for path in paths if _SHARD_NAME.fullmatch(os.path.basename(path)))
+
+
+def _check_shards(paths):
+    """
+    Check that shard files come from one split of the input and that none is missing.
+    """
+    names = [os.path.basename(path)[len("shard-") : -len(".jsonl")] for path in paths]
+    shards = [tuple(int(part) for part in name.split("-of-")) for name in names]
+    totals = {total for _, total in shards}
+    if len(totals) != 1:
+        raise ValueError(
+            f"Shard files come from splits into {sorted(totals)} shards; remove the stale ones before merging"
+        )
+    (total,) = totals
+    missing = sorted(set(range(total)) - {index for index, _ in shards})
+    if missing:
+        raise ValueError(f"Shards {missing} of {total} have not been converted yet")
+
+
+def merge_shards(
+    output_file_name,
+    output_format="markdown",
+    max_file_bytes=None,
+    max_file_entries=None,
+    compress=False,
+    corpus_dedup=False,
+    embeddings_dtype=None,
+):
+    """
+    Merge every shard file of an output into input order.
+
+    Each shard file is already in input order, so the files are merged lazily by position without loading them. With
+    `corpus_dedup`, the merged records are deduplicated in input order, exactly as a single process would. With
+    `embeddings_dtype`, the shards' embedding stores are merged into one store next to the output, keeping only the
+    lines that are still in the merged output.
+
+    Args:
+        output_file_name (str): The final output file, whose shard directory is read.
+        output_format (str): The final output format, one of OUTPUT_FORMATS. Defaults to "markdown".
+        max_file_bytes (int, optional): Split the final output into numbered files of about this many bytes.
+        max_file_entries (int, optional): Split the final output into numbered files of this many entries.
+        compress (bool): Whether to gzip the final output. Defaults to False.
+        corpus_dedup (bool): Whether to drop paragraphs that near-duplicate paragraphs of earlier entries. Defaults to
+            False.
+        embeddings_dtype (str, optional): The precision of the merged embedding store, "float32" or "float16".
+            Defaults to None, which merges no embeddings.
+
+    Returns:
+        int: The number of entries written.
+
+    Raises:
+        FileNotFoundError: If there are no shard files.
+        ValueError: If shard files are missing or come from different splits of the input.
+    """
+    paths = _shard_files(output_file_name)
+    if not paths:
+        raise FileNotFoundError(f"No shard files found for {output_file_name}")
+    _check_shards(paths)
+    logging.info("Merging %d shard files into %s", len(paths), output_file_name)
+    formatter = DatasetFormatter(None)
+    deduplicator = CorpusDeduplicator() if corpus_dedup else None
+    shard_stores = _open_shard_stores(paths) if embeddings_dtype else None
+    store = None
+    if shard_stores is not None:
+        store = EmbeddingStore(f"{output_file_name}.embeddings", embeddings_dtype)
+    files = [open(path, "r", encoding="utf-8") for path in paths]
+    try:
+        records = heapq.merge(
+            *(zip(itertools.repeat(shard), map(json.loads, file)) for shard, file in enumerate(files)),
+            key=lambda item: item[1]["position"],
+        )
+        with OutputWriter(
+            output_file_name,
+            format=output_format,
+            max_bytes=max_file_bytes,
+            max_entries=max_file_entries,
+            compress=compress,
+            atomic=True,
+        ) as writer:
+            for shard, record in records:
+                content = record["markdown"]
+                if deduplicator is not None:
+                    content = deduplicator.filter(content).strip()
+                if writer.structured:
+                    content = formatter.structure_markdown(
+                        record["title"], record["url"], content
+                    )
+                if store is not None:
+                    _merge_embeddings(store, shard_stores[shard], record, content)
+                writer.write(record, content)
+        if deduplicator is not None:
+            logging.info("Corpus deduplication: %s", deduplicator.stats())
+        if store is not None:
+            store.close()
+            logging.info("Saved %d line embeddings to %s.npy", store.rows, store.base_path)
+        return writer.entries
+    finally:
+        for file in files:
+            file.close()
+        if store is not None:
+            store.close()
+
+
+def _open_shard_stores(paths):
+    """
+    Memory-map the embedding store of every shard file, or return None if a shard has no store.
+    """
+    missing = [path for path in paths if not os.path.exists(f"{path}.embeddings.npy")]
+    if missing:
+        logging.warning("Shards %s have no embedding store; no embeddings are merged", missing)
+        return None
+    stores = []
+    for path in paths:
+        embeddings, index = load_embeddings(f"{path}.embeddings")
+        index = iter(index)
+        stores.append({"embeddings": embeddings, "index": index, "next": next(index, None)})
+    return stores
+
+
+def _merge_embeddings(store, shard_store, record, content):
+    """
+    Add the stored embeddings of a merged record's lines that are still in its final content to the merged store.
+
+    A shard's index records are in input order and skip entries without kept lines, so the index is read up to the
+    record's position.
+    """
+    import numpy
+    import torch
+
+    entry = shard_store["next"]
+    while entry is not None and entry["position"] < record["position"]:
+        entry = next(shard_store["index"], None)
+    shard_store["next"] = entry
+    if entry is None or entry["position"] != record["position"]:
+        return
+    emitted = set(content.split("\n"))
+    kept = [i for i, line in enumerate(entry["lines"]) if line in emitted]
+    rows = shard_store["embeddings"][entry["row"] : entry["row"] + len(entry["lines"])]
+    store.add(record, [entry["lines"][i] for i in kept], torch.from_numpy(numpy.array(rows[kept])))
+
+
+def parse_args(argv=None):
+    """
+    Parse command-line arguments for the sharded pipeline.
+
+    :param argv: Argument list to parse. Defaults to sys.argv.
+    :return: The parsed sharding arguments and the remaining arguments for main.py.
+    """
+    parser = argparse.ArgumentParser(
+        description="Convert a crawl in shards across processes and machines, then merge the results in input order."
+    )
+    parser.add_argument("command", choices=("run", "merge"), help="Convert shards, or merge finished shards.")
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=(0, 1),
+        help="This machine's share of the input, written as I/N. Defaults to the whole input.",
+    )
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes on this machine, each with its own model.")
+    parser.add_argument(
+        "--no-merge",
+        action="store_true",
+        help="Do not merge after a run that covers the whole input.",
+    )
+    return parser.parse_known_args(argv)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    args, rest = parse_args()
+    main_args = pipeline.parse_args(rest)
+    kwargs = pipeline.main_kwargs(main_args)
+    if args.command == "run":
+        try:
+            run_shards(kwargs, args.shard, args.workers, "log" in (main_args.metrics or []))
+        except ArtifactNotFoundError:
+            sys.exit(1)
+    if args.command == "merge" or (args.shard[1] == 1 and not args.no_merge):
+        merge_shards(
+            kwargs["output_file_name"],
+            output_format=kwargs["output_format"],
+            max_file_bytes=kwargs["max_file_bytes"],
+            max_file_entries=kwargs["max_file_entries"],
+            compress=kwargs["compress"],
+            corpus_dedup=kwargs["corpus_dedup"],
+            embeddings_dtype=kwargs["embeddings_dtype"],
+        )
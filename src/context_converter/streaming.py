@@ -0,0 +1,179 @@
+"""
+This module splits HTML documents into sections incrementally for streaming conversion in the HTML to Markdown conversion project.
+
+Converting a page of tens of MB at once holds its parsed tree, the curated HTML, the full markdown and an embedding for every line in memory together. `iter_html_sections` instead feeds the document to lxml's pull parser in chunks and hands out each top-most block element (a paragraph, heading, list, table, code block and so on) as soon as it is closed, then removes it from the tree, so only the open ancestors and the current block are ever held.
+
+Content outside any block, such as text directly inside a container, is handed out just before the next section, so the sections stay in document order. Each section is returned as standalone HTML wrapped in copies of its ancestors' start tags, with their attributes, so curation still removes blocks inside navigation, footers, forms and other page chrome exactly as it does for the whole document.
+
+Functions:
+    iter_html_sections(html, chunk_size): Yields the sections of a document as standalone HTML, in document order.
+"""
+
+from html import escape
+
+# Elements converted as one section. A block inside another block stays part of the outer one
+SECTION_TAGS = frozenset(
+    [
+        "p",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "ul",
+        "ol",
+        "dl",
+        "table",
+        "pre",
+        "blockquote",
+        "hr",
+        "figure",
+    ]
+)
+
+
+def iter_html_sections(html, chunk_size=1 << 16, section_size=1 << 16):
+    """
+    Parse an HTML document incrementally and yield its sections as standalone HTML, in document order.
+
+    Top-most block elements are taken out of the tree when they close. Content outside any block, such as text directly
+    inside a container, is taken out just before the next block, or when the body closes. Consecutive pieces with the
+    same parent are yielded together, up to about `section_size` characters, so each yielded section is a contiguous
+    slice of the document and converts exactly as it would in place.
+
+    Args:
+        html (str or iterable): The document, or an iterable of str or bytes chunks such as a file read in pieces.
+        chunk_size (int): The number of characters fed to the parser at a time when `html` is a string. Defaults to 64 KiB.
+        section_size (int): The number of characters at which a section is yielded without waiting for more pieces
+            with the same parent. Defaults to 64 KiB.
+
+    Yields:
+        str: The HTML of each section, wrapped in its ancestors' start tags.
+    """
+    from lxml import etree
+
+    parser = etree.HTMLPullParser(events=("end",))
+    if isinstance(html, (str, bytes)):
+        chunks = (html[i : i + chunk_size] for i in range(0, len(html), chunk_size))
+    else:
+        chunks = html
+    group = []
+    group_ancestors = None
+    size = 0
+    for ancestors, piece in _iter_pieces(parser, chunks):
+        if group and (size >= section_size or not _same(ancestors, group_ancestors)):
+            yield _standalone_html("".join(group), group_ancestors)
+            group, size = [], 0
+        group.append(piece)
+        group_ancestors = ancestors
+        size += len(piece)
+    if group:
+        yield _standalone_html("".join(group), group_ancestors)
+
+
+def _iter_pieces(parser, chunks):
+    """
+    Feed the chunks to the parser and yield the (ancestors, html) pieces of the document as they complete.
+    """
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from _read_pieces(parser)
+    parser.close()
+    yield from _read_pieces(parser)
+
+
+def _same(first, second):
+    """
+    Report whether two ancestor lists hold the same elements.
+    """
+    return len(first) == len(second) and all(a is b for a, b in zip(first, second))
+
+
+def _read_pieces(parser):
+    """
+    Yield the (ancestors, html) pieces completed by the events the parser has produced so far.
+    """
+    for _, element in parser.read_events():
+        if not isinstance(element.tag, str):
+            continue
+        if element.tag == "body":
+            # Everything still in the body is content outside any section
+            yield from _take_preceding(element, None)
+        elif element.tag == "head" or (
+            element.tag in SECTION_TAGS
+            and not any(ancestor.tag in SECTION_TAGS for ancestor in element.iterancestors())
+        ):
+            yield from _take_preceding(element.getparent(), element)
+            yield _ancestors(element), _serialize(element, with_tail=False)
+            _detach(element)
+
+
+def _ancestors(element):
+    """
+    Return the ancestors of an element below the root, outermost first.
+    """
+    return [ancestor for ancestor in reversed(list(element.iterancestors())) if ancestor.tag != "html"]
+
+
+def _take_preceding(parent, child):
+    """
+    Yield as (ancestors, html) pieces and remove the content of `parent` and its ancestors that precedes `child`, outermost first, or all of the
+    content of `parent` when `child` is None.
+
+    Sections are removed from the tree as they are yielded, so this content lies outside any section.
+    """
+    levels = []
+    while parent is not None and parent.tag != "html":
+        levels.append((parent, child))
+        parent, child = parent.getparent(), parent
+    for parent, child in reversed(levels):
+        if child is None:
+            preceding = list(parent)
+        else:
+            preceding = list(child.itersiblings(preceding=True))[::-1]
+        html = escape(parent.text or "") + "".join(_serialize(element) for element in preceding)
+        if html:
+            yield _ancestors(parent) + [parent], html
+        parent.text = None
+        for element in preceding:
+            parent.remove(element)
+
+
+def _serialize(element, with_tail=True):
+    """
+    Serialize an element, together with the text that follows it unless `with_tail` is False.
+    """
+    from lxml import etree
+
+    return etree.tostring(element, encoding="unicode", method="html", with_tail=with_tail)
+
+
+def _standalone_html(html, ancestors):
+    """
+    Wrap HTML in copies of the given ancestors' start tags, with their attributes, and matching end tags.
+    """
+    opening = "".join(
+        "<%s%s>"
+        % (
+            ancestor.tag,
+            "".join(f' {name}="{escape(value)}"' for name, value in ancestor.attrib.items()),
+        )
+        for ancestor in ancestors
+    )
+    closing = "".join(f"</{ancestor.tag}>" for ancestor in reversed(ancestors))
+    return opening + html + closing
+
+
+def _detach(element):
+    """
+    Remove a converted element from the tree, keeping the text that follows it in its parent.
+    """
+    parent = element.getparent()
+    if element.tail:
+        previous = element.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or "") + element.tail
+        else:
+            parent.text = (parent.text or "") + element.tail
+    parent.remove(element)
@@ -18,17 +18,76 @@ async def load_json_files(pattern):
         list: The aggregated data from the JSON files, or an empty list if an error occurs.
     """
     try:
-        aggregated_data = []
-        for file_path in glob.glob(pattern):
-            async with aiofiles.open(file_path, "r", encoding="utf-8") as file:
-                data = await file.read()
-                aggregated_data.extend(json.loads(data))
-        return aggregated_data
+        return [entry async for entry in iter_json_entries(pattern)]
     except Exception as e:
         logging.error("Error loading JSON files: %s", e)
         return []
 
 
+async def iter_json_entries(pattern, read_size=1 << 16):
+    """
+    Asynchronously yields entries from JSON files matching the given pattern, parsing each file incrementally.
+
+    Each file may hold a JSON array of entries or one entry per line (JSONL). Only the entry being parsed and one read
+    buffer are held in memory, so memory use does not grow with the size of the files.
+
+    Args:
+        pattern (str): The pattern to match JSON files.
+        read_size (int): The number of characters read from a file at a time. Defaults to 65536.
+
+    Yields:
+        The entries of each file, in file and document order.
+
+    Raises:
+        json.JSONDecodeError: If a file holds malformed JSON, including an array that is not closed.
+    """
+    decoder = json.JSONDecoder()
+    for file_path in sorted(glob.glob(pattern)):
+        async with aiofiles.open(file_path, "r", encoding="utf-8") as file:
+            buffer = ""
+            position = 0
+            eof = False
+            started = False
+            in_array = False
+            size = read_size
+            while True:
+                # Skip whitespace, the opening bracket and the separators between entries
+                while position < len(buffer) and buffer[position] in " \t\r\n,":
+                    position += 1
+                if position < len(buffer) and not started:
+                    started = True
+                    if buffer[position] == "[":
+                        in_array = True
+                        position += 1
+                        continue
+                if position < len(buffer) and buffer[position] == "]":
+                    break
+                if position < len(buffer):
+                    try:
+                        entry, end = decoder.raw_decode(buffer, position)
+                    except json.JSONDecodeError:
+                        if eof:
+                            raise
+                        end = None
+                    # An entry ending exactly at the buffer edge may be a truncated number or literal
+                    if end is not None and (end < len(buffer) or eof):
+                        yield entry
+                        position = end
+                        # Go back to the initial read size once an oversized entry has been decoded
+                        size = read_size
+                        continue
+                elif eof:
+                    if in_array:
+                        raise json.JSONDecodeError("Unterminated array", buffer, position)
+                    break
+                chunk = await file.read(size)
+                eof = not chunk
+                buffer = buffer[position:] + chunk
+                position = 0
+                # Read further ahead when a single entry spans several reads
+                size *= 2 if len(buffer) > size else 1
+
+
 async def save_output_in_chunks(file_path, contents):
     """
     Asynchronously saves the given contents to the specified file path in chunks.
@@ -71,6 +130,71 @@ def chunk_dataset(data, chunk_size):
         return []
 
 
+async def achunk_dataset(entries, chunk_size):
+    """
+    Asynchronously groups entries from an async iterable into lists of the given chunk size.
+
+    Args:
+        entries: An async iterable of dataset entries, such as `iter_json_entries`.
+        chunk_size: The size of each chunk.
+
+    Yields:
+        Lists of up to `chunk_size` entries.
+    """
+    chunk = []
+    async for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def parse_shard(value):
+    """
+    Parse a shard specification of the form "i/n".
+
+    Args:
+        value (str): The specification, for example "0/4".
+
+    Returns:
+        tuple: The (index, count) pair.
+
+    Raises:
+        ValueError: If the specification is malformed or the index is out of range.
+    """
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/n, got {value!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard index must be between 0 and n - 1, got {value!r}")
+    return index, count
+
+
+async def select_shard(entries, index, count):
+    """
+    Asynchronously yields the entries that belong to one shard of the input.
+
+    Entries are assigned round-robin by position, so the split is deterministic and the shards are balanced without
+    knowing the total number of entries in advance.
+
+    Args:
+        entries: An async iterable of dataset entries, such as `iter_json_entries`.
+        index: The shard to select, from 0 to `count` - 1.
+        count: The number of shards.
+
+    Yields:
+        The entries at positions `index`, `index + count`, `index + 2 * count` and so on.
+    """
+    position = 0
+    async for entry in entries:
+        if position % count == index:
+            yield entry
+        position += 1
+
+
 def process_chunk(chunk):
     """
     Process a chunk using a DatasetFormatter and return the formatted dataset.
@@ -0,0 +1,205 @@
+"""
+This module provides the output writer for the HTML to Markdown conversion project.
+
+OutputWriter is opened once per run and keeps its file open, buffering writes instead of reopening and flushing the output for every chunk. Output can be split into numbered shards by size or entry count, so downstream RAG indexers receive files of a predictable size. Entries can be written as one markdown document or as JSONL records with title, url and markdown fields, and either format can be gzip-compressed as it is written.
+
+Classes:
+    OutputWriter: A buffered, optionally sharded and compressed writer for formatted entries.
+"""
+
+import gzip
+import io
+import json
+import logging
+import os
+import threading
+
+OUTPUT_FORMATS = ("markdown", "jsonl")
+
+
+class OutputWriter:
+    """
+    Writes formatted entries to one or more output files in the order they are given.
+
+    Attributes:
+        path (str): The output path. Shards insert a zero-padded index before the extension.
+        format (str): "markdown" for one document with entries separated by blank lines, or "jsonl" for one
+            {"title", "url", "markdown"} record per line.
+        max_bytes (int): Starts a new shard once a shard holds this many uncompressed bytes, or None.
+        max_entries (int): Starts a new shard once a shard holds this many entries, or None.
+        compress (bool): Whether to gzip the output.
+        atomic (bool): Whether shards are written to temporary files and renamed into place on close.
+        paths (list): The output files written so far.
+        entries (int): The number of entries written so far.
+
+    Methods:
+        write(entry, content, position): Writes one formatted entry.
+        write_many(entries, contents, positions): Writes formatted entries in order.
+        close(): Flushes and closes the current shard.
+    """
+
+    def __init__(
+        self,
+        path,
+        format="markdown",
+        max_bytes=None,
+        max_entries=None,
+        compress=False,
+        atomic=False,
+        buffer_size=1 << 20,
+    ):
+        """
+        Initializes the writer. The first shard is opened on the first write.
+
+        Args:
+            path (str): The output path, for example "output.md" or "output.jsonl". With `compress`, ".gz" is appended.
+            format (str): One of OUTPUT_FORMATS. Defaults to "markdown".
+            max_bytes (int, optional): Uncompressed bytes per shard. Defaults to None.
+            max_entries (int, optional): Entries per shard. Defaults to None.
+            compress (bool): Whether to gzip the output as it is written. Defaults to False.
+            atomic (bool): Whether to write each shard under a temporary name and rename it on close, so readers never
+                see a partial file. Defaults to False.
+            buffer_size (int): Size of the write buffer in bytes. Defaults to 1 MiB.
+
+        Returns:
+            None
+        """
+        if format not in OUTPUT_FORMATS:
+            raise ValueError(f"format must be one of {OUTPUT_FORMATS}, got {format!r}")
+        self.path = path
+        self.format = format
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.compress = compress
+        self.atomic = atomic
+        self.buffer_size = buffer_size
+        self.paths = []
+        self.entries = 0
+        self._lock = threading.Lock()
+        self._files = []
+        self._file = None
+        self._shard_bytes = 0
+        self._shard_entries = 0
+
+    @property
+    def structured(self):
+        """Whether entries are written as structured markdown with a title heading and link, rather than as records."""
+        return self.format == "markdown"
+
+    def write(self, entry, content, position=None):
+        """
+        Write one formatted entry. Empty content, such as from an entry that failed to convert, is skipped.
+
+        Args:
+            entry (dict): The dataset entry, used for the title and url of JSONL records.
+            content (str): The entry's markdown; structured markdown for the "markdown" format.
+            position (int, optional): The entry's position in the whole input, added to JSONL records so that shard
+                outputs can be merged back into input order. Defaults to None.
+
+        Returns:
+            None
+        """
+        if not content:
+            return
+        if self.format == "jsonl":
+            record = {
+                "title": entry.get("title", "Untitled"),
+                "url": entry.get("url", ""),
+                "markdown": content,
+            }
+            if position is not None:
+                record["position"] = position
+            text = json.dumps(record, ensure_ascii=False) + "\n"
+        else:
+            text = content
+        with self._lock:
+            if self._file is None or self._shard_full():
+                self._open_shard()
+            elif self.format == "markdown":
+                text = "\n\n" + text
+            self._file.write(text)
+            self._shard_bytes += len(text.encode("utf-8"))
+            self._shard_entries += 1
+            self.entries += 1
+
+    def write_many(self, entries, contents, positions=None):
+        """
+        Write formatted entries in order.
+
+        Args:
+            entries (list): The dataset entries.
+            contents (list): The formatted content of each entry.
+            positions (list, optional): The position of each entry in the whole input. Defaults to None.
+
+        Returns:
+            None
+        """
+        positions = positions or [None] * len(entries)
+        for entry, content, position in zip(entries, contents, positions):
+            self.write(entry, content, position)
+
+    def close(self):
+        """
+        Flush and close the current shard. A run that wrote nothing still leaves an empty output file.
+        """
+        with self._lock:
+            if not self.paths:
+                self._open_shard()
+            self._close_shard()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _shard_full(self):
+        """
+        Report whether the current shard has reached its size or entry limit.
+        """
+        return (self.max_bytes is not None and self._shard_bytes >= self.max_bytes) or (
+            self.max_entries is not None and self._shard_entries >= self.max_entries
+        )
+
+    def _shard_path(self, index):
+        """
+        Return the path of the shard with the given index.
+        """
+        path = self.path
+        if self.max_bytes is not None or self.max_entries is not None:
+            stem, extension = os.path.splitext(path)
+            path = f"{stem}-{index:05d}{extension}"
+        return f"{path}.gz" if self.compress else path
+
+    def _open_shard(self):
+        """
+        Close the current shard and open the next one; the caller must hold the lock.
+        """
+        self._close_shard()
+        path = self._shard_path(len(self.paths))
+        self.paths.append(path)
+        raw = open(f"{path}.tmp" if self.atomic else path, "wb", buffering=self.buffer_size)
+        self._files = [raw]
+        stream = raw
+        if self.compress:
+            stream = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+            self._files.insert(0, stream)
+        self._file = io.TextIOWrapper(stream, encoding="utf-8", write_through=True)
+        self._shard_bytes = 0
+        self._shard_entries = 0
+        logging.info("Writing output shard: %s", path)
+
+    def _close_shard(self):
+        """
+        Flush and close the current shard, renaming it into place when writing atomically.
+        """
+        if self._file is None:
+            return
+        self._file.flush()
+        self._file.detach()
+        for file in self._files:
+            file.close()
+        if self.atomic:
+            os.replace(f"{self.paths[-1]}.tmp", self.paths[-1])
+        self._file = None
+        self._files = []
@@ -0,0 +1,78 @@
+"""
+A small deterministic tokenizer and embedding model that stand in for the Jina checkpoint in tests, so the suite runs offline.
+"""
+
+import zlib
+import torch
+
+
+class StubTokenizer:
+    def __init__(self, vocab_size=1024, model_max_length=512):
+        self.vocab_size = vocab_size
+        self.model_max_length = model_max_length
+
+    def _encode(self, text, truncation, max_length):
+        ids = [101]
+        ids += [zlib.crc32(word.encode()) % (self.vocab_size - 2) + 2 for word in text.split()]
+        ids.append(102)
+        if truncation:
+            ids = ids[: max_length or self.model_max_length]
+        return ids
+
+    def __call__(
+        self,
+        texts,
+        padding=False,
+        truncation=False,
+        max_length=None,
+        return_tensors=None,
+        **kwargs,
+    ):
+        if isinstance(texts, str):
+            texts = [texts]
+        encoded = [self._encode(text, truncation, max_length) for text in texts]
+        if return_tensors != "pt":
+            return {
+                "input_ids": encoded,
+                "attention_mask": [[1] * len(ids) for ids in encoded],
+            }
+        return self._to_tensors(encoded)
+
+    def pad(self, encoded_inputs, return_tensors="pt", **kwargs):
+        return self._to_tensors(encoded_inputs["input_ids"])
+
+    def _to_tensors(self, encoded):
+        width = max(len(ids) for ids in encoded)
+        input_ids = torch.zeros((len(encoded), width), dtype=torch.long)
+        attention_mask = torch.zeros((len(encoded), width), dtype=torch.long)
+        for row, ids in enumerate(encoded):
+            input_ids[row, : len(ids)] = torch.tensor(ids)
+            attention_mask[row, : len(ids)] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
+
+
+class StubModel(torch.nn.Module):
+    def __init__(self, vocab_size=1024, dim=32, seed=0):
+        super().__init__()
+        generator = torch.Generator().manual_seed(seed)
+        self.embeddings = torch.nn.Embedding(vocab_size, dim)
+        self.projection = torch.nn.Linear(dim, dim)
+        with torch.no_grad():
+            self.embeddings.weight.copy_(
+                torch.randn(vocab_size, dim, generator=generator)
+            )
+            self.projection.weight.copy_(
+                torch.eye(dim) + 0.1 * torch.randn(dim, dim, generator=generator)
+            )
+            self.projection.bias.zero_()
+        self.calls = 0
+
+    def forward(self, input_ids, attention_mask=None, **kwargs):
+        self.calls += 1
+        return (self.projection(self.embeddings(input_ids)),)
+
+
+def register_stub(registry, model_name="stub-model"):
+    tokenizer, model = StubTokenizer(), StubModel()
+    registry.register(model_name, tokenizer, model)
+    return tokenizer, model
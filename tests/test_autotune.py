@@ -0,0 +1,77 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from autotune import calibrate, host_key, tune
+from converter import HTMLToMarkdownConverter
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+
+class AutotuneTest(unittest.TestCase):
+    def setUp(self):
+        registry = ModelRegistry()
+        register_stub(registry)
+        self.converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry)
+        self.directory = tempfile.mkdtemp()
+        self.cache_path = os.path.join(self.directory, "cache", "autotune.json")
+        data = [
+            {"title": f"Page {i}", "html": f"<p>Paragraph {i} about topic {i * 7}.</p><p>Another line {i}.</p>"}
+            for i in range(20)
+        ]
+        with open(os.path.join(self.directory, "output.json"), "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        self.pattern = os.path.join(self.directory, "output*.json")
+
+    def tune(self, **kwargs):
+        return asyncio.run(tune(self.converter, self.pattern, cache_path=self.cache_path, **kwargs))
+
+    def test_calibration_picks_a_candidate_and_is_cached(self):
+        settings = self.tune()
+        self.assertEqual(self.converter.batch_size, settings["batch_size"])
+        self.assertEqual(self.converter.token_budget, settings["token_budget"])
+        self.assertGreaterEqual(settings["chunk_size"], 16)
+        self.assertEqual(len(settings["candidates"]), 9)
+
+        with open(self.cache_path, encoding="utf-8") as file:
+            cache = json.load(file)
+        key = host_key("stub-model", "fp32")
+        self.assertEqual(cache[key]["batch_size"], settings["batch_size"])
+
+        # A cached result is reused without calibrating, and --retune replaces it
+        cache[key].update(batch_size=24, token_budget=None, chunk_size=99)
+        with open(self.cache_path, "w", encoding="utf-8") as file:
+            json.dump(cache, file)
+        self.assertEqual(self.tune()["chunk_size"], 99)
+        self.assertEqual(self.converter.batch_size, 24)
+        retuned = self.tune(retune=True)
+        candidates = [(result["batch_size"], result["token_budget"]) for result in retuned["candidates"]]
+        self.assertIn((retuned["batch_size"], retuned["token_budget"]), candidates)
+
+    def test_memory_limit_falls_back_to_the_smallest_candidate(self):
+        best, results = calibrate(
+            self.converter, ["some line"] * 20, batch_sizes=(4, 8), token_budgets=(), max_memory_mb=0
+        )
+        self.assertEqual(best, results[0])
+        self.assertEqual(best["batch_size"], 4)
+
+    def test_input_without_content_lines_is_not_tuned(self):
+        with open(os.path.join(self.directory, "output.json"), "w", encoding="utf-8") as file:
+            json.dump([{"title": "Empty", "html": None}], file)
+        self.assertIsNone(self.tune())
+        self.assertFalse(os.path.exists(self.cache_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
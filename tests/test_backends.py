@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from backends import parity_check, threads_per_worker
+from converter import HTMLToMarkdownConverter
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+LINES = [f"line {i} about topic {i % 7} with words {i * 3}" for i in range(60)]
+
+
+class InferenceBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        register_stub(self.registry)
+        self.reference = self.converter("fp32")
+
+    def converter(self, backend):
+        return HTMLToMarkdownConverter(
+            model_name="stub-model", registry=self.registry, backend=backend
+        )
+
+    def test_fp32_parity_is_exact(self):
+        report = parity_check(self.reference, self.converter("fp32"), LINES)
+        self.assertEqual(report["decision_flips"], 0)
+        self.assertEqual(report["max_abs_diff"], 0.0)
+
+    def test_int8_stays_close(self):
+        report = parity_check(self.reference, self.converter("int8"), LINES)
+        self.assertGreater(report["min_cosine"], 0.99)
+        self.assertLessEqual(report["flip_rate"], 0.05)
+
+    def test_torchscript_matches(self):
+        report = parity_check(self.reference, self.converter("torchscript"), LINES)
+        self.assertGreater(report["min_cosine"], 0.9999)
+
+    def test_backends_are_cached_per_model(self):
+        int8 = self.converter("int8")
+        self.assertIs(int8.model, self.converter("int8").model)
+        self.assertIsNot(int8.model, self.reference.model)
+
+    def test_threads_per_worker(self):
+        self.assertGreaterEqual(threads_per_worker(64), 1)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            self.converter("fp8")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import os
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+import torch
+from batching import plan_token_batches, padding_ratio
+from converter import HTMLToMarkdownConverter
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+
+class PlanTokenBatchesTest(unittest.TestCase):
+    def test_batches_respect_budget(self):
+        lengths = [3, 40, 4, 3, 38, 5]
+        batches = plan_token_batches(lengths, token_budget=80)
+        for batch in batches:
+            self.assertLessEqual(len(batch) * max(lengths[i] for i in batch), 80)
+        self.assertEqual(sorted(i for batch in batches for i in batch), list(range(6)))
+
+    def test_oversized_line_gets_own_batch(self):
+        self.assertEqual(plan_token_batches([100, 2], token_budget=10), [[1], [0]])
+
+    def test_bucketing_reduces_padding(self):
+        lengths = [2, 50, 2, 2, 50, 2]
+        fixed = [[0, 1, 2], [3, 4, 5]]
+        bucketed = plan_token_batches(lengths, token_budget=100)
+        self.assertLess(padding_ratio(lengths, bucketed), padding_ratio(lengths, fixed))
+
+
+class BucketedEmbeddingsTest(unittest.TestCase):
+    def test_bucketed_matches_fixed_order(self):
+        registry = ModelRegistry()
+        register_stub(registry)
+        converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry)
+        lines = ["short", "a much longer line with many words in it", "tiny", "x y"]
+        fixed = converter._process_embeddings(lines, batch_size=2)
+        bucketed = converter._process_embeddings(lines, token_budget=16)
+        self.assertTrue(torch.allclose(fixed, bucketed, atol=1e-6))
+
+    def test_batch_size_caps_bucketed_batches_only_when_given(self):
+        registry = ModelRegistry()
+        _, model = register_stub(registry)
+        lines = [f"line {i}" for i in range(320)]
+        HTMLToMarkdownConverter(
+            model_name="stub-model", registry=registry, token_budget=4096
+        )._process_embeddings(lines)
+        self.assertEqual(model.calls, 1)
+        HTMLToMarkdownConverter(
+            model_name="stub-model", registry=registry, token_budget=4096, batch_size=64
+        )._process_embeddings(lines)
+        self.assertEqual(model.calls, 6)
+
+
+class LongLineEmbeddingsTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        register_stub(self.registry)
+        self.lines = ["short line", " ".join(f"word{i}" for i in range(200)), "another short one"]
+
+    def converter(self, **kwargs):
+        return HTMLToMarkdownConverter(model_name="stub-model", registry=self.registry, **kwargs)
+
+    def test_normal_lines_unchanged_by_cap(self):
+        reference = self.converter()._process_embeddings(self.lines)
+        for long_lines in ("truncate", "window"):
+            capped = self.converter(max_tokens=16, long_lines=long_lines)._process_embeddings(self.lines)
+            self.assertTrue(torch.allclose(reference[[0, 2]], capped[[0, 2]], atol=1e-6))
+            self.assertAlmostEqual(float(capped[1].norm()), 1.0, places=5)
+
+    def test_window_mode_bounds_batches_and_covers_whole_line(self):
+        _, model = self.registry.get("stub-model")
+        widths = []
+        model.register_forward_pre_hook(
+            lambda module, args, kwargs: widths.append(kwargs["input_ids"].shape[1]),
+            with_kwargs=True,
+        )
+        windowed = self.converter(max_tokens=16, long_lines="window")._process_embeddings(self.lines)
+        truncated = self.converter(max_tokens=16)._process_embeddings(self.lines)
+        self.assertLessEqual(max(widths), 16)
+        self.assertFalse(torch.allclose(windowed[1], truncated[1], atol=1e-4))
+
+    def test_unknown_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.converter(long_lines="drop")
+
+
+if __name__ == "__main__":
+    unittest.main()
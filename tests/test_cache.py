@@ -0,0 +1,77 @@
+import unittest
+import os
+import sys
+import tempfile
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+import torch
+from cache import EmbeddingCache, cache_key
+from converter import HTMLToMarkdownConverter
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+
+class EmbeddingCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        self.tokenizer, self.model = register_stub(self.registry)
+
+    def test_key_ignores_whitespace_but_not_model(self):
+        self.assertEqual(cache_key("m", "Skip  to content "), cache_key("m", "Skip to content"))
+        self.assertNotEqual(cache_key("m", "Skip to content"), cache_key("n", "Skip to content"))
+
+    def test_lru_eviction(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put_many("m", ["a", "b", "c"], torch.eye(3))
+        self.assertEqual(cache.get_many("m", ["a", "b", "c"])[0], None)
+        self.assertEqual(cache.stats()["entries"], 2)
+
+    def test_repeated_lines_skip_model(self):
+        cache = EmbeddingCache()
+        converter = HTMLToMarkdownConverter(
+            model_name="stub-model", registry=self.registry, cache=cache
+        )
+        lines = ["Copyright ©", "Skip to content", "page one"]
+        first = converter._process_embeddings(lines)
+        calls = self.model.calls
+        second = converter._process_embeddings(["Skip to content", "Copyright ©"])
+        self.assertEqual(self.model.calls, calls)
+        self.assertTrue(torch.allclose(second, first[[1, 0]]))
+        self.assertEqual(cache.stats()["hits"], 2)
+        self.assertEqual(cache.stats()["misses"], 3)
+
+    def test_settings_that_change_vectors_get_separate_entries(self):
+        cache = EmbeddingCache()
+        line = " ".join(["word"] * 40)
+        capped = HTMLToMarkdownConverter(
+            model_name="stub-model", registry=self.registry, cache=cache, max_tokens=8
+        )._process_embeddings([line])
+        full = HTMLToMarkdownConverter(
+            model_name="stub-model", registry=self.registry, cache=cache
+        )._process_embeddings([line])
+        self.assertEqual(cache.stats()["misses"], 2)
+        self.assertFalse(torch.allclose(capped, full))
+
+    def test_disk_tier_persists_between_caches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "embeddings.sqlite")
+            cache = EmbeddingCache(path=path)
+            cache.put_many("m", ["breadcrumb"], torch.ones(1, 4))
+            cache.close()
+
+            reopened = EmbeddingCache(path=path)
+            (vector,) = reopened.get_many("m", ["breadcrumb"])
+            self.assertTrue(torch.equal(vector, torch.ones(4)))
+            self.assertEqual(reopened.stats()["disk_hits"], 1)
+            reopened.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from bs4 import BeautifulSoup
+from markdownify import markdownify as md
+from converter import REMOVED_SELECTORS, HTMLToMarkdownConverter
+
+PAGE = """<html><head><meta charset="utf-8"><style>p {}</style></head><body>
+<header>Header</header><nav><a href="/">Home</a></nav><div class="cookie-banner">Cookies</div>
+<main><h1>Title</h1><p>Some <b>bold</b> text and a <a href="https://example.com">link</a>.</p>
+<div class="menu"><div class="banner">Nested</div></div>
+<ul><li>One</li><li>Two</li></ul><script>alert(1)</script><aside>Aside</aside></main>
+<footer>Footer</footer></body></html>"""
+
+
+def reference_markdown(html):
+    soup = BeautifulSoup(html, "html.parser")
+    for selector in REMOVED_SELECTORS:
+        for element in soup.select(selector):
+            element.decompose()
+    for tag in ["script", "style", "meta"]:
+        for element in soup(tag):
+            element.decompose()
+    return md(str(soup), strip_tags=["script", "style", "meta"], convert_links=True).strip()
+
+
+class CurationTest(unittest.TestCase):
+    def test_single_pass_matches_selector_passes(self):
+        converter = HTMLToMarkdownConverter(parser="html.parser")
+        self.assertEqual(converter.to_markdown(PAGE), reference_markdown(PAGE))
+
+    def test_removed_runs_keep_reference_whitespace(self):
+        page = (
+            "<html><body><h1>Title</h1>\n<header>Header</header>\n<nav>Menu</nav>\n"
+            '<div class="cookie-banner">Cookies</div>\n<p>Skip to content</p>\n<footer>Footer</footer></body></html>'
+        )
+        for parser in ("html.parser", "lxml"):
+            with self.subTest(parser=parser):
+                converter = HTMLToMarkdownConverter(parser=parser)
+                self.assertEqual(converter.to_markdown(page), reference_markdown(page))
+
+    def test_default_parser_backend(self):
+        converter = HTMLToMarkdownConverter()
+        markdown = converter.to_markdown(PAGE)
+        self.assertIn("Title", markdown)
+        for removed in ["Header", "Home", "Cookies", "Nested", "alert", "Aside", "Footer"]:
+            self.assertNotIn(removed, markdown)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+import os
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from dedup import CorpusDeduplicator
+
+BOILERPLATE = "Subscribe to our newsletter to get the latest product updates and release notes delivered weekly."
+
+
+class CorpusDeduplicatorTest(unittest.TestCase):
+    def test_repeated_paragraph_dropped_across_documents(self):
+        dedup = CorpusDeduplicator()
+        first = dedup.filter(f"## Page one\n\nIntro text about installing the package locally today.\n\n{BOILERPLATE}")
+        second = dedup.filter(f"## Page two\n\nA different body explaining configuration options in depth.\n\n{BOILERPLATE}")
+        self.assertIn(BOILERPLATE, first)
+        self.assertNotIn(BOILERPLATE, second)
+        self.assertIn("## Page two", second)
+        self.assertEqual(dedup.stats()["dropped"], 1)
+
+    def test_near_duplicate_dropped(self):
+        dedup = CorpusDeduplicator(threshold=0.5)
+        self.assertFalse(dedup.is_duplicate(BOILERPLATE))
+        self.assertTrue(dedup.is_duplicate(BOILERPLATE.replace("weekly", "monthly")))
+
+    def test_short_paragraphs_kept(self):
+        dedup = CorpusDeduplicator()
+        self.assertEqual(dedup.filter("## Overview"), "## Overview")
+        self.assertEqual(dedup.filter("## Overview"), "## Overview")
+
+    def test_fenced_code_kept(self):
+        dedup = CorpusDeduplicator()
+        code = "```python\nimport os\n\nprint(os.getcwd(), os.listdir(os.getcwd()), os.sep, os.name)\n\nos.chdir(\"/\")\n```"
+        document = f"{code}\n\n{BOILERPLATE}"
+        dedup.filter(document)
+        self.assertEqual(dedup.filter(document), code)
+
+    def test_index_is_bounded(self):
+        dedup = CorpusDeduplicator(max_entries=3)
+        for i in range(10):
+            dedup.is_duplicate(f"paragraph number {i} with enough distinct words to be indexed here")
+        self.assertEqual(dedup.stats()["indexed"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
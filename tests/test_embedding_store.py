@@ -0,0 +1,70 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+import torch
+from converter import HTMLToMarkdownConverter
+from embedding_store import EmbeddingStore, load_embeddings
+from engine import ConversionEngine
+from formatter import DatasetFormatter
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+
+class EmbeddingStoreTest(unittest.TestCase):
+    def setUp(self):
+        registry = ModelRegistry()
+        register_stub(registry)
+        self.converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry)
+        self.base_path = os.path.join(tempfile.mkdtemp(), "out.md.embeddings")
+        self.data = [
+            {"title": "First", "url": "https://example.com/1", "html": "<h1>Title</h1><p>Alpha beta gamma.</p><p>Delta epsilon.</p>"},
+            {"title": "Broken", "html": None},
+            {"title": "Second", "url": "https://example.com/2", "html": "<p>Zeta eta theta iota.</p>"},
+        ]
+
+    def format(self, store, engine=None):
+        formatter = DatasetFormatter(self.converter, engine=engine, store=store)
+        return asyncio.run(formatter.format_entries(self.data))
+
+    def test_rows_match_index_and_kept_lines(self):
+        with EmbeddingStore(self.base_path) as store:
+            contents = self.format(store)
+        embeddings, index = load_embeddings(self.base_path)
+
+        self.assertEqual([record["title"] for record in index], ["First", "Second"])
+        self.assertEqual(embeddings.shape[0], sum(len(record["lines"]) for record in index))
+        for record, content in zip(index, [contents[0], contents[2]]):
+            for offset, line in enumerate(record["lines"]):
+                self.assertIn(line, content.split("\n"))
+                expected = self.converter._process_embeddings([line])[0]
+                row = torch.from_numpy(embeddings[record["row"] + offset].copy())
+                self.assertTrue(torch.allclose(row, expected, atol=1e-6))
+
+    def test_float16_store_through_engine(self):
+        async def run():
+            with ConversionEngine(self.converter, workers=0) as engine:
+                formatter = DatasetFormatter(self.converter, engine=engine, store=store)
+                return await formatter.format_entries(self.data)
+
+        with EmbeddingStore(self.base_path, dtype="float16") as store:
+            inline = self.format(None)
+            concurrent = asyncio.run(run())
+        self.assertEqual(concurrent, inline)
+        embeddings, index = load_embeddings(self.base_path)
+        self.assertEqual(str(embeddings.dtype), "float16")
+        self.assertEqual(embeddings.shape, (store.rows, store.dim))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import asyncio
+import os
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from converter import HTMLToMarkdownConverter
+from engine import ConversionEngine
+from formatter import DatasetFormatter
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+
+class ConversionEngineTest(unittest.TestCase):
+    def setUp(self):
+        registry = ModelRegistry()
+        register_stub(registry)
+        self.converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry)
+        self.data = [
+            {"title": f"Test Title {i}", "url": f"https://example.com/{i}", "html": f"<p>This is a test {i}.</p>"}
+            for i in range(6)
+        ]
+        self.data.insert(2, {"title": "Broken", "html": None})
+
+    def test_engine_matches_inline_order_and_errors(self):
+        async def run():
+            inline = await DatasetFormatter(self.converter).format_dataset(self.data)
+            with ConversionEngine(self.converter, workers=1, max_concurrency=3) as engine:
+                concurrent = await DatasetFormatter(
+                    self.converter, engine=engine
+                ).format_dataset(self.data)
+            return inline, concurrent
+
+        inline, concurrent = asyncio.run(run())
+        self.assertEqual(concurrent, inline)
+        self.assertIn("## Test Title 0", concurrent)
+        self.assertNotIn("Broken", concurrent)
+        self.assertLess(concurrent.index("test 1."), concurrent.index("test 3."))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+import os
+import subprocess
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from converter import HTMLToMarkdownConverter
+
+HEAVY_IMPORT_CHECK = """
+import sys
+{statement}
+heavy = [m for m in ("torch", "transformers") if m in sys.modules]
+assert not heavy, heavy
+"""
+
+
+class LazyImportTest(unittest.TestCase):
+    def assert_no_heavy_imports(self, statement):
+        subprocess.run(
+            [sys.executable, "-c", HEAVY_IMPORT_CHECK.format(statement=statement)],
+            cwd=package_dir,
+            check=True,
+        )
+
+    def test_importing_pipeline_modules(self):
+        self.assert_no_heavy_imports("import converter, formatter, utils, main")
+
+    def test_convert_without_semantic_dedup(self):
+        self.assert_no_heavy_imports(
+            "from converter import HTMLToMarkdownConverter\n"
+            "HTMLToMarkdownConverter(dedup='lexical').convert('<p>a</p><p>a</p>')"
+        )
+
+    def test_stream_without_semantic_dedup(self):
+        self.assert_no_heavy_imports(
+            "from converter import HTMLToMarkdownConverter\n"
+            "list(HTMLToMarkdownConverter(dedup='lexical').convert_stream('<p>a</p><p>a</p>', window_lines=1))"
+        )
+
+    def test_corpus_dedup(self):
+        self.assert_no_heavy_imports(
+            "from dedup import CorpusDeduplicator\n"
+            "CorpusDeduplicator().filter('one two three four five six seven eight nine')"
+        )
+
+
+class DedupModeTest(unittest.TestCase):
+    def test_modes(self):
+        html = "<p>Repeat</p>\n<p>Repeat</p>"
+        self.assertEqual(
+            HTMLToMarkdownConverter(dedup="none").convert("<br><br><p>Keep</p>"),
+            HTMLToMarkdownConverter(dedup="none").to_markdown("<br><br><p>Keep</p>"),
+        )
+        self.assertEqual(HTMLToMarkdownConverter(dedup="lexical").convert(html), "Repeat\n\nRepeat")
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            HTMLToMarkdownConverter(dedup="fuzzy")
+
+
+if __name__ == "__main__":
+    unittest.main()
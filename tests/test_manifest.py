@@ -0,0 +1,119 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from converter import HTMLToMarkdownConverter
+from embedding_store import EmbeddingStore, load_embeddings
+from engine import ConversionEngine
+from formatter import DatasetFormatter
+from main import process_incremental_chunk
+from manifest import RunManifest, entry_key
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+from writer import OutputWriter
+
+
+class RunManifestTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.manifest_dir = os.path.join(self.directory, "manifest")
+        self.output = os.path.join(self.directory, "out.md")
+        self.data = [
+            {"title": f"Page {i}", "url": f"https://example.com/{i}", "html": f"<p>Content {i}.</p>"}
+            for i in range(4)
+        ]
+
+    def run_chunk(self, manifest, chunk):
+        async def run():
+            converter = HTMLToMarkdownConverter(dedup="none")
+            with ConversionEngine(converter, workers=0) as engine:
+                return await process_incremental_chunk(chunk, manifest, engine=engine)
+
+        return asyncio.run(run())
+
+    def assemble(self, manifest, keys, store=None):
+        with OutputWriter(self.output, atomic=True) as writer:
+            written = manifest.assemble(keys, writer, store=store)
+        with open(self.output, encoding="utf-8") as file:
+            return written, file.read()
+
+    def test_rerun_converts_only_changed_entries(self):
+        manifest = RunManifest(self.manifest_dir, fingerprint="a")
+        keys, converted = self.run_chunk(manifest, self.data)
+        self.assertEqual(converted, 4)
+        written, first = self.assemble(manifest, keys)
+        self.assertEqual(written, 4)
+        manifest.close()
+
+        # Simulates a re-crawl after a crash: one page changed, the rest are reused
+        self.data[2]["html"] = "<p>Changed.</p>"
+        manifest = RunManifest(self.manifest_dir, fingerprint="a")
+        keys, converted = self.run_chunk(manifest, self.data)
+        self.assertEqual(converted, 1)
+        _, second = self.assemble(manifest, keys)
+        self.assertEqual(second, first.replace("Content 2.", "Changed."))
+        self.assertEqual(second.count("## Page"), 4)
+
+        self.assertEqual(manifest.prune(keys), 1)
+        manifest.close()
+
+    def test_settings_change_discards_recorded_entries(self):
+        manifest = RunManifest(self.manifest_dir, fingerprint="a")
+        manifest.record_many([(entry_key(self.data[0]), self.data[0], "## Page 0")])
+        manifest.close()
+        manifest = RunManifest(self.manifest_dir, fingerprint="b")
+        self.assertEqual(manifest.lookup([entry_key(self.data[0])]), {})
+        manifest.close()
+
+    def test_embedding_store_covers_reused_entries_in_input_order(self):
+        registry = ModelRegistry()
+        register_stub(registry)
+        converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry)
+        base_path = os.path.join(self.directory, "out.md.embeddings")
+
+        def run_with_store(chunk):
+            async def run():
+                with ConversionEngine(converter, workers=0) as engine:
+                    return await process_incremental_chunk(chunk, manifest, engine=engine, store=store)
+
+            manifest = RunManifest(self.manifest_dir, fingerprint="a")
+            with EmbeddingStore(base_path) as store:
+                keys, converted = asyncio.run(run())
+                self.assemble(manifest, keys, store)
+            manifest.close()
+            return converted
+
+        self.assertEqual(run_with_store(self.data[:2]), 2)
+        # A run without a store records entry 2 without embeddings, so the next run with a store converts it again
+        manifest = RunManifest(self.manifest_dir, fingerprint="a")
+        self.run_chunk(manifest, self.data[:3])
+        manifest.close()
+        self.assertEqual(run_with_store(self.data), 2)
+        rows, index = load_embeddings(base_path)
+
+        reference_path = os.path.join(self.directory, "reference.embeddings")
+        with EmbeddingStore(reference_path) as store:
+            asyncio.run(DatasetFormatter(converter, store=store).format_entries(self.data))
+        expected_rows, expected_index = load_embeddings(reference_path)
+        self.assertEqual(index, expected_index)
+        self.assertEqual([record["title"] for record in index], [entry["title"] for entry in self.data])
+        self.assertTrue((rows == expected_rows).all())
+
+    def test_entry_key_depends_on_content(self):
+        changed = dict(self.data[0], html="<p>Other.</p>")
+        self.assertEqual(entry_key(self.data[0]), entry_key(dict(self.data[0])))
+        self.assertNotEqual(entry_key(self.data[0]), entry_key(changed))
+
+
+if __name__ == "__main__":
+    unittest.main()
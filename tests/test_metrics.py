@@ -0,0 +1,79 @@
+import unittest
+import asyncio
+import os
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from converter import HTMLToMarkdownConverter
+from engine import ConversionEngine
+from formatter import DatasetFormatter
+from metrics import NULL_METRICS, CallbackSink, Metrics
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+
+class MetricsTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        register_stub(self.registry)
+        self.html = (
+            "<html><body><nav>Menu</nav><h1>Title</h1>"
+            "<p>The first paragraph of the page.</p><p>A second, different paragraph.</p>"
+            "</body></html>"
+        )
+
+    def test_records_stages_counters_and_throughput(self):
+        summaries = []
+        metrics = Metrics([CallbackSink(summaries.append)])
+        converter = HTMLToMarkdownConverter(
+            model_name="stub-model", registry=self.registry, metrics=metrics
+        )
+        converter.convert(self.html)
+        metrics.emit()
+
+        summary = summaries[0]
+        for stage in ("parse", "curate", "markdownify", "prefilter", "tokenize", "forward", "embed", "dedup"):
+            self.assertIn(stage, summary["stages"])
+            self.assertGreaterEqual(summary["stages"][stage]["wall_s"], 0.0)
+        self.assertEqual(summary["counters"]["embedded_lines"], 3)
+        self.assertGreaterEqual(summary["counters"]["padded_tokens"], summary["counters"]["tokens"])
+        self.assertGreater(summary["tokens_per_s"], 0)
+        self.assertGreaterEqual(summary["padding_ratio"], 0.0)
+        self.assertGreater(summary["peak_rss_mb"], 0)
+
+    def test_worker_timings_are_merged(self):
+        metrics = Metrics()
+        converter = HTMLToMarkdownConverter(
+            model_name="stub-model", registry=self.registry, metrics=metrics
+        )
+
+        async def run():
+            with ConversionEngine(converter, workers=0) as engine:
+                return await DatasetFormatter(converter, engine=engine).format_dataset(
+                    [{"title": "Page", "html": self.html}, {"title": "Broken", "html": None}]
+                )
+
+        asyncio.run(run())
+        summary = metrics.summary()
+        self.assertEqual(summary["stages"]["markdownify"]["calls"], 1)
+        self.assertEqual(summary["counters"]["entries"], 2)
+        self.assertEqual(summary["counters"]["failed_entries"], 1)
+
+    def test_disabled_metrics_record_nothing(self):
+        converter = HTMLToMarkdownConverter(model_name="stub-model", registry=self.registry)
+        self.assertIs(converter.metrics, NULL_METRICS)
+        converter.convert(self.html)
+        summary = NULL_METRICS.summary()
+        self.assertEqual(summary["stages"], {})
+        self.assertEqual(summary["counters"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
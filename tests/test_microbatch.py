@@ -0,0 +1,57 @@
+import unittest
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+import torch
+from converter import HTMLToMarkdownConverter
+from microbatch import EmbeddingMicroBatcher
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+
+class EmbeddingMicroBatcherTest(unittest.TestCase):
+    def setUp(self):
+        registry = ModelRegistry()
+        register_stub(registry)
+        self.converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry)
+
+    def test_requests_are_coalesced_and_sliced(self):
+        documents = [[f"doc {d} line {i}" for i in range(5)] for d in range(8)]
+        with EmbeddingMicroBatcher(
+            self.converter._process_embeddings, max_batch_size=40, max_wait=0.5
+        ) as batcher:
+            with ThreadPoolExecutor(max_workers=8) as pool:
+                results = list(pool.map(batcher.embed, documents))
+        for lines, embeddings in zip(documents, results):
+            self.assertTrue(
+                torch.allclose(embeddings, self.converter._process_embeddings(lines), atol=1e-6)
+            )
+        self.assertLess(batcher.stats()["batches"], len(documents))
+
+    def test_convert_through_batcher(self):
+        html = "<p>Hello World!</p><p>Second paragraph</p>"
+        expected = self.converter.convert(html)
+        with EmbeddingMicroBatcher(self.converter._process_embeddings) as batcher:
+            self.converter.batcher = batcher
+            self.assertEqual(self.converter.convert(html), expected)
+
+    def test_errors_reach_every_caller(self):
+        def fail(lines):
+            raise ValueError("boom")
+
+        with EmbeddingMicroBatcher(fail) as batcher:
+            with self.assertRaises(ValueError):
+                batcher.embed(["line"])
+
+
+if __name__ == "__main__":
+    unittest.main()
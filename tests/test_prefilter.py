@@ -0,0 +1,45 @@
+import unittest
+import os
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from converter import HTMLToMarkdownConverter
+from prefilter import is_structural, prefilter_lines
+from registry import ModelRegistry
+from tests.stub_model import register_stub
+
+
+class PrefilterTest(unittest.TestCase):
+    def test_structural_lines(self):
+        for line in ["", "   ", "| --- | :---: |", "---", "* * *", "=====", "```python"]:
+            self.assertTrue(is_structural(line), line)
+        for line in ["Hello", "| a | b |", "- item", "--"]:
+            self.assertFalse(is_structural(line), line)
+
+    def test_repeated_lines_are_dropped(self):
+        lines, needs_embedding = prefilter_lines(
+            ["Skip to content", "Skip  to content ", "", "", "Body", "| --- |"]
+        )
+        self.assertEqual(lines, ["Skip to content", "", "Body", "| --- |"])
+        self.assertEqual(needs_embedding, [True, False, True, False])
+
+    def test_convert_embeds_only_content_lines(self):
+        registry = ModelRegistry()
+        tokenizer, model = register_stub(registry)
+        converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry)
+        embedded = []
+        process_embeddings = converter._process_embeddings
+        converter._process_embeddings = lambda lines: embedded.extend(lines) or process_embeddings(lines)
+        converter.convert("<p>One</p><hr/><p>Two</p>")
+        self.assertEqual(embedded, ["One", "Two"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import os
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+import torch
+from redundancy import redundant_mask
+
+
+class RedundantMaskTest(unittest.TestCase):
+    def setUp(self):
+        generator = torch.Generator().manual_seed(0)
+        base = torch.randn(200, 16, generator=generator)
+        # Repeat some rows with small noise so there are near-duplicates to find
+        base[1::3] = base[0::3][: len(base[1::3])] + 0.1 * torch.randn(
+            len(base[1::3]), 16, generator=generator
+        )
+        self.embeddings = torch.nn.functional.normalize(base, p=2, dim=1)
+
+    def test_window_one_matches_neighbour_loop(self):
+        expected = [False]
+        for i in range(1, len(self.embeddings)):
+            similarity = torch.cosine_similarity(
+                self.embeddings[i].unsqueeze(0), self.embeddings[i - 1].unsqueeze(0)
+            )
+            expected.append(similarity.item() >= 0.86899)
+        self.assertEqual(redundant_mask(self.embeddings).tolist(), expected)
+
+    def test_wider_window_finds_more(self):
+        narrow = redundant_mask(self.embeddings, threshold=0.5, window=1)
+        wide = redundant_mask(self.embeddings, threshold=0.5, window=4)
+        self.assertTrue(bool((narrow <= wide).all()))
+
+    def test_segments_reset_window(self):
+        embeddings = torch.nn.functional.normalize(torch.ones(3, 4), p=2, dim=1)
+        segments = torch.tensor([0, 1, 1])
+        self.assertEqual(
+            redundant_mask(embeddings, segments).tolist(), [False, False, True]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+import main as pipeline
+from download_jina import prefetch
+from registry import ArtifactNotFoundError, ModelRegistry, find_artifact, get_registry
+from converter import HTMLToMarkdownConverter
+from tests.stub_model import StubModel, StubTokenizer, register_stub
+
+
+class ModelRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        self.tokenizer, self.model = register_stub(self.registry)
+
+    def test_converters_share_registered_model(self):
+        first = HTMLToMarkdownConverter(model_name="stub-model", registry=self.registry)
+        second = HTMLToMarkdownConverter(model_name="stub-model", registry=self.registry)
+        self.assertIs(first.model, self.model)
+        self.assertIs(second.model, self.model)
+        self.assertIs(first.tokenizer, second.tokenizer)
+
+    def test_warm_up_runs_forward_pass(self):
+        self.registry.warm_up("stub-model")
+        self.assertEqual(self.model.calls, 1)
+
+    def test_unload(self):
+        self.assertTrue(self.registry.is_loaded("stub-model"))
+        self.registry.unload("stub-model")
+        self.assertFalse(self.registry.is_loaded("stub-model"))
+
+    def test_prepared_backend_does_not_keep_fp32_model(self):
+        registry = ModelRegistry()
+        with mock.patch.object(registry, "_load", return_value=(StubTokenizer(), StubModel())) as load:
+            registry.get("unregistered-model", "int8")
+            registry.get("unregistered-model", "int8")
+        self.assertEqual(load.call_count, 1)
+        self.assertTrue(registry.is_loaded("unregistered-model", "int8"))
+        self.assertFalse(registry.is_loaded("unregistered-model"))
+
+    def test_convert_with_registered_model(self):
+        converter = HTMLToMarkdownConverter(model_name="stub-model", registry=self.registry)
+        html = "<html><body><p>Hello World!</p></body></html>"
+        self.assertEqual(converter.convert(html), "Hello World!")
+
+
+class ArtifactLoadingTest(unittest.TestCase):
+    def setUp(self):
+        from transformers import BertConfig, BertModel, BertTokenizerFast
+
+        # A tiny local checkpoint stands in for the hub, so prefetching needs no network
+        self.directory = tempfile.mkdtemp()
+        self.checkpoint = os.path.join(self.directory, "checkpoint")
+        vocab = os.path.join(self.directory, "vocab.txt")
+        with open(vocab, "w", encoding="utf-8") as file:
+            file.write("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "hello", "world"]))
+        config = BertConfig(
+            vocab_size=7, hidden_size=8, num_hidden_layers=1, num_attention_heads=2, intermediate_size=16
+        )
+        BertModel(config).save_pretrained(self.checkpoint)
+        BertTokenizerFast(vocab_file=vocab).save_pretrained(self.checkpoint)
+        self.root = os.path.join(self.directory, "models")
+
+    def test_offline_registry_loads_prefetched_artifact(self):
+        path = prefetch(self.checkpoint, revision="v1", root=self.root)
+        self.assertTrue(os.path.exists(os.path.join(path, "model.safetensors")))
+        self.assertEqual(find_artifact(self.checkpoint, root=self.root), path)
+        self.assertIsNone(find_artifact(self.checkpoint, revision="v2", root=self.root))
+
+        registry = ModelRegistry(artifact_root=self.root, offline=True)
+        tokenizer, model = registry.warm_up(self.checkpoint)
+        self.assertFalse(model.training)
+        self.assertEqual(tokenizer(["hello world"])["input_ids"][0][0], 2)
+
+    def test_offline_registry_fails_fast_without_artifact(self):
+        registry = ModelRegistry(artifact_root=self.root, offline=True)
+        with self.assertRaises(FileNotFoundError) as raised:
+            registry.get(self.checkpoint)
+        self.assertIn("download_jina.py", str(raised.exception))
+
+    def test_offline_run_without_artifact_fails(self):
+        self.addCleanup(get_registry().configure)
+        output = os.path.join(self.directory, "out.md")
+        with mock.patch.dict(os.environ, {"CONTEXT_CONVERTER_MODELS": self.root}):
+            with self.assertRaises(ArtifactNotFoundError):
+                asyncio.run(
+                    pipeline.main(
+                        pattern=os.path.join(self.directory, "*.json"),
+                        output_file_name=output,
+                        workers=0,
+                        offline=True,
+                        model_name=self.checkpoint,
+                    )
+                )
+        self.assertFalse(os.path.exists(output))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+import asyncio
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from converter import HTMLToMarkdownConverter
+from registry import ModelRegistry
+from service import ConversionService, ServiceClient, ServiceError, parse_address
+from tests.stub_model import register_stub
+
+
+class ConversionServiceTest(unittest.TestCase):
+    def start(self, **kwargs):
+        registry = ModelRegistry()
+        register_stub(registry)
+        self.converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry)
+        self.service = ConversionService(self.converter, **kwargs)
+        self.address = "unix:" + os.path.join(tempfile.mkdtemp(), "service.sock")
+        self.loop = asyncio.new_event_loop()
+        self.loop.run_until_complete(self.service.start(self.address))
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.addCleanup(self.stop)
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.service.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        # Let the connection handlers see their closed connections
+        self.loop.run_until_complete(asyncio.sleep(0.05))
+        self.loop.close()
+
+    def convert(self, html_content):
+        with ServiceClient(self.address) as client:
+            return client.convert(html_content)
+
+    def test_concurrent_requests_match_direct_conversion(self):
+        self.start()
+        pages = [f"<p>Page {i} text.</p><p>Page {i} text.</p><p>Other {i} words here.</p>" for i in range(8)]
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(self.convert, pages))
+        reference = HTMLToMarkdownConverter(model_name="stub-model", registry=self.converter.registry)
+        self.assertEqual(results, [reference.convert(page) for page in pages])
+
+        with ServiceClient(self.address) as client:
+            self.assertEqual(client.health(), {"status": "ok"})
+            self.assertIn("## Title", client.convert("<p>Body.</p>", title="Title", url="https://example.com"))
+            stats = client.stats()
+        self.assertEqual(stats["requests"], 9)
+        self.assertEqual(stats["batching"]["requests"], 9)
+        self.assertIn("embed", stats["metrics"]["stages"])
+
+    def test_one_forward_pass_per_flush(self):
+        registry = ModelRegistry()
+        _, model = register_stub(registry)
+        converter = HTMLToMarkdownConverter(model_name="stub-model", registry=registry, batch_size=4)
+        service = ConversionService(converter, micro_batch_size=64)
+        self.addCleanup(service.close)
+        converter.batcher.embed([f"line number {i}" for i in range(40)])
+        self.assertEqual(model.calls, 1)
+
+    def test_full_service_refuses_requests(self):
+        self.start(max_pending=0)
+        with ServiceClient(self.address) as client:
+            with self.assertRaises(ServiceError) as raised:
+                client.convert("<p>Text.</p>")
+            self.assertEqual(raised.exception.status, 503)
+            self.assertEqual(client.stats()["rejected"], 1)
+
+    def test_parse_address(self):
+        self.assertEqual(parse_address("unix:/tmp/s.sock"), ("unix", "/tmp/s.sock"))
+        self.assertEqual(parse_address("localhost:80"), ("tcp", ("localhost", 80)))
+        with self.assertRaises(ValueError):
+            parse_address("localhost")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+import main as pipeline
+from embedding_store import load_embeddings
+from registry import DEFAULT_MODEL_NAME, get_registry
+from sharding import merge_shards, run_shards
+from tests.stub_model import register_stub
+from utils import parse_shard
+
+
+class ShardingTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        data = [
+            {"title": f"Page {i}", "url": f"https://example.com/{i}", "html": f"<p>Content of page {i}.</p>"}
+            for i in range(11)
+        ]
+        data[4]["html"] = None
+        for number, part in enumerate((data[:6], data[6:])):
+            with open(os.path.join(self.directory, f"output{number}.json"), "w", encoding="utf-8") as file:
+                json.dump(part, file)
+        self.pattern = os.path.join(self.directory, "output*.json")
+
+    def kwargs(self, output, *extra):
+        args = pipeline.parse_args(["--pattern", self.pattern, "--output", output, "--dedup", "lexical", *extra])
+        return pipeline.main_kwargs(args)
+
+    def test_sharded_run_matches_single_process(self):
+        reference = os.path.join(self.directory, "reference.md")
+        asyncio.run(pipeline.main(**dict(self.kwargs(reference), workers=0)))
+
+        output = os.path.join(self.directory, "sharded.md")
+        # Two machines of two workers each, run one after the other on this machine
+        run_shards(self.kwargs(output), shard=(0, 2), workers=2)
+        with self.assertRaises(ValueError):
+            merge_shards(output)
+        run_shards(self.kwargs(output), shard=(1, 2), workers=2)
+        self.assertEqual(merge_shards(output), 10)
+
+        with open(reference, encoding="utf-8") as expected, open(output, encoding="utf-8") as actual:
+            self.assertEqual(actual.read(), expected.read())
+
+    def test_corpus_dedup_runs_across_shards_in_the_merge(self):
+        notice = "<p>This site uses cookies to remember your preferences between visits to every page.</p>"
+        data = [
+            {"title": f"Page {i}", "url": "", "html": f"<p>Content of page {i}.</p>{notice}"}
+            for i in range(8)
+        ]
+        with open(os.path.join(self.directory, "output1.json"), "w", encoding="utf-8") as file:
+            json.dump([], file)
+        with open(os.path.join(self.directory, "output0.json"), "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        reference = os.path.join(self.directory, "reference.jsonl")
+        asyncio.run(pipeline.main(**dict(self.kwargs(reference, "--corpus-dedup", "--output-format", "jsonl"), workers=0)))
+
+        output = os.path.join(self.directory, "sharded.jsonl")
+        kwargs = self.kwargs(output, "--corpus-dedup", "--output-format", "jsonl")
+        run_shards(kwargs, workers=2)
+        merge_shards(output, output_format="jsonl", corpus_dedup=True)
+
+        with open(reference, encoding="utf-8") as expected, open(output, encoding="utf-8") as actual:
+            records = [json.loads(line) for line in actual]
+            self.assertEqual(records, [json.loads(line) for line in expected])
+        self.assertEqual(sum("cookies" in record["markdown"] for record in records), 1)
+
+    def test_sharded_embedding_stores_merge_in_input_order(self):
+        register_stub(get_registry(), DEFAULT_MODEL_NAME)
+        self.addCleanup(get_registry().unload, DEFAULT_MODEL_NAME)
+        notice = "<p>This site uses cookies to remember your preferences between visits to every page.</p>"
+        with open(os.path.join(self.directory, "output1.json"), "w", encoding="utf-8") as file:
+            json.dump([{"title": f"Page {i}", "html": f"<p>Content of page {i}.</p>{notice}"} for i in range(6)], file)
+        extra = ("--dedup", "semantic", "--save-embeddings", "float32", "--corpus-dedup", "--micro-batch-size", "0")
+        reference = os.path.join(self.directory, "reference.md")
+        asyncio.run(pipeline.main(**dict(self.kwargs(reference, *extra), workers=0)))
+
+        output = os.path.join(self.directory, "sharded.md")
+        # Spawned workers would not see the stub model, so three machines of one worker run in this process
+        for index in range(3):
+            run_shards(self.kwargs(output, *extra), shard=(index, 3))
+        self.assertEqual(merge_shards(output, corpus_dedup=True, embeddings_dtype="float32"), 11)
+
+        expected_rows, expected_index = load_embeddings(f"{reference}.embeddings")
+        rows, index = load_embeddings(f"{output}.embeddings")
+        self.assertEqual(len(index), 11)
+        self.assertEqual(sum("cookies" in " ".join(record["lines"]) for record in index), 1)
+        self.assertEqual(index, expected_index)
+        self.assertTrue((rows == expected_rows).all())
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("1/4"), (1, 4))
+        for value in ("4/4", "1", "a/b"):
+            with self.assertRaises(ValueError):
+                parse_shard(value)
+
+
+if __name__ == "__main__":
+    unittest.main()
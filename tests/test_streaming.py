@@ -0,0 +1,113 @@
+import unittest
+import asyncio
+import os
+import random
+import sys
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from converter import HTMLToMarkdownConverter
+from engine import ConversionEngine
+from registry import ModelRegistry
+from streaming import iter_html_sections
+from tests.stub_model import register_stub
+
+
+def long_page(sections=300, seed=0):
+    rng = random.Random(seed)
+    words = "alpha beta gamma delta epsilon zeta eta theta".split()
+    parts = ["<html><head><title>Reference</title></head><body><nav><p>Menu</p></nav><div class='main'>Intro"]
+    for i in range(sections):
+        kind = rng.random()
+        if kind < 0.3:
+            parts.append(f"<p>{' '.join(rng.choices(words, k=4))}</p>")
+        elif kind < 0.5:
+            parts.append("<p>Repeated line</p><p>Repeated line</p> loose text")
+        elif kind < 0.6:
+            parts.append("<hr>")
+        elif kind < 0.7:
+            parts.append(f"<ul><li>{rng.choice(words)}</li><li>{rng.choice(words)}<ul><li>nested</li></ul></li></ul>")
+        elif kind < 0.8:
+            parts.append(f"<h2>Section {i % 3}</h2>")
+        else:
+            parts.append(f"<pre>{rng.choice(words)}\n{rng.choice(words)}</pre>")
+    parts.append("</div><footer><p>Footer</p></footer>Outro</body></html>")
+    return "".join(parts)
+
+
+class StreamingConversionTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = ModelRegistry()
+        register_stub(self.registry)
+        self.html = long_page()
+
+    def converter(self, **kwargs):
+        return HTMLToMarkdownConverter(
+            model_name="stub-model", registry=self.registry, similarity_threshold=0.5, **kwargs
+        )
+
+    def test_sections_keep_document_order_and_curation_context(self):
+        html = "<body><div id='sidebar'><p>Ad</p></div><div>Before<p>Para</p>after</div></body>"
+        sections = list(iter_html_sections(html, chunk_size=5, section_size=1))
+        self.assertEqual(sections[0], '<body><div id="sidebar"><p>Ad</p></div></body>')
+        self.assertEqual(sections[2:4], ["<body><div>Before</div></body>", "<body><div><p>Para</p></div></body>"])
+        converter = self.converter(dedup="none")
+        markdown = [converter.to_markdown(section) for section in sections]
+        self.assertEqual([text for text in markdown if text], ["Before", "Para", "after"])
+        # Pieces with the same parent are grouped into one contiguous slice of the document
+        self.assertIn("<body><div>Before<p>Para</p></div></body>", iter_html_sections(html, chunk_size=5))
+
+    def test_stream_matches_whole_document_conversion(self):
+        for dedup in ("semantic", "lexical", "none"):
+            for window in (1, 3):
+                converter = self.converter(dedup=dedup, window=window)
+                expected = converter.convert(self.html)
+                for window_lines in (1, 16, 100000):
+                    with self.subTest(dedup=dedup, window=window, window_lines=window_lines):
+                        pieces = converter.convert_stream(self.html, window_lines=window_lines, chunk_size=101)
+                        self.assertEqual("".join(pieces), expected)
+
+    def test_stream_without_dedup_keeps_blank_lines_around_removed_chrome(self):
+        chrome = (
+            "<header><a href='/'>Home</a></header>\n<nav class='navbar'><ul><li>API</li></ul></nav>\n"
+            "<div class='cookie-banner'>Cookies?</div>\n<div id='sidebar'><p>Related</p></div>\n"
+        )
+        html = f"<html><body><h1>Page</h1>\n{chrome}<p>Skip to content</p>\n<p>Body text.</p>\n{chrome}<footer>Footer</footer></body></html>"
+        converter = self.converter(dedup="none")
+        for chunk_size in (7, 1 << 16):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual("".join(converter.convert_stream(html, chunk_size=chunk_size)), converter.convert(html))
+
+    def test_stream_accepts_chunks_and_embeds_in_bounded_windows(self):
+        converter = self.converter()
+        expected = converter.convert(self.html)
+        embedded = []
+        embed_lines = converter._embed_lines
+        converter._embed_lines = lambda lines: embedded.append(len(lines)) or embed_lines(lines)
+        data = self.html.encode("utf-8")
+        chunks = (data[i : i + 256] for i in range(0, len(data), 256))
+        pieces = list(converter.convert_stream(chunks, window_lines=64))
+        self.assertEqual("".join(pieces), expected)
+        self.assertGreater(len(pieces), 1)
+        self.assertLessEqual(max(embedded), 64)
+
+    def test_engine_streams_pages_over_threshold(self):
+        converter = self.converter()
+
+        async def run():
+            with ConversionEngine(converter, workers=0, stream_threshold=1000) as engine:
+                return await engine.convert(self.html), await engine.convert("<p>Short page.</p>")
+
+        streamed, short = asyncio.run(run())
+        self.assertEqual(streamed, converter.convert(self.html))
+        self.assertEqual(short, "Short page.")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from unittest import mock
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+import utils
+from utils import achunk_dataset, iter_json_entries
+
+
+class StreamingLoaderTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.entries = [
+            {"title": f"Page {i}", "url": f"https://example.com/{i}", "html": "<p>" + "x" * i * 31 + "</p>"}
+            for i in range(40)
+        ]
+        with open(os.path.join(self.tmp.name, "output-1.json"), "w", encoding="utf-8") as file:
+            json.dump(self.entries, file, indent=2)
+        with open(os.path.join(self.tmp.name, "output-2.json"), "w", encoding="utf-8") as file:
+            file.write("\n".join(json.dumps(entry) for entry in self.entries))
+        self.pattern = os.path.join(self.tmp.name, "output*.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def collect(self, iterable):
+        async def run():
+            return [item async for item in iterable]
+
+        return asyncio.run(run())
+
+    def test_array_and_jsonl_files_with_small_reads(self):
+        entries = self.collect(iter_json_entries(self.pattern, read_size=13))
+        self.assertEqual(entries, self.entries + self.entries)
+
+    def test_chunks_are_built_lazily(self):
+        chunks = self.collect(achunk_dataset(iter_json_entries(self.pattern), 32))
+        self.assertEqual([len(chunk) for chunk in chunks], [32, 32, 16])
+
+    def test_truncated_array_raises(self):
+        path = os.path.join(self.tmp.name, "truncated.json")
+        for content in ("[1, 2", "[1, 2,", "["):
+            with self.subTest(content=content):
+                with open(path, "w", encoding="utf-8") as file:
+                    file.write(content)
+                with self.assertRaises(json.JSONDecodeError):
+                    self.collect(iter_json_entries(path))
+
+    def test_read_size_resets_after_oversized_entry(self):
+        path = os.path.join(self.tmp.name, "oversized.jsonl")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(json.dumps("x" * 1000) + "\n" + "\n".join(json.dumps(i) for i in range(200)))
+        sizes = []
+        real_open = utils.aiofiles.open
+
+        class RecordingFile:
+            def __init__(self, *args, **kwargs):
+                self.opened = real_open(*args, **kwargs)
+
+            async def __aenter__(self):
+                self.file = await self.opened.__aenter__()
+                return self
+
+            async def __aexit__(self, *exc_info):
+                return await self.opened.__aexit__(*exc_info)
+
+            async def read(self, size):
+                sizes.append(size)
+                return await self.file.read(size)
+
+        with mock.patch.object(utils.aiofiles, "open", RecordingFile):
+            entries = self.collect(iter_json_entries(path, read_size=16))
+        self.assertEqual(entries, ["x" * 1000] + list(range(200)))
+        self.assertGreater(max(sizes), 16)
+        self.assertEqual(sizes[-1], 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import gzip
+import json
+import os
+import sys
+import tempfile
+
+# Add the package source directory to the system path
+package_dir = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    "src",
+    "context_converter",
+)
+sys.path.append(package_dir)
+
+from writer import OutputWriter
+
+
+class OutputWriterTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.entries = [
+            {"title": f"Page {i}", "url": f"https://example.com/{i}"} for i in range(5)
+        ]
+        self.contents = [f"Content {i}." for i in range(5)]
+
+    def test_markdown_is_joined_in_order_and_skips_failures(self):
+        path = os.path.join(self.directory, "out.md")
+        contents = list(self.contents)
+        contents[1] = ""
+        with OutputWriter(path) as writer:
+            writer.write_many(self.entries[:3], contents[:3])
+            writer.write_many(self.entries[3:], contents[3:])
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), "Content 0.\n\nContent 2.\n\nContent 3.\n\nContent 4.")
+        self.assertEqual(writer.entries, 4)
+
+    def test_sharded_compressed_jsonl(self):
+        path = os.path.join(self.directory, "out.jsonl")
+        with OutputWriter(path, format="jsonl", max_entries=2, compress=True) as writer:
+            writer.write_many(self.entries, self.contents)
+        self.assertEqual(
+            [os.path.basename(p) for p in writer.paths],
+            ["out-00000.jsonl.gz", "out-00001.jsonl.gz", "out-00002.jsonl.gz"],
+        )
+        records = []
+        for shard in writer.paths:
+            with gzip.open(shard, "rt", encoding="utf-8") as file:
+                records.extend(json.loads(line) for line in file)
+        self.assertEqual([r["markdown"] for r in records], self.contents)
+        self.assertEqual(records[0], {"title": "Page 0", "url": "https://example.com/0", "markdown": "Content 0."})
+
+    def test_atomic_writer_replaces_output_on_close(self):
+        path = os.path.join(self.directory, "out.md")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("old")
+        writer = OutputWriter(path, atomic=True)
+        writer.write(self.entries[0], "new")
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), "old")
+        writer.close()
+        with open(path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), "new")
+
+
+if __name__ == "__main__":
+    unittest.main()